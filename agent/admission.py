@@ -0,0 +1,186 @@
+"""
+Admission control for /chat and /chat/stream: bounded work per worker, so
+a traffic spike sheds load with an immediate local answer instead of
+every request waiting behind Groq until the client gives up.
+
+At most ADMISSION_MAX_IN_FLIGHT requests run at once. The rest queue by
+priority (ADMISSION_PRIORITIES, emergency=True first), each queue bounded
+by ADMISSION_QUEUE_LIMITS, and a freed slot goes to the oldest request of
+the highest non-empty queue. Every request has ADMISSION_DEADLINE_SECONDS
+to finish: one whose expected queue wait plus the running average request
+time would miss it is shed on arrival, and one still queued when only
+that average is left is shed then. A shed request gets
+degraded_response(): the general plan and the emergency contacts for its
+message, flagged "degraded": true.
+
+The controller lives on the worker's event loop and is not thread-safe.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from config.settings import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_DEADLINE_SECONDS,
+    ADMISSION_SERVICE_SECONDS,
+    ADMISSION_PRIORITIES,
+    ADMISSION_QUEUE_LIMITS,
+)
+from emergency.financial_resources import get_emergency_contacts
+from nodes.reasoning_node import create_default_response
+from utils.metrics import ADMISSIONS, ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, observe_stage
+
+# Weight of the newest request time in the running average
+SERVICE_SMOOTHING = 0.2
+
+DEGRADED_NOTICE = (
+    "We are getting a lot of requests right now, so this is a general plan. "
+    "Send your message again in a few minutes for one made for your situation."
+)
+
+def admission_priority(emergency: bool) -> str:
+    return "emergency" if emergency else "chat"
+
+def degraded_response(user_input: str, emergency: bool = False) -> dict:
+    """The answer for a shed request: no LLM call, microseconds of work."""
+    output = create_default_response()
+    output["final_advice"] = f"{output['final_advice']}\n{DEGRADED_NOTICE}"
+    contacts = get_emergency_contacts(user_input)
+    if contacts:
+        output["emergency_contacts"] = contacts
+    if emergency or contacts:
+        output["needs_emergency_support"] = True
+    output["degraded"] = True
+    return output
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        deadline_seconds: float = ADMISSION_DEADLINE_SECONDS,
+        queue_limits: Dict[str, int] = ADMISSION_QUEUE_LIMITS,
+        service_seconds: float = ADMISSION_SERVICE_SECONDS,
+        enabled: bool = ADMISSION_ENABLED,
+        clock=time.monotonic,
+    ):
+        self.max_in_flight = max_in_flight
+        self.deadline_seconds = deadline_seconds
+        self.queue_limits = dict(queue_limits)
+        self.service_seconds = service_seconds
+        self.enabled = enabled
+        self.clock = clock
+        self.in_flight = 0
+        self._queues = {priority: deque() for priority in ADMISSION_PRIORITIES}
+
+    def expected_wait(self, priority: str) -> float:
+        """Seconds a request of this priority arriving now would queue, at the average request time."""
+        if self.in_flight < self.max_in_flight and not self.depth():
+            return 0.0
+        rank = ADMISSION_PRIORITIES.index(priority)
+        ahead = sum(len(self._queues[name]) for name in ADMISSION_PRIORITIES[:rank + 1])
+        return (ahead + 1) * self.service_seconds / self.max_in_flight
+
+    def depth(self, priority: str = None) -> int:
+        priorities = (priority,) if priority else ADMISSION_PRIORITIES
+        return sum(len(self._queues[name]) for name in priorities)
+
+    async def acquire(self, priority: str) -> Optional[str]:
+        """
+        Wait for a slot. Returns None once admitted (call release() when
+        done), otherwise why the request is shed: "queue_full" or
+        "deadline".
+        """
+        if not self.enabled:
+            return None
+        if self.in_flight < self.max_in_flight and not self.depth():
+            self._admit(priority)
+            return None
+        if len(self._queues[priority]) >= self.queue_limits[priority]:
+            return self._shed(priority, "queue_full")
+        if self.expected_wait(priority) + self.service_seconds > self.deadline_seconds:
+            return self._shed(priority, "deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority]
+        queue.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc(priority=priority)
+        ADMISSIONS.inc(priority=priority, outcome="queued")
+        started = self.clock()
+        try:
+            # asyncio.wait leaves the waiter alone on timeout, so a slot handed
+            # over at the last moment is still seen below
+            await asyncio.wait((waiter,), timeout=max(0.0, self.deadline_seconds - self.service_seconds))
+        except asyncio.CancelledError:
+            # Client gone: give back a slot handed over meanwhile, or leave the queue
+            if waiter.done():
+                self.release()
+            else:
+                self._leave(queue, waiter, priority)
+            raise
+        observe_stage("admission_wait", self.clock() - started)
+        if waiter.done():
+            return None
+        self._leave(queue, waiter, priority)
+        return self._shed(priority, "deadline")
+
+    def release(self, seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the next queued request; `seconds` updates the average request time."""
+        if seconds is not None:
+            self.service_seconds += SERVICE_SMOOTHING * (seconds - self.service_seconds)
+        for priority in ADMISSION_PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                ADMISSION_QUEUE_DEPTH.dec(priority=priority)
+                if not waiter.done():
+                    # The slot moves over: in_flight stays the same
+                    waiter.set_result(None)
+                    ADMISSIONS.inc(priority=priority, outcome="admitted")
+                    return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec()
+
+    @asynccontextmanager
+    async def admit(self, priority: str) -> AsyncIterator[Optional[str]]:
+        """acquire() and release() around a block; yields the shed reason, None if admitted."""
+        reason = await self.acquire(priority)
+        if reason is not None:
+            yield reason
+            return
+        started = self.clock()
+        try:
+            yield None
+        finally:
+            self.release(self.clock() - started)
+
+    def _admit(self, priority: str) -> None:
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.inc()
+        ADMISSIONS.inc(priority=priority, outcome="admitted")
+
+    def _shed(self, priority: str, reason: str) -> str:
+        ADMISSIONS.inc(priority=priority, outcome=f"shed_{reason}")
+        return reason
+
+    def _leave(self, queue: deque, waiter: asyncio.Future, priority: str) -> None:
+        waiter.cancel()
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        ADMISSION_QUEUE_DEPTH.dec(priority=priority)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "service_seconds": round(self.service_seconds, 3),
+            "deadline_seconds": self.deadline_seconds,
+        }
+
+admission = AdmissionController()
@@ -1,17 +1,157 @@
-from langgraph.graph import StateGraph
-from schemas.agent_state_schema import AgentState
-from nodes.reasoning_node import reasoning_node
+import time
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, START, END
+from agent.state import AgentState
+from utils.metrics import NODE_SECONDS
+from nodes.preclassifier_node import preclassifier_node
+from nodes.reasoning_node import (
+    plan_node,
+    async_plan_node,
+    stream_plan_node,
+    astream_plan_node,
+    plan_events,
+)
+from nodes.contacts_node import contacts_node
 from nodes.guard_node import guard_node
-from nodes.response_node import response_node
 
-graph = StateGraph(AgentState)
+# Graph:
+#   preclassify ─┬─ (confident non-financial) ──────────────┐
+#                └─ reason (LLM) ─┐                          ├─ guard → END
+#                └─ contacts ─────┴──────────────────────────┘
+# The pre-classifier stays in front of the LLM: it takes microseconds and a
+# confident rejection saves the whole LLM call, which running it in
+# parallel would not. Contacts lookup runs alongside the LLM call.
 
-graph.add_node("reason", reasoning_node)
-graph.add_node("guard", guard_node)
-graph.add_node("respond", response_node)
+def _timed_node(name, fields, func, afunc=None):
+    """
+    Wrap a node that mutates and returns AgentState into a graph node that
+    returns only the fields it owns, plus its wall time in node_timings.
+    Returning only owned fields lets parallel branches update one state.
+    """
+    def updates(state, started):
+        seconds = time.perf_counter() - started
+        NODE_SECONDS.observe(seconds, node=name)
+        values = {field: getattr(state, field) for field in fields}
+        values["node_timings"] = {name: round(seconds * 1000, 3)}
+        return values
 
-graph.set_entry_point("reason")
-graph.add_edge("reason", "guard")
-graph.add_edge("guard", "respond")
+    def run(state: AgentState, config):
+        started = time.perf_counter()
+        return updates(func(state, config), started)
 
-agent_app = graph.compile()
+    async def arun(state: AgentState, config):
+        started = time.perf_counter()
+        return updates(await (afunc or _in_loop(func))(state, config), started)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+def _in_loop(func):
+    # Local nodes are microseconds of CPU work: not worth a thread hop
+    async def call(state, config):
+        return func(state, config)
+    return call
+
+def _streaming(config) -> bool:
+    return bool((config or {}).get("configurable", {}).get("stream_plan"))
+
+def _preclassify(state, config):
+    return preclassifier_node(state)
+
+def _reason(state, config):
+    if not _streaming(config):
+        return plan_node(state)
+    write = get_stream_writer()
+    for event in stream_plan_node(state):
+        write(event)
+    return state
+
+async def _areason(state, config):
+    if not _streaming(config):
+        return await async_plan_node(state)
+    write = get_stream_writer()
+    async for event in astream_plan_node(state):
+        write(event)
+    return state
+
+def _contacts(state, config):
+    return contacts_node(state)
+
+def _guard(state, config):
+    return guard_node(state)
+
+def _route_after_preclassify(state: AgentState):
+    if state.output is not None:
+        return "guard"
+    return ["reason", "contacts"]
+
+def build_graph(state_schema=AgentState):
+    graph = StateGraph(state_schema)
+
+    graph.add_node("preclassify", _timed_node("preclassify", ("classification", "output"), _preclassify))
+    graph.add_node("reason", _timed_node("reason", ("output",), _reason, _areason))
+    graph.add_node("contacts", _timed_node("contacts", ("emergency_contacts",), _contacts))
+    graph.add_node("guard", _timed_node(
+        "guard", ("output", "emergency_triggered", "last_assessment", "history"), _guard
+    ))
+
+    graph.add_edge(START, "preclassify")
+    graph.add_conditional_edges("preclassify", _route_after_preclassify, ["guard", "reason", "contacts"])
+    graph.add_edge(["reason", "contacts"], "guard")
+    graph.add_edge("guard", END)
+
+    return graph.compile()
+
+agent_app = build_graph()
+
+_STREAM_CONFIG = {"configurable": {"stream_plan": True}}
+
+def _to_state(values) -> AgentState:
+    # Graph output is a plain dict of channel values; no validation needed
+    return values if isinstance(values, AgentState) else AgentState(**values)
+
+def run_agent(state: AgentState) -> AgentState:
+    return _to_state(agent_app.invoke(state))
+
+async def arun_agent(state: AgentState) -> AgentState:
+    return _to_state(await agent_app.ainvoke(state))
+
+def _final_events(final_state: AgentState, streamed: bool):
+    # Cache hits and local answers stream nothing from the reason node, so
+    # their pieces are sent here; the finalized plan always comes last
+    if streamed:
+        yield "plan", final_state.output
+    else:
+        yield from plan_events(final_state.output)
+    yield "done", {
+        "emergency_triggered": final_state.emergency_triggered,
+        "node_timings": final_state.node_timings,
+    }
+
+def stream_agent(state: AgentState):
+    """
+    Run the graph and yield (event, data) pairs: plan pieces as the LLM
+    streams them, then ("plan", output) and ("done", {...}).
+    """
+    streamed = False
+    values = None
+    for mode, chunk in agent_app.stream(state, _STREAM_CONFIG, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            streamed = True
+            yield chunk
+        else:
+            values = chunk
+    yield from _final_events(_to_state(values), streamed)
+
+async def astream_agent(state: AgentState):
+    """Async generator version of stream_agent."""
+    streamed = False
+    values = None
+    async for mode, chunk in agent_app.astream(state, _STREAM_CONFIG, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            streamed = True
+            yield chunk
+        else:
+            values = chunk
+    for event in _final_events(_to_state(values), streamed):
+        yield event
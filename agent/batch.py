@@ -0,0 +1,104 @@
+"""
+/chat/batch: many ChatRequest items through the agent graph, results in
+completion order.
+
+Items are validated one at a time, so an invalid item gets an error line
+and the rest still run. Items with the same normalized input, steps and
+emergency flag run once and every copy gets the result. At most
+`concurrency` items are in the graph at a time, and their LLM calls queue
+behind interactive traffic ("batch" scheduler priority). Batch items run
+without conversation memory.
+"""
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from agent.agent_runner import arun_agent
+from agent.state import AgentState
+from config.settings import BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY
+from llm.response_cache import make_cache_key
+from nodes.reasoning_node import requested_steps
+from schemas.request_schema import ChatRequest
+from utils.metrics import BATCH_ITEMS, finish_request, request_breakdown
+
+BATCH_PRIORITY = "batch"
+
+def batch_concurrency(requested: Optional[int] = None) -> int:
+    return max(1, min(requested or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+
+def _validation_error(error: ValidationError) -> Dict[str, Any]:
+    return {"type": "validation_error", "detail": json.loads(error.json(include_url=False))}
+
+async def _run_item(request: ChatRequest, slots: asyncio.Semaphore) -> Dict[str, Any]:
+    async with slots:
+        state = AgentState.from_request(request)
+        state.priority = BATCH_PRIORITY
+        started = time.perf_counter()
+        with request_breakdown() as breakdown:
+            final_state = await arun_agent(state)
+        finish_request("chat_batch_item", breakdown, time.perf_counter() - started)
+        return final_state.output
+
+async def _run_group(key: str, request: ChatRequest, slots: asyncio.Semaphore):
+    """(key, output, None), or (key, None, error) if the run raised."""
+    try:
+        return key, await _run_item(request, slots), None
+    except Exception as exc:
+        return key, None, {"type": type(exc).__name__, "message": str(exc)}
+
+async def run_batch(items: List[Any], concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one result per item, in completion order: {"index", "output"},
+    plus "duplicate_of" for copies of an earlier item, or {"index",
+    "error"}. Then a final {"summary": {...}}. Closing the generator
+    cancels the items still running.
+    """
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(batch_concurrency(concurrency))
+    groups = {}  # dedup key -> indices sharing one run
+    requests = {}
+    summary = {"items": len(items), "unique": 0, "duplicates": 0, "invalid": 0, "errors": 0}
+
+    for index, item in enumerate(items):
+        try:
+            request = ChatRequest.model_validate(item)
+        except ValidationError as error:
+            summary["invalid"] += 1
+            BATCH_ITEMS.inc(outcome="invalid")
+            yield {"index": index, "error": _validation_error(error)}
+            continue
+        key = make_cache_key(
+            request.user_input, requested_steps(AgentState.from_request(request)), request.emergency
+        )
+        if key not in groups:
+            groups[key] = []
+            requests[key] = request
+        groups[key].append(index)
+
+    tasks = [asyncio.ensure_future(_run_group(key, request, slots)) for key, request in requests.items()]
+    summary["unique"] = len(tasks)
+    try:
+        for finished in asyncio.as_completed(tasks):
+            key, output, error = await finished
+            indices = groups.pop(key)
+            for position, index in enumerate(indices):
+                if error is not None:
+                    summary["errors"] += 1
+                    BATCH_ITEMS.inc(outcome="error")
+                    yield {"index": index, "error": error}
+                    continue
+                line = {"index": index, "output": output}
+                if position:
+                    line["duplicate_of"] = indices[0]
+                    summary["duplicates"] += 1
+                BATCH_ITEMS.inc(outcome="duplicate" if position else "ok")
+                yield line
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    yield {"summary": summary}
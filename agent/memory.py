@@ -0,0 +1,167 @@
+"""
+Conversation memory for multi-turn chats.
+
+The last MEMORY_RECENT_TURNS turns are kept verbatim: what the user wrote
+and the plan they got back. Older turns are compacted into one structured
+summary entry each (compact_assessment plus the steps the user completed).
+context() renders both into the block the reasoning prompt carries, within
+MEMORY_TOKEN_BUDGET tokens: over budget, the older verbatim turns are
+compacted first, then the oldest summaries dropped.
+
+Each session in agent/session_store.py has one ConversationMemory, which
+to_dict()/from_dict() persist.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from agent.state import compact_assessment
+from config.settings import (
+    MEMORY_ENABLED,
+    MEMORY_RECENT_TURNS,
+    MEMORY_TOKEN_BUDGET,
+    MEMORY_SUMMARY_MAX_ENTRIES,
+)
+from utils.tokens import count_tokens
+
+SUMMARY_HEADER = "Earlier in this conversation:"
+RECENT_HEADER = "Recent messages:"
+SUMMARY_STEPS_SHOWN = 3
+
+@dataclass(slots=True)
+class Turn:
+    user_input: str
+    output: Dict[str, Any]
+    completed: List[int] = field(default_factory=list)
+
+    def completed_steps(self) -> List[str]:
+        steps = self.output.get("action_steps") or []
+        return [steps[index].get("step", "") for index in self.completed if index < len(steps)]
+
+def _summarize(turn: Turn) -> Optional[Dict[str, Any]]:
+    """The structured summary entry of a turn; None for turns with no plan."""
+    entry = compact_assessment(turn.output)
+    if not entry or entry.get("not_financial"):
+        return None
+    entry["completed"] = turn.completed_steps()
+    return entry
+
+def _summary_line(entry: Dict[str, Any]) -> str:
+    completed = entry["completed"]
+    if completed:
+        shown = "; ".join(completed[:SUMMARY_STEPS_SHOWN])
+        more = len(completed) - SUMMARY_STEPS_SHOWN
+        done = f"completed {len(completed)} of {entry['action_steps']} steps: {shown}" + (
+            f" and {more} more" if more > 0 else ""
+        )
+    else:
+        done = f"none of its {entry['action_steps']} steps completed yet"
+    emergency = ", emergency support suggested" if entry["emergency"] else ""
+    return f"- {entry['crisis_type']} (severity {entry['severity']}{emergency}); {done}"
+
+def _turn_lines(turn: Turn) -> List[str]:
+    output = turn.output
+    if output.get("not_financial"):
+        reply = "Asked for a financial problem to help with."
+    else:
+        steps = output.get("action_steps") or []
+        listed = " ".join(f"{number}. {step.get('step', '')}" for number, step in enumerate(steps, 1))
+        done = f" Completed: {', '.join(str(index + 1) for index in turn.completed)}." if turn.completed else ""
+        reply = f"{output.get('crisis_type')} (severity {output.get('severity')}). Steps: {listed}{done}"
+    return [f"User: {turn.user_input}", f"Assistant: {reply}"]
+
+class ConversationMemory:
+    def __init__(self, recent_turns: int = MEMORY_RECENT_TURNS, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 summary_entries: int = MEMORY_SUMMARY_MAX_ENTRIES):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self._turns = deque()
+        self._summary = deque(maxlen=summary_entries)
+        self._lock = threading.Lock()
+
+    def add_turn(self, user_input: str, output) -> None:
+        """Record a finished turn; turns past recent_turns move to the summary."""
+        if not output or "error" in output:
+            return
+        with self._lock:
+            self._turns.append(Turn(user_input, output))
+            while len(self._turns) > self.recent_turns:
+                entry = _summarize(self._turns.popleft())
+                if entry is not None:
+                    self._summary.append(entry)
+
+    def complete_step(self, index: int) -> None:
+        """Mark action step `index` (0-based) of the latest plan as done."""
+        with self._lock:
+            for turn in reversed(self._turns):
+                if not turn.output.get("not_financial"):
+                    if index not in turn.completed and 0 <= index < len(turn.output.get("action_steps") or []):
+                        turn.completed.append(index)
+                    return
+
+    def clear(self) -> None:
+        with self._lock:
+            self._turns.clear()
+            self._summary.clear()
+
+    def __len__(self) -> int:
+        return len(self._turns) + len(self._summary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": [
+                    {"user_input": turn.user_input, "output": turn.output, "completed": list(turn.completed)}
+                    for turn in self._turns
+                ],
+                "summary": list(self._summary),
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationMemory":
+        memory = cls()
+        memory._turns.extend(Turn(**turn) for turn in data.get("turns", ()))
+        memory._summary.extend(data.get("summary", ()))
+        return memory
+
+    def context(self) -> str:
+        """The conversation so far for the reasoning prompt, within token_budget; "" if none."""
+        with self._lock:
+            turns = list(self._turns)
+            summaries = [_summary_line(entry) for entry in self._summary]
+        if not MEMORY_ENABLED or not (turns or summaries):
+            return ""
+
+        blocks = [_turn_lines(turn) for turn in turns]
+        summary_costs = [count_tokens(line) + 1 for line in summaries]
+        block_costs = [sum(count_tokens(line) + 1 for line in block) for block in blocks]
+        header_costs = count_tokens(SUMMARY_HEADER) + 1, count_tokens(RECENT_HEADER) + 1
+
+        def cost():
+            return (
+                sum(summary_costs) + sum(block_costs)
+                + (header_costs[0] if summaries else 0) + (header_costs[1] if blocks else 0)
+            )
+
+        while cost() > self.token_budget and (blocks or summaries):
+            if len(blocks) > 1 or (blocks and not summaries):
+                # Compact the oldest verbatim turn; the newest stays verbatim longest
+                turn = turns.pop(0)
+                blocks.pop(0)
+                block_costs.pop(0)
+                entry = _summarize(turn)
+                if entry is not None:
+                    line = _summary_line(entry)
+                    summaries.append(line)
+                    summary_costs.append(count_tokens(line) + 1)
+            else:
+                summaries.pop(0)
+                summary_costs.pop(0)
+
+        lines = []
+        if summaries:
+            lines += [SUMMARY_HEADER, *summaries]
+        if blocks:
+            lines += [RECENT_HEADER, *(line for block in blocks for line in block)]
+        return "\n".join(lines)
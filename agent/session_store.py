@@ -0,0 +1,328 @@
+"""
+Session store: per-session conversation memory and Streamlit chat/step
+progress, so a restart or a reconnect to another worker resumes a plan
+instead of starting over.
+
+Sessions are kept in process (LRU, SESSION_MAX_IN_MEMORY). The SQLite
+backend also writes them behind: save() serializes the session and marks
+it dirty, and a writer thread flushes all dirty sessions in one
+transaction every SESSION_FLUSH_INTERVAL_SECONDS, so a session saved on
+every rerun is written once per interval. A crash loses at most that
+interval. Reads are lazy: a session is loaded from the file only when a
+process first sees it, or when another process has saved a newer version
+(one indexed version lookup per get).
+
+Several processes may share the file. A session's version is that of the
+stored row it descends from, plus its unwritten saves, and a write only
+lands if the row is still at the version this copy was loaded at (UPDATE
+... WHERE version = ?). When another process got there first, its row
+wins: the stale save is dropped, counted under "conflicts", and the next
+get() loads the winner. So a worker never overwrites a save it hasn't
+seen, but the losing save of two concurrent ones is lost; route a session
+to one worker at a time (sticky sessions) to avoid that.
+
+Sessions expire SESSION_TTL_SECONDS after their last save. Only the last
+SESSION_MAX_MESSAGES chat messages are kept; the conversation memory has
+its own compacted summary of older turns.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from agent.memory import ConversationMemory
+from config.settings import (
+    SESSION_STORE_BACKEND,
+    SESSION_STORE_SQLITE_PATH,
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_IN_MEMORY,
+    SESSION_FLUSH_INTERVAL_SECONDS,
+    SESSION_FLUSH_MAX_BATCH,
+    SESSION_MAX_MESSAGES,
+)
+
+@dataclass(slots=True)
+class Session:
+    session_id: str
+    memory: ConversationMemory = field(default_factory=ConversationMemory)
+    # Streamlit chat and step progress (messages, all_steps, timer fields, ...)
+    ui: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = field(default_factory=time.time)
+    version: int = 0
+    # Version of the stored row this copy was loaded from or last written as
+    stored_version: int = 0
+
+    def to_record(self) -> str:
+        return json.dumps({"memory": self.memory.to_dict(), "ui": self.ui})
+
+    @classmethod
+    def from_record(cls, session_id: str, payload: str, updated_at: float, version: int) -> "Session":
+        data = json.loads(payload)
+        return cls(session_id, ConversationMemory.from_dict(data["memory"]), data["ui"], updated_at, version, version)
+
+def compact_messages(ui: Dict[str, Any], max_messages: int = SESSION_MAX_MESSAGES) -> None:
+    """Keep the last max_messages chat messages, counting the ones dropped."""
+    messages = ui.get("messages")
+    if messages and len(messages) > max_messages:
+        ui["messages_dropped"] = ui.get("messages_dropped", 0) + len(messages) - max_messages
+        ui["messages"] = messages[-max_messages:]
+
+class SessionStore:
+    """In-process sessions (LRU + idle TTL); the base of the persistent backends."""
+
+    def __init__(self, max_in_memory: int = SESSION_MAX_IN_MEMORY, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_in_memory = max_in_memory
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.counts = {
+            "created": 0, "loads": 0, "saves": 0, "writes": 0,
+            "bytes_written": 0, "flushes": 0, "expirations": 0, "evictions": 0, "conflicts": 0,
+        }
+
+    def get(self, session_id: str) -> Session:
+        """The session, loaded lazily if this process hasn't seen it; a new one if none or expired."""
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None:
+                self._sessions.move_to_end(session_id)
+        # Outside the lock: the persistent backends may read the file here
+        loaded = self._load(session_id, cached)
+        if loaded is not None and time.time() - loaded.updated_at > self.ttl_seconds:
+            self._count("expirations")
+            loaded = None
+        created = loaded is None
+        if created:
+            loaded = Session(session_id)
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if current is not cached:
+                # Another get() replaced or added it meanwhile: everyone shares that object
+                return current if current is not None else self._sessions.setdefault(session_id, loaded)
+            if loaded is cached:
+                return cached
+            self._sessions[session_id] = loaded
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_in_memory:
+                self._sessions.popitem(last=False)
+                self._count("evictions")
+        if created:
+            self._count("created")
+        return loaded
+
+    def save(self, session: Session) -> None:
+        """Record a change to the session; persistent backends write it behind."""
+        compact_messages(session.ui)
+        session.updated_at = time.time()
+        session.version += 1
+        self._count("saves")
+        self._write(session)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def flush(self) -> None:
+        """Write pending saves now; in-memory sessions have none."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def _load(self, session_id: str, cached: Optional[Session]) -> Optional[Session]:
+        return cached
+
+    def _write(self, session: Session) -> None:
+        pass
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.counts[name] += amount
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counts = dict(self.counts)
+        return {"backend": type(self).__name__, "in_memory": len(self), **counts}
+
+class MemorySessionStore(SessionStore):
+    pass
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file (WAL mode) shared by the workers on a host,
+    written behind in batches. flush_interval 0 writes through on every
+    save (the baseline benchmarks/bench_session_store.py compares with).
+    """
+
+    def __init__(
+        self,
+        path: str = SESSION_STORE_SQLITE_PATH,
+        max_in_memory: int = SESSION_MAX_IN_MEMORY,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        flush_interval: float = SESSION_FLUSH_INTERVAL_SECONDS,
+        max_batch: int = SESSION_FLUSH_MAX_BATCH,
+    ):
+        super().__init__(max_in_memory, ttl_seconds)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._local = threading.local()
+        # session_id -> (session, version, updated_at, payload), newest save only
+        self._dirty = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = None
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+            "version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session_id, cached):
+        with self._dirty_lock:
+            pending = self._dirty.get(session_id)
+        if pending is not None:
+            # Our own unwritten save is the newest copy we know of; a conflict
+            # with another process is settled when it is written
+            return cached if cached is not None else pending[0]
+
+        conn = self._conn()
+        if cached is not None:
+            row = conn.execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or row[0] == cached.stored_version:
+                return cached
+        row = conn.execute(
+            "SELECT payload, updated_at, version FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return cached
+        self._count("loads")
+        return Session.from_record(session_id, *row)
+
+    def _write(self, session):
+        entry = (session, session.version, session.updated_at, session.to_record())
+        if self.flush_interval <= 0:
+            self._write_rows({session.session_id: entry})
+            return
+        with self._dirty_lock:
+            self._dirty[session.session_id] = entry
+            full = len(self._dirty) >= self.max_batch
+        self._start_writer()
+        if full:
+            self._wake.set()
+
+    def _start_writer(self):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="session-writer", daemon=True)
+                    self._writer.start()
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Kept in memory; the next flush retries
+                pass
+
+    def flush(self):
+        with self._flush_lock:
+            with self._dirty_lock:
+                batch, self._dirty = self._dirty, {}
+            if not batch:
+                return
+            try:
+                self._write_rows(batch)
+            except sqlite3.Error:
+                with self._dirty_lock:
+                    # Newer saves made meanwhile win over the failed batch
+                    self._dirty = {**batch, **self._dirty}
+                raise
+
+    def _write_rows(self, batch):
+        conn = self._conn()
+        now = time.time()
+        written, conflicts = [], []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for session_id, (session, version, updated_at, payload) in batch.items():
+                # Flushes run one at a time, so stored_version is the row this
+                # process last read or wrote
+                updated = conn.execute(
+                    "UPDATE sessions SET payload = ?, version = ?, updated_at = ? WHERE id = ? AND version = ?",
+                    (payload, version, updated_at, session_id, session.stored_version),
+                ).rowcount
+                if not updated:
+                    # No row (new, expired or deleted): insert; a row at another version: conflict
+                    updated = conn.execute(
+                        "INSERT OR IGNORE INTO sessions (id, payload, version, updated_at) VALUES (?, ?, ?, ?)",
+                        (session_id, payload, version, updated_at),
+                    ).rowcount
+                (written if updated else conflicts).append((session, version, payload))
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for session, version, _ in written:
+            session.stored_version = max(session.stored_version, version)
+        for session, _, _ in conflicts:
+            # Another process saved first: its row wins, and the next get() loads it
+            with self._lock:
+                if self._sessions.get(session.session_id) is session:
+                    del self._sessions[session.session_id]
+        self._count("flushes")
+        self._count("writes", len(written))
+        self._count("conflicts", len(conflicts))
+        self._count("bytes_written", sum(len(payload) for _, _, payload in written))
+
+    def delete(self, session_id):
+        super().delete(session_id)
+        with self._dirty_lock:
+            self._dirty.pop(session_id, None)
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def stats(self):
+        with self._dirty_lock:
+            pending = len(self._dirty)
+        return {**super().stats(), "pending": pending}
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        store = SQLiteSessionStore()
+        atexit.register(store.close)
+        return store
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+session_store = create_session_store()
@@ -0,0 +1,65 @@
+"""
+Internal agent state.
+
+AgentState is a plain __slots__ dataclass: it is built once per request
+from an already validated ChatRequest and passed from graph node to graph
+node without re-validation. Pydantic models stay at the API edge
+(schemas/).
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Deque, Dict, List, Optional
+from config.settings import OPTIMAL_STEPS, STATE_HISTORY_MAX_ENTRIES
+
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """Reducer for node_timings: parallel graph branches each add their own entry."""
+    return {**left, **right}
+
+def new_history(items=()) -> Deque[Dict[str, Any]]:
+    """Ring buffer of compacted assessments; the oldest entry drops off when full."""
+    return deque(items, maxlen=STATE_HISTORY_MAX_ENTRIES)
+
+def compact_assessment(output) -> Dict[str, Any]:
+    """The part of a finalized plan worth keeping once the turn is over."""
+    if not output:
+        return {}
+    if output.get("not_financial"):
+        return {"not_financial": True}
+    return {
+        "crisis_type": output.get("crisis_type"),
+        "severity": output.get("severity"),
+        "mood": output.get("mood"),
+        "action_steps": len(output.get("action_steps") or []),
+        "emergency": bool(output.get("needs_emergency_support") or output.get("emergency_contacts")),
+    }
+
+@dataclass(slots=True)
+class AgentState:
+    user_input: str
+    steps: int = OPTIMAL_STEPS
+    emergency: bool = False
+    # Earlier turns of the conversation, rendered by agent.memory for the prompt
+    context: str = ""
+    # Scheduler priority for this request's LLM calls instead of the route's (batch items)
+    priority: Optional[str] = None
+    output: Optional[Dict[str, Any]] = None
+    current_step: int = 0
+    completed_steps: List[Dict[str, Any]] = field(default_factory=list)
+    needs_reevaluation: bool = False
+    emergency_triggered: bool = False
+    history: Deque[Dict[str, Any]] = field(default_factory=new_history)
+    last_assessment: Optional[Dict[str, Any]] = None
+    classification: Optional[Dict[str, Any]] = None
+    emergency_contacts: Dict[str, Any] = field(default_factory=dict)
+    # Wall time per agent graph node, in milliseconds
+    node_timings: Annotated[Dict[str, float], merge_timings] = field(default_factory=dict)
+
+    @classmethod
+    def from_request(cls, request, context: str = "") -> "AgentState":
+        """Build from a validated ChatRequest; no second validation pass."""
+        return cls(
+            user_input=request.user_input,
+            steps=OPTIMAL_STEPS if request.steps is None else request.steps,
+            emergency=bool(request.emergency),
+            context=context,
+        )
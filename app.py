@@ -1,17 +1,153 @@
-from fastapi import FastAPI
-from schemas.request_schema import ChatRequest
-from schemas.agent_state_schema import AgentState
-from nodes.reasoning_node import reasoning_node
+import json
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from schemas.request_schema import ChatRequest, ChatBatchRequest
+from agent.state import AgentState
+from agent.agent_runner import arun_agent, astream_agent
+from agent.admission import admission, admission_priority, degraded_response
+from agent.batch import run_batch
+from agent.session_store import session_store
+from llm.groq_client import close_async_client
+from llm.response_cache import response_cache
+from llm.semantic_cache import semantic_cache
+from nodes.reasoning_node import plan_events
+from config.settings import METRICS_TIMING_HEADERS, MEMORY_ENABLED
+from utils.metrics import registry, request_breakdown, finish_request
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_async_client()
+    session_store.close()
+
+app = FastAPI(lifespan=lifespan)
+
+def _server_timing(*timings) -> str:
+    return ", ".join(f"{name};dur={ms}" for entries in timings for name, ms in entries.items())
+
+def _token_header(tokens) -> str:
+    return ", ".join(f"{kind}={count}" for kind, count in tokens.items())
+
+def _session(request: ChatRequest):
+    """The request's session with the reported step completions applied; None without a session_id."""
+    if not request.session_id or not MEMORY_ENABLED:
+        return None
+    session = session_store.get(request.session_id)
+    for index in request.completed_steps or ():
+        session.memory.complete_step(index)
+    return session
+
+def _record_turn(session, user_input: str, output) -> None:
+    if session is not None:
+        session.memory.add_turn(user_input, output)
+        session_store.save(session)
+
+def _degraded(session, state: AgentState):
+    """The local answer for a shed request; only its step completions reach the session."""
+    if session is not None:
+        session_store.save(session)
+    return degraded_response(state.user_input, state.emergency)
 
 @app.post("/chat")
-def chat(request: ChatRequest):
-    state = AgentState(
-        user_input=request.user_input,
-        steps=request.steps,
-        emergency=request.emergency
-    )
+async def chat(request: ChatRequest, response: Response):
+    session = _session(request)
+    state = AgentState.from_request(request, context=session.memory.context() if session else "")
+
+    started = time.perf_counter()
+    with request_breakdown() as breakdown:
+        async with admission.admit(admission_priority(state.emergency)) as shed:
+            if shed is None:
+                final_state = await arun_agent(state)
+    finish_request("chat", breakdown, time.perf_counter() - started)
+    if shed is not None:
+        response.headers["X-Admission"] = f"shed; reason={shed}"
+        return _degraded(session, state)
+    _record_turn(session, state.user_input, final_state.output)
 
-    final_state = reasoning_node(state)
+    # Per-node wall time of the agent graph, readable in browser dev tools
+    if METRICS_TIMING_HEADERS:
+        response.headers["Server-Timing"] = _server_timing(final_state.node_timings, breakdown["stages"])
+        response.headers["X-LLM-Tokens"] = _token_header(breakdown["tokens"])
+    else:
+        response.headers["Server-Timing"] = _server_timing(final_state.node_timings)
     return final_state.output
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Server-Sent Events version of /chat. Sends mood, crisis_type, the first
+    calming step and each action step as soon as they are parsed, then the
+    complete plan and a final done event with per-node timings (plus stage
+    times and token usage when METRICS_TIMING_HEADERS is on). A request shed
+    by admission control gets the degraded plan's events at once.
+    """
+    session = _session(request)
+    state = AgentState.from_request(request, context=session.memory.context() if session else "")
+
+    async def events():
+        started = time.perf_counter()
+        with request_breakdown() as breakdown:
+            async with admission.admit(admission_priority(state.emergency)) as shed:
+                if shed is None:
+                    async for event, data in astream_agent(state):
+                        if event == "plan":
+                            _record_turn(session, state.user_input, data)
+                        if event == "done" and METRICS_TIMING_HEADERS:
+                            data = {**data, **breakdown}
+                        yield _sse(event, data)
+            if shed is not None:
+                output = _degraded(session, state)
+                for event, data in plan_events(output):
+                    yield _sse(event, data)
+                yield _sse("done", {
+                    "emergency_triggered": output["needs_emergency_support"],
+                    "node_timings": {},
+                    "degraded": True,
+                    "shed": shed,
+                })
+        finish_request("chat_stream", breakdown, time.perf_counter() - started)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Run many /chat bodies, `concurrency` at a time (default
+    BATCH_CONCURRENCY), and stream one NDJSON line per item as it
+    finishes: {"index", "output"} or {"index", "error"}. Identical items
+    run once. The last line is {"summary": {...}}.
+    """
+    async def lines():
+        async for result in run_batch(request.items, request.concurrency):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "exact": response_cache.stats(),
+        "semantic": semantic_cache.stats() if semantic_cache is not None else None,
+    }
+
+@app.get("/sessions/stats")
+def session_stats():
+    return session_store.stats()
+
+@app.get("/admission/stats")
+def admission_stats():
+    return admission.stats()
+
+@app.get("/metrics")
+def metrics():
+    """Stage/node latency histograms, token and failure counters (Prometheus text format)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
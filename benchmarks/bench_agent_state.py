@@ -0,0 +1,117 @@
+"""
+Per-request cost and long-session memory of the agent state: the previous
+Pydantic AgentState (validated at the edge and again by LangGraph for every
+node, history of full plans) vs the __slots__ dataclass in agent.state
+(history ring of compacted assessments).
+
+Requests are answered from the exact-match cache, so no LLM call is timed.
+
+    python -m benchmarks.bench_agent_state
+"""
+import copy
+import json
+import os
+import time
+import tracemalloc
+from typing import Annotated, Any, Dict, List, Optional
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+
+from pydantic import BaseModel
+
+from agent.agent_runner import build_graph
+from agent.state import AgentState, compact_assessment, merge_timings, new_history
+from benchmarks.fake_groq import SAMPLE_PLAN
+from llm.response_cache import make_cache_key, response_cache
+from schemas.request_schema import ChatRequest
+
+USER_INPUT = "Salary delayed, EMI pending"
+
+class LegacyAgentState(BaseModel):
+    """The Pydantic state the graph ran on before agent.state.AgentState."""
+    user_input: str
+    steps: int = 5
+    emergency: bool = False
+    output: Optional[Dict[str, Any]] = None
+    current_step: int = 0
+    completed_steps: List[Dict[str, Any]] = []
+    needs_reevaluation: bool = False
+    emergency_triggered: bool = False
+    history: List[Dict[str, Any]] = []
+    last_assessment: Optional[Dict[str, Any]] = None
+    classification: Optional[Dict[str, Any]] = None
+    context: str = ""
+    emergency_contacts: Dict[str, Any] = {}
+    node_timings: Annotated[Dict[str, float], merge_timings] = {}
+
+def legacy_request(graph, request):
+    state = LegacyAgentState(
+        user_input=request.user_input, steps=request.steps, emergency=request.emergency
+    )
+    return LegacyAgentState.model_validate(graph.invoke(state))
+
+def compact_request(graph, request):
+    return AgentState(**graph.invoke(AgentState.from_request(request)))
+
+def per_request(run, graph, requests=300):
+    request = ChatRequest(user_input=USER_INPUT)
+    for _ in range(20):
+        run(graph, request)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        run(graph, request)
+    seconds = (time.perf_counter() - start) / requests
+
+    tracemalloc.start()
+    run(graph, request)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def distinct_plan(turn: int):
+    plan = copy.deepcopy(SAMPLE_PLAN)
+    plan["crisis_type"] = f"{plan['crisis_type']} (turn {turn})"
+    return json.loads(json.dumps(plan))
+
+def session_history_bytes(turns: int, compact: bool):
+    """Memory held by the history after `turns` assessments were recorded."""
+    tracemalloc.start()
+    history = new_history() if compact else []
+    for turn in range(turns):
+        plan = distinct_plan(turn)
+        if compact:
+            history = new_history(history)
+            history.append(compact_assessment(plan))
+        else:
+            history = history + [plan]
+        del plan
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+def main():
+    # Exact-cache hit: every request skips the LLM
+    response_cache.set(make_cache_key(USER_INPUT, 5, False), copy.deepcopy(SAMPLE_PLAN))
+
+    legacy_graph = build_graph(LegacyAgentState)
+    compact_graph = build_graph(AgentState)
+
+    print("Per request (edge construction + graph run, cache hit)")
+    print(f"{'state':>22} {'time':>10} {'peak alloc':>12}")
+    for name, run, graph in (
+        ("pydantic (before)", legacy_request, legacy_graph),
+        ("slots dataclass", compact_request, compact_graph),
+    ):
+        seconds, peak = per_request(run, graph)
+        print(f"{name:>22} {seconds * 1e6:>8.0f}us {peak / 1024:>10.1f}KB")
+
+    print("\nHistory memory over a long session")
+    print(f"{'turns':>8} {'full plans (before)':>20} {'compacted ring':>16}")
+    for turns in (10, 100, 1000):
+        before = session_history_bytes(turns, compact=False)
+        after = session_history_bytes(turns, compact=True)
+        print(f"{turns:>8} {before / 1024:>18.1f}KB {after / 1024:>14.1f}KB")
+
+if __name__ == "__main__":
+    main()
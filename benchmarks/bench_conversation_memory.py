@@ -0,0 +1,104 @@
+"""
+Conversation memory (agent/memory.py): how large the reasoning prompt gets
+over a long session.
+
+A seeded 30-turn session: each turn is a financial sample input from
+benchmarks/data/preclassifier_samples.jsonl answered with a plan-library
+plan, and the user completes some of its steps before the next message.
+Prompt tokens (utils/tokens.py estimate of build_reasoning_prompt, system
+and user message) at turns 1, 5, 10, 20 and 30, three ways:
+
+- no memory: every message planned on its own, as before
+- full history: every earlier turn verbatim, never compacted
+- compacted: ConversationMemory with the configured recent turns and budget
+
+The compacted context must stay within MEMORY_TOKEN_BUDGET on every turn
+and the prompt must level off while full history keeps growing.
+
+    python -m benchmarks.bench_conversation_memory --turns 30
+"""
+import argparse
+import json
+import os
+import random
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+
+from agent.memory import ConversationMemory
+from agent.state import AgentState
+from config.settings import MEMORY_TOKEN_BUDGET, OPTIMAL_STEPS
+from llm.plan_library import plan_library
+from nodes.reasoning_node import build_reasoning_prompt
+from utils.tokens import count_tokens
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "preclassifier_samples.jsonl")
+REPORTED_TURNS = (1, 5, 10, 20, 30)
+
+def load_inputs():
+    with open(SAMPLES_PATH, encoding="utf-8") as file:
+        samples = [json.loads(line) for line in file if line.strip()]
+    return [sample["text"] for sample in samples if sample["label"] == "financial"]
+
+def make_session(turns: int, seed: int):
+    """[(user_input, plan, completed step indices)] for one session."""
+    rng = random.Random(seed)
+    inputs = load_inputs()
+    categories = sorted(plan_library.categories)
+    session = []
+    for _ in range(turns):
+        plan = plan_library.plan(rng.choice(categories), OPTIMAL_STEPS)
+        completed = sorted(rng.sample(range(len(plan["action_steps"])), rng.randint(0, 3)))
+        session.append((rng.choice(inputs), plan, completed))
+    return session
+
+def prompt_tokens(session, memory):
+    """Prompt tokens and context tokens for each turn of the session."""
+    rows = []
+    for user_input, plan, completed in session:
+        context = memory.context() if memory is not None else ""
+        state = AgentState(user_input=user_input, steps=OPTIMAL_STEPS, context=context)
+        prompt = build_reasoning_prompt(state)
+        rows.append((count_tokens(prompt.system) + count_tokens(prompt.user), count_tokens(context)))
+        if memory is not None:
+            memory.add_turn(user_input, plan)
+            for index in completed:
+                memory.complete_step(index)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    session = make_session(args.turns, args.seed)
+    runs = {
+        "no memory": prompt_tokens(session, None),
+        "full history": prompt_tokens(session, ConversationMemory(recent_turns=10**6, token_budget=10**9)),
+        "compacted": prompt_tokens(session, ConversationMemory()),
+    }
+
+    shown = [turn for turn in REPORTED_TURNS if turn <= args.turns]
+    print(f"reasoning prompt tokens over a {args.turns}-turn session (budget {MEMORY_TOKEN_BUDGET}):")
+    print(f"{'mode':<14}" + "".join(f"{f'turn {turn}':>9}" for turn in shown) + f"{'max':>8}")
+    for name, rows in runs.items():
+        prompts = [prompt for prompt, _ in rows]
+        print(f"{name:<14}" + "".join(f"{prompts[turn - 1]:>9}" for turn in shown) + f"{max(prompts):>8}")
+
+    compacted = [prompt for prompt, _ in runs["compacted"]]
+    full = [prompt for prompt, _ in runs["full history"]]
+    half = len(compacted) // 2
+    checks = {
+        "within_budget": all(context <= MEMORY_TOKEN_BUDGET for _, context in runs["compacted"]),
+        "levels_off": max(compacted[half:]) <= max(compacted[:half]) * 1.1,
+        "full_history_grows": full[-1] > 2 * compacted[-1],
+    }
+    print()
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark get_emergency_contacts: the previous ~20 substring scans vs the
+precompiled single-pass word-boundary matcher.
+
+    python -m benchmarks.bench_emergency_contacts
+"""
+import random
+import time
+
+from emergency.financial_resources import EMERGENCY_CONTACTS, get_emergency_contacts
+
+def legacy_get_emergency_contacts(situation_text: str, region="india"):
+    """The implementation before the compiled matcher, kept for comparison."""
+    contacts = {}
+    situation_lower = situation_text.lower()
+    vehicle_terms = ["car", "vehicle", "bike", "scooter", "motorcycle"]
+    theft_terms = ["stolen", "theft", "robbery", "fraud", "scam", "cheated"]
+    lost_terms = ["lost", "missing"]
+    if any(term in situation_lower for term in theft_terms) or (
+        any(v in situation_lower for v in vehicle_terms) and any(l in situation_lower for l in lost_terms)
+    ):
+        contacts["Police"] = EMERGENCY_CONTACTS["police"].get(region, EMERGENCY_CONTACTS["police"]["general"])
+    if any(word in situation_lower for word in ["medical", "hospital", "health", "accident", "injury", "emergency"]):
+        contacts["Ambulance"] = EMERGENCY_CONTACTS["ambulance"].get(region, EMERGENCY_CONTACTS["ambulance"]["general"])
+    if any(word in situation_lower for word in ["fraud", "scam", "cheated", "consumer"]):
+        contacts["Consumer Helpline"] = EMERGENCY_CONTACTS["consumer_helpline"].get(region, EMERGENCY_CONTACTS["consumer_helpline"]["general"])
+    return contacts
+
+MISFIRE_CASES = [
+    "I have a scar from an old surgery and my salary is delayed",
+    "I want to build an emergency fund",
+    "my career is stuck and my EMI is due",
+    "lost interest in my carpool savings plan",
+    "health insurance renewal is expensive",
+    "my bike was stolen",
+    "meri scooty chori ho gayi",
+]
+
+def bank_statement(rng, lines):
+    merchants = ["GROCERY MART", "UPI/ZOMATO", "NEFT SALARY", "EMI HDFC LOAN", "ATM WDL", "CARD POS FUEL",
+                 "IMPS TRANSFER", "ELECTRICITY BILL", "MOBILE RECHARGE", "RENT TRANSFER"]
+    rows = []
+    for day in range(lines):
+        rows.append(f"{day % 28 + 1:02d}-09-2026  {rng.choice(merchants)}  {rng.randint(100, 90000)}.00 DR  BAL {rng.randint(0, 200000)}.00")
+    rows.append("Note: someone used my card, I think it was a fraud transaction")
+    return "\n".join(rows)
+
+def time_call(fn, text, min_seconds=0.2):
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn(text)
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+def main():
+    get_emergency_contacts("warm up")
+    print("Trigger differences (legacy -> compiled):")
+    for text in MISFIRE_CASES:
+        print(f"  {text!r}: {sorted(legacy_get_emergency_contacts(text))} -> {sorted(get_emergency_contacts(text))}")
+
+    rng = random.Random(3)
+    inputs = {
+        "short message": "Salary delayed, EMI pending and my bike was stolen",
+        "chat log (~10 KB)": " ".join(["I am worried about money and my bills this month."] * 200),
+        "bank statement (~100 KB)": bank_statement(rng, 1600),
+        "bank statement (~1 MB)": bank_statement(rng, 16000),
+    }
+    print(f"\n{'input':<26} {'chars':>9} {'legacy us':>11} {'compiled us':>12}")
+    for name, text in inputs.items():
+        legacy = time_call(legacy_get_emergency_contacts, text)
+        compiled = time_call(get_emergency_contacts, text)
+        print(f"{name:<26} {len(text):>9} {legacy * 1e6:>11.1f} {compiled * 1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main()
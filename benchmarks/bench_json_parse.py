@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: the previous greedy-regex safe_json_parse vs the
+safe_json_parse now in utils.json_formatter (C fast path plus the
+single-pass IncrementalJSONParser for damaged or streamed output).
+
+    python -m benchmarks.bench_json_parse
+"""
+import json
+import re
+import time
+
+from benchmarks.fake_groq import SAMPLE_PLAN
+from utils.json_formatter import IncrementalJSONParser, safe_json_parse
+
+def regex_json_parse(text: str):
+    """The implementation safe_json_parse used before the incremental parser."""
+    try:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if match:
+            return json.loads(match.group())
+    except Exception:
+        pass
+    return {"error": "Invalid JSON from LLM", "raw_output": text}
+
+def build_cases():
+    plan = json.dumps(SAMPLE_PLAN, indent=2)
+    large = dict(SAMPLE_PLAN, action_steps=SAMPLE_PLAN["action_steps"] * 400)
+    return {
+        "valid plan": plan,
+        "large plan (~%d KB)" % (len(json.dumps(large)) // 1024): json.dumps(large),
+        "prose with braces": "Here is the plan {as requested}:\n" + plan + "\nHope it helps {user}!",
+        "trailing commas": plan.replace('"medium"\n    }', '"medium",\n    }').replace("}\n  ],", "},\n  ],"),
+        "truncated (no closing)": plan[: len(plan) - 60],
+        "unbalanced '{' x 20000": "{" * 20000 + " oops",
+    }
+
+def time_call(fn, text, min_seconds=0.2):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        result = fn(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs, result
+
+def ok(result):
+    return "error" not in result and "action_steps" in result
+
+def streamed_regex(text, chunk=12):
+    # Without an incremental parser the only option is re-parsing the prefix
+    result = None
+    for end in range(chunk, len(text) + chunk, chunk):
+        result = regex_json_parse(text[:end])
+    return result
+
+def streamed_incremental(text, chunk=12):
+    parser = IncrementalJSONParser()
+    for start in range(0, len(text), chunk):
+        parser.feed(text[start:start + chunk])
+    parser.finish()
+    return parser.value or {"error": "no object"}
+
+def main():
+    print(f"{'case':<26} {'regex us':>10} {'ok':>4} {'new us':>15} {'ok':>4}")
+    for name, text in build_cases().items():
+        regex_seconds, regex_result = time_call(regex_json_parse, text)
+        new_seconds, new_result = time_call(safe_json_parse, text)
+        print(f"{name:<26} {regex_seconds * 1e6:>10.1f} {'yes' if ok(regex_result) else 'no':>4} "
+              f"{new_seconds * 1e6:>15.1f} {'yes' if ok(new_result) else 'no':>4}")
+
+    plan = json.dumps(SAMPLE_PLAN, indent=2)
+    regex_seconds, _ = time_call(streamed_regex, plan)
+    new_seconds, _ = time_call(streamed_incremental, plan)
+    print(f"\nstreamed in 12-char chunks ({len(plan)} chars): "
+          f"regex re-parse {regex_seconds * 1e3:.2f} ms, incremental {new_seconds * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    main()
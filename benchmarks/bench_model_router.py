@@ -0,0 +1,148 @@
+"""
+Model router: latency per kind of request with routing on vs off, against
+the fake Groq server with a slow large model and a fast small model that
+sometimes returns a cut-off reply (escalated to the large model).
+
+Checks: every kind is routed to the tier it must get; in particular a
+short message with a danger term ("I want to end my life") goes to the
+large model.
+
+    python -m benchmarks.bench_model_router --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8909
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+
+# (kind, user_input, emergency)
+REQUEST_KINDS = [
+    ("danger", "salary delayed, I want to end my life", False),
+    ("short", "Salary delayed, EMI pending", False),
+    ("short", "Rent is due and I am short this month", False),
+    ("high_severity", "I got scammed, money stolen from my account", False),
+    ("emergency", "Salary delayed, EMI pending", True),
+    ("long", "My salary has been delayed for two months now, the EMI on my home loan is pending, "
+             "my landlord wants the rent and I also have to pay school fees for my kids next week", False),
+]
+
+# Tier each kind must be routed to
+EXPECTED_TIERS = {"danger": "large", "short": "small", "high_severity": "large", "emergency": "large", "long": "large"}
+
+def route_checks():
+    from agent.state import AgentState
+    from llm.router import plan_route
+    from nodes.preclassifier_node import classify_financial
+
+    checks = {}
+    print("routing:")
+    for kind, user_input, emergency in REQUEST_KINDS:
+        state = AgentState(user_input=user_input, emergency=emergency)
+        state.classification = classify_financial(user_input)
+        route = plan_route(state)
+        name = f"{kind}: {user_input[:40]!r}"
+        checks[name] = route.tier == EXPECTED_TIERS[kind]
+        print(f"  {name} -> {route.reason} ({route.tier}): {'ok' if checks[name] else 'FAIL'}")
+    return checks
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+def fake_stats():
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()
+
+def reset_fake(models):
+    import httpx
+
+    httpx.post(f"{FAKE_URL}/_fake/config", json={"models": models}).raise_for_status()
+
+async def run(requests: int, concurrency: int):
+    from agent.agent_runner import arun_agent
+    from agent.state import AgentState
+    from nodes.reasoning_node import create_default_response
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies = {kind: [] for kind, _, _ in REQUEST_KINDS}
+    fallbacks = 0
+
+    async def one(number):
+        nonlocal fallbacks
+        kind, user_input, emergency = REQUEST_KINDS[number % len(REQUEST_KINDS)]
+        state = AgentState(user_input=f"{user_input} (request {number})", emergency=emergency)
+        async with gate:
+            start = time.perf_counter()
+            final_state = await arun_agent(state)
+            latencies[kind].append(time.perf_counter() - start)
+        fallbacks += final_state.output == create_default_response()
+
+    await asyncio.gather(*(one(number) for number in range(requests)))
+    return latencies, fallbacks
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--large-latency", type=float, default=2.0)
+    parser.add_argument("--small-latency", type=float, default=0.4)
+    parser.add_argument("--small-malformed-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+
+    import llm.router as router
+    from config.settings import MODEL_NAME, SMALL_MODEL_NAME
+    from llm.groq_client import close_async_client
+    from llm.response_cache import response_cache
+    from utils.metrics import ROUTER_ESCALATIONS
+
+    models = {
+        MODEL_NAME: {"latency": args.large_latency},
+        SMALL_MODEL_NAME: {"latency": args.small_latency, "malformed_rate": args.small_malformed_rate,
+                           "malformed_kind": "truncated"},
+    }
+    checks = route_checks()
+    fake_server = start_fake_groq(args.large_latency, FAKE_PORT, latency_dist="lognormal", jitter=0.3,
+                                  models=models, seed=3)
+    try:
+        for enabled in (False, True):
+            router.MODEL_ROUTER_ENABLED = enabled
+            response_cache.clear()
+            reset_fake(models)
+            escalations_before = ROUTER_ESCALATIONS.value(task="plan")
+
+            async def measure():
+                try:
+                    return await run(args.requests, args.concurrency)
+                finally:
+                    await close_async_client()
+
+            latencies, fallbacks = asyncio.run(measure())
+            stats = fake_stats()
+            print(f"\nrouter {'on' if enabled else 'off'}: calls per model {stats['by_model']}, "
+                  f"escalations {ROUTER_ESCALATIONS.value(task='plan') - escalations_before:.0f}, "
+                  f"fallbacks {fallbacks}")
+            print(f"{'kind':>14} {'p50':>8} {'p95':>8}")
+            for kind, values in latencies.items():
+                print(f"{kind:>14} {statistics.median(values) * 1000:>6.0f}ms "
+                      f"{percentile(values, 95) * 1000:>6.0f}ms")
+    finally:
+        fake_server.terminate()
+
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
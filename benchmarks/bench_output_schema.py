@@ -0,0 +1,259 @@
+"""
+Output schema (llm/output_schema.py): what validating a reply costs, and
+how many replies end in the fallback plan with and without repair.
+
+Validation cost per reply, for a valid plan, a drifted (invalid) plan and
+a Need Help alternative:
+
+- hand-written: the key-by-key checks reasoning_node used before
+- jsonschema.validate: the library called per reply, schema checked each time
+- Draft7Validator: jsonschema compiled once
+- compiled: is_valid_output, the schema compiled to plain Python checks
+- repair: repair_plan on the same reply
+
+Fallback rate runs a seeded corpus of replies (clean, drifted as in
+benchmarks/fake_groq.py, truncated, prose) through three pipelines, with
+no escalation (as on a route already on the large model):
+
+- before: safe_json_parse, then missing keys filled; no type checks, so
+  malformed plans reach the UI ("leaked")
+- schema, no repair: parsed replies must validate as they are
+- schema + repair: parse_llm_output, as the reasoning node does now
+
+The compiled validator must agree with jsonschema on every reply, and
+enum repair must not pick a value out of the prompt's own template
+("low/medium/high" echoed back) while still mapping a single word
+("High", "critical") to its member.
+
+    python -m benchmarks.bench_output_schema --replies 2000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+
+import jsonschema
+
+from benchmarks.fake_groq import SAMPLE_PLAN, drifted_plan
+from config.settings import OPTIMAL_STEPS
+from llm.output_schema import (
+    DEFINITIONS,
+    SCHEMA,
+    _REFERENCE_VALIDATORS,
+    _inline,
+    is_valid_output,
+    output_errors,
+    repair_plan,
+)
+from utils.metrics import OUTPUT_REPAIRS
+from nodes.reasoning_node import get_default_action_steps, get_default_calming_steps, parse_llm_output
+from utils.json_formatter import safe_json_parse
+
+SEVERITIES = {"low", "medium", "high"}
+PROSE = "Sure! Here is a plan: call your bank, pay the urgent bills first and breathe."
+
+def old_is_valid_plan(parsed, steps: int = 1) -> bool:
+    """The checks is_valid_plan made before the schema."""
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return False
+    if parsed.get("not_financial"):
+        return True
+    action_steps = parsed.get("action_steps")
+    return (
+        isinstance(parsed.get("crisis_type"), str)
+        and parsed.get("severity") in SEVERITIES
+        and isinstance(parsed.get("mood"), str)
+        and isinstance(parsed.get("calming_steps"), list)
+        and isinstance(action_steps, list)
+        and len(action_steps) >= steps
+        and all(isinstance(step, dict) and isinstance(step.get("step"), str) for step in action_steps)
+    )
+
+def old_complete_plan(parsed):
+    """The missing-key filling complete_plan did before the schema."""
+    if isinstance(parsed, dict) and parsed.get("not_financial"):
+        return parsed
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return None
+    defaults = {
+        "crisis_type": "Financial crisis requiring attention",
+        "severity": "medium",
+        "mood": "overwhelmed",
+        "calming_steps": get_default_calming_steps(),
+        "action_steps": get_default_action_steps(),
+        "final_advice": "Take it one step at a time.",
+        "needs_emergency_support": False,
+    }
+    for key, value in defaults.items():
+        parsed.setdefault(key, value)
+    return parsed
+
+def time_call(fn, value, min_seconds=0.2):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn(value)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+def validation_cost():
+    plan_schema = _inline(SCHEMA["definitions"]["plan"])
+    alternative_schema = _inline(SCHEMA["definitions"]["alternative"])
+    plan = json.loads(json.dumps(SAMPLE_PLAN))
+    drifted = drifted_plan(plan, random.Random(3))
+    alternative = {"alternative_step": "Call the bank and ask only for the due date", "priority": "high",
+                   "estimated_time_minutes": 5}
+
+    def library_validate(schema):
+        def validate(value):
+            try:
+                jsonschema.validate(value, schema)
+            except jsonschema.ValidationError:
+                pass
+        return validate
+
+    cases = {
+        "valid plan": (plan, "plan", plan_schema),
+        "drifted plan": (drifted, "plan", plan_schema),
+        "alternative": (alternative, "alternative", alternative_schema),
+    }
+    print(f"validation cost per reply (us):\n{'case':<14} {'hand-written':>13} {'jsonschema.validate':>20} "
+          f"{'Draft7Validator':>16} {'compiled':>9} {'repair':>8}")
+    for name, (value, definition, schema) in cases.items():
+        hand = time_call(old_is_valid_plan, value) if definition == "plan" else None
+        library = time_call(library_validate(schema), value)
+        reference = time_call(_REFERENCE_VALIDATORS[definition].is_valid, value)
+        compiled = time_call(lambda value: is_valid_output(definition, value), value)
+        repair = time_call(lambda value: repair_plan(value, OPTIMAL_STEPS), value) if definition == "plan" else None
+        print(f"{name:<14} {'-' if hand is None else f'{hand * 1e6:.1f}':>13} {library * 1e6:>20.1f} "
+              f"{reference * 1e6:>16.1f} {compiled * 1e6:>9.1f} {'-' if repair is None else f'{repair * 1e6:.1f}':>8}")
+
+def make_corpus(count: int, mix, seed: int):
+    """[(kind, raw reply)], kinds drawn with the weights in mix."""
+    rng = random.Random(seed)
+    clean = json.dumps(SAMPLE_PLAN)
+    corpus = []
+    for _ in range(count):
+        kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+        if kind == "drift":
+            raw = json.dumps(drifted_plan(SAMPLE_PLAN, rng))
+        elif kind == "truncated":
+            raw = clean[:rng.randint(len(clean) // 4, len(clean) - 2)]
+        elif kind == "prose":
+            raw = PROSE
+        else:
+            raw = clean
+        corpus.append((kind, raw))
+    return corpus
+
+def fallback_rates(corpus):
+    kinds = sorted({kind for kind, _ in corpus})
+    rows = {name: {kind: [0, 0] for kind in kinds + ["all"]}
+            for name in ("before: fallback", "before: leaked", "schema, no repair", "schema + repair")}
+    escalations = {"before": 0, "schema + repair": 0}
+    disagreements = leaks = 0
+
+    for kind, raw in corpus:
+        before = old_complete_plan(safe_json_parse(raw))
+        strict = safe_json_parse(raw)
+        repaired = repair_plan(safe_json_parse(raw), OPTIMAL_STEPS)
+        served = parse_llm_output(raw, OPTIMAL_STEPS)
+        leaks += served is not None and not is_valid_output("plan", served)
+        outcomes = {
+            "before: fallback": before is None,
+            "before: leaked": before is not None and not is_valid_output("plan", before),
+            "schema, no repair": not is_valid_output("plan", strict),
+            "schema + repair": served is None,
+        }
+        for name, hit in outcomes.items():
+            for bucket in (kind, "all"):
+                rows[name][bucket][0] += hit
+                rows[name][bucket][1] += 1
+        escalations["before"] += not old_is_valid_plan(safe_json_parse(raw), OPTIMAL_STEPS)
+        escalations["schema + repair"] += not (is_valid_output("plan", repaired)
+                                               and len(repaired["action_steps"]) >= OPTIMAL_STEPS)
+        for value in (strict, repaired, before):
+            if is_valid_output("plan", value) != (not output_errors("plan", value)):
+                disagreements += 1
+
+    print(f"\nreplies ending in the fallback plan (or leaking malformed), {len(corpus)} replies:")
+    print(f"{'pipeline':<20}" + "".join(f"{kind:>11}" for kind in kinds + ["all"]))
+    for name, buckets in rows.items():
+        print(f"{name:<20}" + "".join(
+            f"{hits / total:>10.1%} " if total else f"{'-':>11}" for hits, total in buckets.values()
+        ))
+    print(f"\nwould escalate to the large model (small-model routes): "
+          f"before {escalations['before'] / len(corpus):.1%}, "
+          f"schema + repair {escalations['schema + repair'] / len(corpus):.1%}")
+    return rows, disagreements, leaks
+
+def enum_repairs():
+    """{check name: ok} for enum fields echoed from the prompt template or written as a synonym."""
+    plan = DEFINITIONS["plan"]["properties"]
+    step = DEFINITIONS["action_step"]["properties"]
+    cases = {
+        "template_severity": ("severity", "low/medium/high", plan["severity"]["default"]),
+        "template_mood": ("mood", "calm/panic/anxious/depressed/angry/overwhelmed", plan["mood"]["default"]),
+        "two_severities": ("severity", "low to medium", plan["severity"]["default"]),
+        "single_severity": ("severity", "High", "high"),
+        "alias_severity": ("severity", "critical", "high"),
+        "alias_mood": ("mood", "Panicking", "panic"),
+    }
+    checks = {}
+    print("\nenum repair:")
+    for name, (field, value, expected) in cases.items():
+        before = OUTPUT_REPAIRS.value(schema="plan", field=field)
+        repaired = repair_plan({**json.loads(json.dumps(SAMPLE_PLAN)), field: value}, OPTIMAL_STEPS)
+        counted = OUTPUT_REPAIRS.value(schema="plan", field=field) - before
+        checks[name] = repaired[field] == expected and counted == 1
+        print(f"  {field} {value!r} -> {repaired[field]!r} (repairs counted {counted:g}): "
+              f"{'ok' if checks[name] else 'FAIL'}")
+
+    echoed = json.loads(json.dumps(SAMPLE_PLAN))
+    echoed["action_steps"][0]["priority"] = "high/medium"
+    repaired = repair_plan(echoed, OPTIMAL_STEPS)
+    checks["template_step_priority"] = repaired["action_steps"][0]["priority"] == step["priority"]["default"]
+    print(f"  action step priority 'high/medium' -> {repaired['action_steps'][0]['priority']!r}: "
+          f"{'ok' if checks['template_step_priority'] else 'FAIL'}")
+    return checks
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--drift", type=float, default=0.20)
+    parser.add_argument("--truncated", type=float, default=0.05)
+    parser.add_argument("--prose", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    validation_cost()
+    mix = {"drift": args.drift, "truncated": args.truncated, "prose": args.prose}
+    mix["clean"] = max(0.0, 1.0 - sum(mix.values()))
+    rows, disagreements, leaks = fallback_rates(make_corpus(args.replies, mix, args.seed))
+
+    def rate(name):
+        hits, total = rows[name]["all"]
+        return hits / total
+
+    enum_checks = enum_repairs()
+
+    checks = {
+        **enum_checks,
+        "agreement": disagreements == 0,
+        "no_leaks": leaks == 0,
+        "fewer_fallbacks": rate("schema + repair") < rate("schema, no repair"),
+    }
+    print(f"\ncompiled vs jsonschema disagreements: {disagreements}")
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
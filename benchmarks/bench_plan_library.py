@@ -0,0 +1,172 @@
+"""
+Plan library: how much traffic it answers without the reasoning LLM call,
+and what that does to latency.
+
+Coverage runs on the financial inputs in
+benchmarks/data/preclassifier_samples.jsonl, at a few confidence
+thresholds. Latency runs the same inputs through the agent against the
+fake Groq server, three ways: library off (every plan from the LLM),
+library on, and library on with personalization (one small-model call
+per library plan). "covered p50" is the latency of the inputs the library
+answers at the default threshold.
+
+Checks: the library refuses messages a generic plan would get wrong (a
+danger to life, a negation, something the matched terms don't cover) and
+still serves plain ones.
+
+    python -m benchmarks.bench_plan_library --latency 2.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8913
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+THRESHOLDS = (0.74, 0.85, 0.95)
+
+# Must go to the LLM
+REFUSED = (
+    "my salary is delayed and I am thinking of ending my life",
+    "my car was stolen with my kid inside",
+    "my car was not stolen but my house was robbed",
+    "salary not delayed but EMI bounced",
+    "I lost my phone and the thief is threatening to kill me",
+)
+# Must be served from the library
+SERVED = (
+    "my bike got stolen",
+    "Salary delayed, EMI pending",
+    "someone hacked my bank account",
+)
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+def coverage(texts):
+    import llm.plan_library as library
+    from config.settings import OPTIMAL_STEPS
+    from nodes.preclassifier_node import classify_financial
+
+    print(f"coverage of {len(texts)} financial sample inputs:")
+    default = library.PLAN_LIBRARY_MIN_CONFIDENCE
+    for threshold in THRESHOLDS:
+        library.PLAN_LIBRARY_MIN_CONFIDENCE = threshold
+        categories = Counter(
+            library.library_category(classify_financial(text), text, OPTIMAL_STEPS) for text in texts
+        )
+        served = len(texts) - categories.pop(None, 0)
+        marker = " (default)" if threshold == default else ""
+        print(f"  min confidence {threshold}{marker}: {served}/{len(texts)} served ({served / len(texts):.0%}) "
+              f"{dict(categories.most_common())}")
+    library.PLAN_LIBRARY_MIN_CONFIDENCE = default
+
+def refusal_checks():
+    import llm.plan_library as library
+    from config.settings import OPTIMAL_STEPS
+    from nodes.preclassifier_node import classify_financial
+
+    checks = {}
+    print("\nrefusal checks:")
+    for text, expected in [(text, False) for text in REFUSED] + [(text, True) for text in SERVED]:
+        classification = classify_financial(text)
+        category = library.library_category(classification, text, OPTIMAL_STEPS)
+        name = f"{'served' if expected else 'refused'}: {text!r}"
+        checks[name] = (category is not None) == expected
+        print(f"  {name} -> {category} (coverage {library.term_coverage(classification, text):.2f}, "
+              f"guards {sorted(classification['guards'])}): {'ok' if checks[name] else 'FAIL'}")
+    return checks
+
+def fake_requests() -> int:
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()["requests"]
+
+def reset_fake(models):
+    import httpx
+
+    httpx.post(f"{FAKE_URL}/_fake/config", json={"models": models}).raise_for_status()
+
+async def run(texts, concurrency: int):
+    from agent.agent_runner import arun_agent
+    from agent.state import AgentState
+    from llm.groq_client import close_async_client
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies = {}
+
+    async def one(text):
+        async with gate:
+            start = time.perf_counter()
+            await arun_agent(AgentState(user_input=text))
+            latencies[text] = time.perf_counter() - start
+
+    try:
+        await asyncio.gather(*(one(text) for text in texts))
+    finally:
+        await close_async_client()
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--small-latency", type=float, default=0.4)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+
+    # Imports settings: only after the environment above is set
+    from benchmarks.eval_preclassifier import load_samples
+
+    texts = [sample["text"] for sample in load_samples() if sample["label"] == "financial"]
+    coverage(texts)
+    checks = refusal_checks()
+
+    import llm.plan_library as library
+    import nodes.reasoning_node as reasoning
+    from config.settings import MODEL_NAME, SMALL_MODEL_NAME, OPTIMAL_STEPS
+    from llm.response_cache import response_cache
+    from nodes.preclassifier_node import classify_financial
+
+    covered = {text for text in texts if library.library_category(classify_financial(text), text, OPTIMAL_STEPS)}
+
+    models = {MODEL_NAME: {"latency": args.latency}, SMALL_MODEL_NAME: {"latency": args.small_latency}}
+    fake_server = start_fake_groq(args.latency, FAKE_PORT, models=models)
+    modes = {
+        "library off": (False, False),
+        "library on": (True, False),
+        "library + personalize": (True, True),
+    }
+    print(f"\n{len(texts)} requests, concurrency {args.concurrency}, fake Groq "
+          f"{args.latency}s (large) / {args.small_latency}s (small):")
+    print(f"{'mode':>22} {'p50':>8} {'p95':>8} {'mean':>8} {'covered p50':>12} {'Groq calls':>11}")
+    try:
+        for name, (enabled, personalize) in modes.items():
+            library.PLAN_LIBRARY_ENABLED = enabled
+            reasoning.PLAN_LIBRARY_PERSONALIZE = personalize
+            response_cache.clear()
+            reset_fake(models)
+            by_text = asyncio.run(run(texts, args.concurrency))
+            latencies = list(by_text.values())
+            covered_p50 = statistics.median(by_text[text] for text in covered)
+            print(f"{name:>22} {statistics.median(latencies) * 1000:>6.0f}ms "
+                  f"{percentile(latencies, 95) * 1000:>6.0f}ms {statistics.mean(latencies) * 1000:>6.0f}ms "
+                  f"{covered_p50 * 1000:>10.1f}ms {fake_requests():>11}")
+    finally:
+        fake_server.terminate()
+
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
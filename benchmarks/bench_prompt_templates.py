@@ -0,0 +1,179 @@
+"""
+Prompt templates (llm/prompts.py): what building the reasoning prompt
+costs and how much of each request a provider prefix cache can reuse.
+
+Before, the reasoning prompt was one f-string rebuilt per call with the
+user's message near the top, sent after a one-line system message; after,
+the rules are a fixed system message and only the message, step count and
+conversation context go in the user message.
+
+For the financial inputs in benchmarks/data/preclassifier_samples.jsonl:
+
+- build: time per reasoning prompt, old f-string vs REASONING_PROMPT.render
+- prompt tokens: whole prompt per request (utils/tokens.py estimate)
+- shared prefix: tokens at the start of the request identical to the
+  previous request, which a prefix cache can serve
+- uncached: prompt tokens minus shared prefix
+
+The reasoning system message must be byte-identical on every request.
+
+    python -m benchmarks.bench_prompt_templates
+"""
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+
+import llm.alternatives  # noqa: F401 (registers its templates)
+from agent.state import AgentState
+from config.settings import OPTIMAL_STEPS
+from llm.prompts import prompt_messages, template_report
+from nodes.reasoning_node import _reasoning_prompt
+from utils.tokens import count_tokens
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "preclassifier_samples.jsonl")
+
+def old_reasoning_prompt(state: AgentState) -> str:
+    """The reasoning prompt before templates (user message first, rules after)."""
+    max_steps = 7 if state.emergency else 5
+    steps = min(state.steps, max_steps)
+    conversation = f"""
+Conversation so far (the new message may follow up on it; plan for the new message in light of it):
+{state.context}
+""" if state.context else ""
+
+    prompt = f"""
+You are a FINANCIAL CRISIS support assistant. You ONLY help with FINANCIAL and MONEY-RELATED problems.
+{conversation}
+User message:
+{state.user_input}
+
+IMPORTANT RULES:
+1. These are FINANCIAL problems - ALWAYS ACCEPT and provide help:
+   - Lost/stolen car, vehicle, bike → insurance claims, loan EMI, transportation costs, police report
+   - Lost/stolen phone, laptop, jewelry → replacement costs, insurance, financial recovery
+   - Salary delayed, not paid → EMI issues, bill payments, budget crisis
+   - Loan, debt, EMI problems → payment difficulties, restructuring
+   - Medical bills, hospital expenses → payment plans, insurance
+   - Lost job, unemployment → income loss, expense management
+   - Fraud, scam, money stolen → recovery, police report, financial restoration
+   - Rent payment issues → eviction concerns, negotiation
+   - Business loss, bankruptcy → debt management, recovery
+
+2. ONLY reject if problem is purely personal with NO financial aspect:
+   - Pure relationship issues (no money involved)
+   - General health complaints (no medical bills)
+   - Emotional/mental health (unless causing job/income loss)
+
+   For non-financial, respond:
+   {{
+       "not_financial": true,
+       "redirect_message": "Main financial crisis situations me help karta hu. Apni financial problem batao."
+   }}
+
+3. For ALL FINANCIAL problems, provide this JSON with EXACTLY {steps} action steps:
+{{
+    "crisis_type": "specific financial issue (e.g., 'Vehicle theft impacting insurance and transportation costs')",
+    "severity": "low/medium/high",
+    "mood": "calm/panic/anxious/depressed/angry/overwhelmed",
+    "calming_steps": [
+        {{
+            "instruction": "Take 5 deep breaths - we will solve this step by step",
+            "type": "breathing",
+            "duration_seconds": 20
+        }}
+    ],
+    "action_steps": [
+        {{
+            "step": "Short, basic, calming action step (one sentence)",
+            "priority": "high/medium",
+            "estimated_time_minutes": 20
+        }}
+    ],
+    "needs_emergency_support": false,
+    "final_advice": "Supportive message"
+}}
+
+CRITICAL:
+- Lost car/vehicle = FINANCIAL CRISIS (insurance, loan, transport costs)
+- Lost valuables = FINANCIAL CRISIS (replacement, insurance)
+- Detect the user's mood from their message and provide calming steps that match it.
+- Keep steps short, gentle, and basic. Avoid harsh or overwhelming language.
+- Provide ONLY 1-2 calming steps and EXACTLY {steps} action steps.
+"""
+
+    return prompt
+
+def load_states():
+    with open(SAMPLES_PATH, encoding="utf-8") as file:
+        samples = [json.loads(line) for line in file if line.strip()]
+    return [
+        AgentState(user_input=sample["text"], steps=OPTIMAL_STEPS)
+        for sample in samples if sample["label"] == "financial"
+    ]
+
+def request_text(prompt) -> str:
+    """The messages in the order the provider sees them."""
+    return "\n".join(message["content"] for message in prompt_messages(prompt))
+
+def build_cost(build, states, min_seconds=0.3):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        for state in states:
+            build(state)
+        runs += len(states)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+def token_rows(build, states):
+    """(prompt tokens, shared prefix tokens) per request, in order."""
+    rows = []
+    previous = ""
+    for state in states:
+        text = request_text(build(state))
+        shared = len(os.path.commonprefix([previous, text]))
+        rows.append((count_tokens(text), count_tokens(text[:shared])))
+        previous = text
+    return rows
+
+def main():
+    states = load_states()
+
+    print("templates (fixed parts, estimated tokens):")
+    print(f"{'template':<14} {'system':>8} {'user template':>14}")
+    for name, report in template_report().items():
+        print(f"{name:<14} {report['system_tokens']:>8} {report['user_template_tokens']:>14}")
+
+    builders = {
+        "before": old_reasoning_prompt,
+        "after": _reasoning_prompt,
+    }
+    print(f"\nreasoning prompt, {len(states)} financial sample inputs:")
+    print(f"{'':<8} {'build (us)':>11} {'prompt tokens':>14} {'shared prefix':>14} {'uncached':>9}")
+    results = {}
+    for name, build in builders.items():
+        cost = build_cost(build, states)
+        rows = token_rows(build, states)[1:]
+        total = statistics.mean(tokens for tokens, _ in rows)
+        shared = statistics.mean(prefix for _, prefix in rows)
+        results[name] = total - shared
+        print(f"{name:<8} {cost * 1e6:>11.1f} {total:>14.0f} {shared:>14.0f} {total - shared:>9.0f}")
+
+    systems = {_reasoning_prompt(state).system for state in states}
+    checks = {
+        "stable_system_message": len(systems) == 1,
+        "uncached_tokens_down": results["after"] < results["before"] / 4,
+    }
+    print()
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Semantic cache benchmarks.
+
+1. Hit rate vs threshold on benchmarks/data/semantic_corpus.json: the seeds are
+   indexed, each query is looked up, and a hit counts as correct when the seed
+   it matched has the same category. Run once with every entry in one
+   partition (unscoped) and once partitioned by semantic_scope() of the
+   pre-classifier result, as the reasoning node does.
+2. Near misses: the corpus "negatives" pairs look alike but need a different
+   plan (another crisis, a negation, a danger to life). A pair is served
+   wrongly when the query would get the seed's plan.
+3. Batched top-k search latency on a synthetic index (default 100k entries).
+
+Checks: no near miss is served at SEMANTIC_CACHE_THRESHOLD with scoping,
+and a batched search stays under SEARCH_BUDGET_MS per query. The latency
+index puts every entry in one partition, the worst case for scoping.
+
+    python -m benchmarks.bench_semantic_cache --entries 100000 --batch 64
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from config.settings import SEMANTIC_CACHE_THRESHOLD
+from llm.semantic_cache import SemanticCache, semantic_scope
+from nodes.preclassifier_node import classify_financial
+
+SEARCH_BUDGET_MS = 1.0
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "semantic_corpus.json")
+
+def scope_of(text: str):
+    return semantic_scope(classify_financial(text))
+
+def threshold_report(corpus, thresholds):
+    for scoped in (False, True):
+        cache = SemanticCache(max_entries=len(corpus["seeds"]))
+        for seed in corpus["seeds"]:
+            scope = scope_of(seed["text"]) if scoped else ""
+            if scope is not None:
+                cache.add(seed["text"], 5, False, scope, {"category": seed["category"]})
+
+        queries = corpus["queries"]
+        scopes = [scope_of(q["text"]) if scoped else "" for q in queries]
+        vectors = cache.vectorizer.transform([q["text"] for q in queries])
+        # No scope means no lookup: a partition id no entry has
+        partitions = np.array([cache._partition(5, False, scope) if scope is not None else -2 for scope in scopes],
+                              dtype=np.int32)
+        indices, scores = cache.search(vectors, partitions, k=1)
+        matched = [json.loads(cache._values[i])["category"] if i >= 0 else None for i in indices[:, 0]]
+
+        print(f"\n{'scoped' if scoped else 'unscoped'} ({cache._size} of {len(corpus['seeds'])} seeds indexed)")
+        print(f"{'threshold':>9} {'hit_rate':>9} {'correct':>8} {'wrong':>6} {'precision':>9}")
+        for threshold in thresholds:
+            hits = scores[:, 0] >= threshold
+            correct = sum(1 for q, m, h in zip(queries, matched, hits) if h and q["category"] == m)
+            wrong = int(hits.sum()) - correct
+            precision = correct / hits.sum() if hits.sum() else 1.0
+            print(f"{threshold:>9.2f} {hits.mean():>9.2%} {correct:>8} {wrong:>6} {precision:>9.2%}")
+
+def near_miss_report(corpus, thresholds, threshold):
+    """Prints the near-miss table; returns the pairs served wrongly at `threshold` with scoping."""
+    pairs = corpus["negatives"]
+    vectorizer = SemanticCache(max_entries=1).vectorizer
+    seeds = vectorizer.transform([pair["seed"] for pair in pairs])
+    queries = vectorizer.transform([pair["query"] for pair in pairs])
+    scores = np.einsum("ij,ij->i", seeds, queries)
+    same_scope = np.array([
+        scope_of(pair["query"]) is not None and scope_of(pair["query"]) == scope_of(pair["seed"])
+        for pair in pairs
+    ])
+
+    print(f"\nnear misses ({len(pairs)} pairs), wrongly served:")
+    print(f"{'threshold':>9} {'unscoped':>9} {'scoped':>7}")
+    for value in thresholds:
+        print(f"{value:>9.2f} {int((scores >= value).sum()):>9} {int(((scores >= value) & same_scope).sum()):>7}")
+
+    print(f"\n{'score':>6} {'scope':>6}  query <- seed")
+    for pair, score, scoped in zip(pairs, scores, same_scope):
+        print(f"{score:>6.2f} {'same' if scoped else 'differ':>6}  {pair['query']!r} <- {pair['seed']!r}")
+    return [pair for pair, score, scoped in zip(pairs, scores, same_scope) if scoped and score >= threshold]
+
+def random_text(rng, vocabulary):
+    return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12)))
+
+def latency_report(corpus, entries, batch, k, rounds):
+    rng = random.Random(7)
+    vocabulary = sorted({w for item in corpus["seeds"] + corpus["queries"] for w in item["text"].lower().split()})
+
+    cache = SemanticCache(max_entries=entries)
+    chunk = 5000
+    for start in range(0, entries, chunk):
+        texts = [random_text(rng, vocabulary) for _ in range(min(chunk, entries - start))]
+        n = len(texts)
+        cache._vectors[start:start + n] = cache.vectorizer.transform(texts)
+        cache._partitions[start:start + n] = cache._partition(5, False, "")
+        cache._values[start:start + n] = ["{}"] * n
+        cache._size += n
+
+    queries = cache.vectorizer.transform([random_text(rng, vocabulary) for _ in range(batch)])
+    partitions = np.full(batch, cache._partition(5, False, ""), dtype=np.int32)
+
+    cache.search(queries, partitions, k=k, min_score=cache.threshold)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cache.search(queries, partitions, k=k, min_score=cache.threshold)
+    per_query_ms = (time.perf_counter() - start) / rounds / batch * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cache.vectorizer.transform(["my bike got stolen and emi is due"])
+    vectorize_ms = (time.perf_counter() - start) / rounds * 1000
+
+    print(f"\nentries={entries} dim={cache.vectorizer.n_features} batch={batch} k={k}")
+    print(f"search: {per_query_ms:.3f} ms/query (batched)")
+    print(f"vectorize: {vectorize_ms:.3f} ms/text")
+    return per_query_ms
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+    thresholds = [0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9]
+    threshold_report(corpus, thresholds)
+    served = near_miss_report(corpus, thresholds, SEMANTIC_CACHE_THRESHOLD)
+    per_query_ms = latency_report(corpus, args.entries, args.batch, args.k, args.rounds)
+
+    checks = {
+        f"near_misses_refused at {SEMANTIC_CACHE_THRESHOLD:g}": not served,
+        f"search_under_{SEARCH_BUDGET_MS:g}ms": per_query_ms < SEARCH_BUDGET_MS,
+    }
+    print()
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    for pair in served:
+        print(f"  served {pair['query']!r} <- {pair['seed']!r}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Session store (agent/session_store.py): write amplification of
+write-behind and the latency of resuming a session.
+
+Write amplification: SESSIONS sessions save at a steady total rate for a
+few seconds, as Streamlit reruns and timer events do (a chat message now
+and then, step and timer fields otherwise), into a SQLite store with:
+
+- write-through: every save is its own row write and commit
+- write-behind at two flush intervals
+
+Reported per mode: saves, rows written, commits, bytes written, rows per
+save and the time save() takes on the caller's thread.
+
+Resume: a store is filled with sessions of SESSION_MAX_MESSAGES messages
+and a conversation memory, then closed. A new store on the same file (a
+restarted pod) gets sessions back: cold (first get, read from the file),
+then hot (in process; one version lookup). Memory-backend gets for
+comparison. Also the payload size of a 200-message session with and
+without message compaction.
+
+Conflict: two stores on one file (two workers) load the same session and
+both save it. The second save is based on a version the first has
+replaced, so it must not overwrite it.
+
+Checks: write-behind at the default interval writes at most a third of
+the rows write-through does, a new store reads back the last save of
+every session, cold resume p99 stays under 5 ms, and a stale save from
+another store never overwrites a newer one (write-through and behind).
+
+    python -m benchmarks.bench_session_store --rate 1000 --seconds 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from agent.session_store import MemorySessionStore, Session, SQLiteSessionStore
+from config.settings import SESSION_FLUSH_INTERVAL_SECONDS, SESSION_MAX_MESSAGES
+from llm.plan_library import plan_library
+
+SESSIONS = 200
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+def message(number: int):
+    return {"role": "user" if number % 2 else "assistant",
+            "content": f"Message {number}: my salary is late again and the EMI is due on Friday", "emergency": False}
+
+def filled_session(session: Session, messages: int, rng: random.Random) -> Session:
+    plan = plan_library.plan(rng.choice(sorted(plan_library.categories)), 5)
+    for turn in range(5):
+        session.memory.add_turn(f"follow-up {turn}", plan)
+    session.ui = {
+        "messages": [message(number) for number in range(messages)],
+        "all_steps": plan["action_steps"],
+        "current_step_index": 0,
+        "user_situation": plan,
+        "timer_running": False,
+        "timer_remaining": 0,
+    }
+    return session
+
+def write_amplification(path: str, flush_interval: float, rate: float, seconds: float, seed: int):
+    rng = random.Random(seed)
+    store = SQLiteSessionStore(path, flush_interval=flush_interval)
+    sessions = [filled_session(store.get(f"s{number}"), 10, rng) for number in range(SESSIONS)]
+    save_seconds = []
+    last_saved = {}
+    started = time.perf_counter()
+    for count in range(int(rate * seconds)):
+        # Pace the saves at `rate` per second
+        delay = started + count / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        session = rng.choice(sessions)
+        if rng.random() < 0.1:
+            session.ui["messages"].append(message(len(session.ui["messages"])))
+        else:
+            session.ui["timer_remaining"] = rng.randint(0, 900)
+            session.ui["current_step_index"] = rng.randint(0, 4)
+        before = time.perf_counter()
+        store.save(session)
+        save_seconds.append(time.perf_counter() - before)
+        last_saved[session.session_id] = session.version
+    store.close()
+
+    check = SQLiteSessionStore(path)
+    durable = all(check.get(session_id).version == version for session_id, version in last_saved.items())
+    stats = store.stats()
+    return {
+        "saves": stats["saves"],
+        "rows": stats["writes"],
+        "commits": stats["flushes"],
+        "bytes": stats["bytes_written"],
+        "save_p50_us": percentile(save_seconds, 50) * 1e6,
+        "save_p99_us": percentile(save_seconds, 99) * 1e6,
+        "durable": durable,
+    }
+
+def resume_latency(path: str, count: int, seed: int):
+    rng = random.Random(seed)
+    store = SQLiteSessionStore(path, flush_interval=0)
+    memory_store = MemorySessionStore()
+    for number in range(count):
+        for target in (store, memory_store):
+            session = filled_session(target.get(f"r{number}"), SESSION_MAX_MESSAGES, random.Random(number))
+            target.save(session)
+    store.close()
+
+    restarted = SQLiteSessionStore(path)
+    ids = [f"r{number}" for number in rng.sample(range(count), min(count, 200))]
+    timings = {"cold": [], "hot": [], "memory backend": []}
+    for name, target in (("cold", restarted), ("hot", restarted), ("memory backend", memory_store)):
+        for session_id in ids:
+            before = time.perf_counter()
+            session = target.get(session_id)
+            timings[name].append(time.perf_counter() - before)
+            assert len(session.ui["messages"]) == SESSION_MAX_MESSAGES
+    return timings
+
+def conflict_check(path: str, flush_interval: float) -> bool:
+    first = SQLiteSessionStore(path, flush_interval=flush_interval)
+    second = SQLiteSessionStore(path, flush_interval=flush_interval)
+    session = first.get("shared")
+    session.ui["messages"] = ["first 1"]
+    first.save(session)
+    first.flush()
+
+    stale = second.get("shared")
+    session = first.get("shared")
+    session.ui["messages"].append("first 2")
+    first.save(session)
+    first.flush()
+    stale.ui["messages"].append("second 2")
+    second.save(stale)
+    second.flush()
+
+    resumed = second.get("shared").ui["messages"]
+    first.close()
+    second.close()
+    print(f"conflict, flush interval {flush_interval:g}s: second store sees {resumed}, "
+          f"conflicts {second.stats()['conflicts']}")
+    return resumed == ["first 1", "first 2"] and second.stats()["conflicts"] == 1
+
+def compaction_sizes(rng: random.Random):
+    session = filled_session(Session("c"), 200, rng)
+    uncompacted = len(session.to_record())
+    MemorySessionStore().save(session)
+    return uncompacted, len(session.to_record())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=1000, help="saves per second, all sessions together")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.25, 1.0])
+    parser.add_argument("--resume-sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        modes = [("write-through", 0.0)] + [(f"behind {interval:g}s", interval) for interval in args.intervals]
+        results = {}
+        for name, interval in modes:
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.sqlite3")
+            results[name] = write_amplification(path, interval, args.rate, args.seconds, args.seed)
+        timings = resume_latency(os.path.join(directory, "resume.sqlite3"), args.resume_sessions, args.seed)
+        no_lost_writes = all(conflict_check(os.path.join(directory, f"conflict_{interval:g}.sqlite3"), interval)
+                             for interval in (0.0, 60.0))
+
+    print(f"write amplification, {SESSIONS} sessions, {args.rate:g} saves/s for {args.seconds:g}s:")
+    print(f"{'mode':<14} {'saves':>7} {'rows':>7} {'commits':>8} {'MB':>7} {'rows/save':>10} "
+          f"{'save p50 us':>12} {'save p99 us':>12}")
+    for name, row in results.items():
+        print(f"{name:<14} {row['saves']:>7} {row['rows']:>7} {row['commits']:>8} {row['bytes'] / 1e6:>7.2f} "
+              f"{row['rows'] / row['saves']:>10.3f} {row['save_p50_us']:>12.1f} {row['save_p99_us']:>12.1f}")
+
+    print(f"\nresume, {args.resume_sessions} stored sessions of {SESSION_MAX_MESSAGES} messages (ms):")
+    print(f"{'get':<16} {'p50':>7} {'p99':>7}")
+    for name, values in timings.items():
+        print(f"{name:<16} {percentile(values, 50) * 1e3:>7.3f} {percentile(values, 99) * 1e3:>7.3f}")
+
+    uncompacted, compacted = compaction_sizes(random.Random(args.seed))
+    print(f"\npayload of a 200-message session: {uncompacted / 1e3:.1f} KB, "
+          f"{compacted / 1e3:.1f} KB with messages compacted to {SESSION_MAX_MESSAGES}")
+
+    default = f"behind {SESSION_FLUSH_INTERVAL_SECONDS:g}s"
+    checks = {
+        "fewer_writes": default in results and results[default]["rows"] * 3 <= results["write-through"]["rows"],
+        "durable": all(row["durable"] for row in results.values()),
+        "cold_resume_fast": percentile(timings["cold"], 99) < 0.005,
+        "no_lost_writes": no_lost_writes,
+    }
+    print()
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Server CPU of a running action-step timer, per active Streamlit session.
+
+Previously the timer did time.sleep(1) + st.rerun() on every tick, so each
+second of countdown was one full script run: every chat message and its
+st.json(details) expander re-rendered. The timer now counts down in the
+browser (utils.countdown_timer) and only start / pause / reset / finish
+reach the server, each as a fragment-only rerun.
+
+This measures, for sessions with a growing chat history, the CPU of one
+full script run and the CPU spent while a started timer counts down. Run it
+with --script pointing at an older copy of the app to compare. With the
+browser countdown the cost stays at the single run for the Start event
+(fragment-only in a real browser session) however long the timer runs.
+
+    python -m benchmarks.bench_streamlit_timer --messages 2 10 40
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "fake")
+
+from benchmarks.fake_groq import SAMPLE_PLAN
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def seed_session(at, messages: int):
+    history = [{
+        "role": "assistant",
+        "content": "Hello! I'm your Financial Crisis Assistant.",
+        "emergency": False,
+    }]
+    for i in range(messages // 2):
+        history.append({"role": "user", "content": f"Salary delayed, EMI pending ({i})"})
+        history.append({
+            "role": "assistant",
+            "content": f"Situation: {SAMPLE_PLAN['crisis_type']}",
+            "emergency": False,
+            "details": SAMPLE_PLAN,
+        })
+    at.session_state.messages = history
+    at.session_state.all_steps = SAMPLE_PLAN["action_steps"]
+    at.session_state.user_situation = SAMPLE_PLAN
+    at.session_state.current_step_index = 0
+
+def start_step_timer(at):
+    """Session state as it is right after Start was pressed on step 1."""
+    at.session_state.timer_running = True
+    at.session_state.timer_remaining = SAMPLE_PLAN["action_steps"][0]["estimated_time_minutes"] * 60
+    at.session_state.timer_step_id = "step_1"
+    at.session_state.timer_last_tick = time.time()
+
+def measure(script: str, messages: int, runs: int, window: float):
+    """
+    Returns (CPU of one full script run, CPU spent while a started timer
+    counts down for `window` seconds). A script that reruns itself every
+    tick keeps AppTest busy until the timeout; one that leaves the countdown
+    to the browser finishes its single run at once.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(REPO_ROOT / script), default_timeout=60)
+    seed_session(at, messages)
+    at.run()  # warm imports and caches
+    start = time.process_time()
+    for _ in range(runs):
+        at.run()
+    per_run = (time.process_time() - start) / runs
+
+    start_step_timer(at)
+    start = time.process_time()
+    try:
+        at.run(timeout=window)
+    except RuntimeError:
+        pass  # AppTest timeout: the script was still ticking
+    return per_run, time.process_time() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--script", default="streamlit_app.py", help="path from the repo root")
+    parser.add_argument("--messages", type=int, nargs="+", default=[2, 20, 60])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--window", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.script}: server CPU per session while a step timer runs\n")
+    print(f"{'chat messages':>14} {'CPU per full run':>17} "
+          f"{f'CPU over {args.window:.0f}s countdown':>25} {'≈ full runs':>12}")
+    for messages in args.messages:
+        per_run, running = measure(args.script, messages, args.runs, args.window)
+        print(f"{messages:>14} {per_run * 1000:>15.1f}ms {running * 1000:>23.1f}ms "
+              f"{running / per_run:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Evaluate the local pre-classifier on benchmarks/data/preclassifier_samples.jsonl.
+
+Reports the share of LLM calls avoided (inputs answered locally) and the
+false-reject rate (financial inputs wrongly redirected).
+
+    python -m benchmarks.eval_preclassifier
+"""
+import json
+import os
+import time
+
+from config.settings import PRECLASSIFIER_REJECT_CONFIDENCE
+from nodes.preclassifier_node import classify_financial
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "preclassifier_samples.jsonl")
+
+def load_samples():
+    with open(SAMPLES_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main():
+    samples = load_samples()
+    rejected = []
+    false_rejects = []
+    start = time.perf_counter()
+    for sample in samples:
+        result = classify_financial(sample["text"])
+        if result["label"] == "not_financial" and result["confidence"] >= PRECLASSIFIER_REJECT_CONFIDENCE:
+            rejected.append(sample)
+            if sample["label"] == "financial":
+                false_rejects.append(sample["text"])
+    per_call_us = (time.perf_counter() - start) / len(samples) * 1e6
+
+    financial = [s for s in samples if s["label"] == "financial"]
+    not_financial = [s for s in samples if s["label"] == "not_financial"]
+    caught = [s for s in rejected if s["label"] == "not_financial"]
+
+    print(f"samples: {len(samples)} ({len(financial)} financial, {len(not_financial)} not financial)")
+    print(f"LLM calls avoided: {len(rejected)}/{len(samples)} = {len(rejected) / len(samples):.1%}")
+    print(f"non-financial caught locally: {len(caught)}/{len(not_financial)} = {len(caught) / len(not_financial):.1%}")
+    print(f"false-reject rate: {len(false_rejects)}/{len(financial)} = {len(false_rejects) / len(financial):.1%}")
+    for text in false_rejects:
+        print(f"  false reject: {text}")
+    print(f"classifier cost: {per_call_us:.1f} us/input")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Local stand-in for the Groq chat-completions API.
+
+Run it with uvicorn and point the Groq SDK at it through GROQ_BASE_URL:
+
+    uvicorn benchmarks.fake_groq:app --port 8900
+    GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=fake uvicorn app:app
+
+Behaviour is set with FAKE_GROQ_* env vars at start-up, or at runtime with
+POST /_fake/config (same names, lowercase, without the prefix):
+
+- latency / latency_dist / jitter: total reply time in seconds. "constant",
+  "uniform" (latency +/- jitter * latency) or "lognormal" (median latency,
+  sigma jitter)
+- ttft: time to first token for streamed replies
+- malformed_rate / malformed_kind: share of replies that are not clean
+  JSON. "truncated" (cut off mid-object), "prose" (no JSON at all),
+  "mixed" (either), or "drift" (valid JSON that strays from the output
+  schema the way models do: see drifted_plan). With response_format
+  json_object, truncated and prose replies are answered like Groq's JSON
+  mode does: a 400 json_validate_failed carrying the failed generation
+- rate_limit_rate / retry_after_ms: share of requests answered with a 429
+  and the retry-after-ms header sent with it
+- error_rate / error_status: share of requests answered with a server
+  error (500 by default; 1.0 simulates an outage)
+- max_concurrency: replies generated at once (0: unlimited); requests
+  beyond it wait for a slot before their latency starts, like a saturated
+  upstream
+- models: per-model overrides of the settings above, e.g.
+  {"llama-3.1-8b-instant": {"latency": 0.4, "malformed_rate": 0.1}}
+
+GET /_fake/stats counts requests, 429s, server errors, malformed replies and
+JSON-mode requests.
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+
+STREAM_CHUNK_CHARS = 12
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+MALFORMED_KINDS = ("truncated", "prose", "mixed", "drift")
+
+DEFAULT_CONFIG = {
+    "latency": float(os.getenv("FAKE_GROQ_LATENCY", "2.0")),
+    "latency_dist": os.getenv("FAKE_GROQ_LATENCY_DIST", "constant"),
+    "jitter": float(os.getenv("FAKE_GROQ_JITTER", "0.0")),
+    "ttft": float(os.getenv("FAKE_GROQ_TTFT", "0.3")),
+    "malformed_rate": float(os.getenv("FAKE_GROQ_MALFORMED_RATE", "0.0")),
+    "malformed_kind": os.getenv("FAKE_GROQ_MALFORMED_KIND", "mixed"),
+    "rate_limit_rate": float(os.getenv("FAKE_GROQ_RATE_LIMIT_RATE", "0.0")),
+    "retry_after_ms": int(os.getenv("FAKE_GROQ_RETRY_AFTER_MS", "100")),
+    "error_rate": float(os.getenv("FAKE_GROQ_ERROR_RATE", "0.0")),
+    "error_status": int(os.getenv("FAKE_GROQ_ERROR_STATUS", "500")),
+    "max_concurrency": int(os.getenv("FAKE_GROQ_MAX_CONCURRENCY", "0")),
+    "models": json.loads(os.getenv("FAKE_GROQ_MODELS", "{}")),
+}
+FAKE_GROQ_SEED = os.getenv("FAKE_GROQ_SEED")
+
+SAMPLE_PLAN = {
+    "crisis_type": "Delayed salary putting EMI payment at risk",
+    "severity": "medium",
+    "mood": "anxious",
+    "calming_steps": [
+        {"instruction": "Take 5 slow breaths - this can be handled", "type": "breathing", "duration_seconds": 20}
+    ],
+    "action_steps": [
+        {"step": "Check the EMI due date and the exact amount", "priority": "high", "estimated_time_minutes": 5},
+        {"step": "Call your bank and ask for a short EMI extension", "priority": "high", "estimated_time_minutes": 15},
+        {"step": "Ask HR in writing for the expected salary date", "priority": "high", "estimated_time_minutes": 10},
+        {"step": "List bills that can safely wait one week", "priority": "medium", "estimated_time_minutes": 15},
+        {"step": "Keep a small buffer for food and travel", "priority": "medium", "estimated_time_minutes": 10},
+    ],
+    "needs_emergency_support": False,
+    "final_advice": "A delayed salary is stressful but temporary. One call at a time."
+}
+
+USAGE = {"prompt_tokens": 900, "completion_tokens": 350, "total_tokens": 1250}
+
+app = FastAPI()
+app.state.config = dict(DEFAULT_CONFIG)
+app.state.random = random.Random(FAKE_GROQ_SEED)
+
+def _new_stats():
+    return {"requests": 0, "rate_limited": 0, "errors": 0, "malformed": 0, "streamed": 0, "json_mode": 0,
+            "by_model": {}}
+
+app.state.stats = _new_stats()
+
+def _capacity(config):
+    return asyncio.Semaphore(config["max_concurrency"]) if config["max_concurrency"] > 0 else None
+
+app.state.capacity = _capacity(app.state.config)
+
+def model_config(model: str):
+    config = app.state.config
+    return {**config, **config["models"].get(model, {})}
+
+def sample_latency(config) -> float:
+    rng = app.state.random
+    latency, jitter = config["latency"], config["jitter"]
+    if config["latency_dist"] == "uniform":
+        return max(0.0, rng.uniform(latency * (1 - jitter), latency * (1 + jitter)))
+    if config["latency_dist"] == "lognormal" and latency > 0:
+        return rng.lognormvariate(0.0, jitter) * latency
+    return latency
+
+# Ways a model's JSON strays from the schema it was asked for: wrong
+# values, then (at most one) wrong shape of the step lists
+DRIFTS = (
+    lambda plan: plan.update(severity=plan["severity"].upper()),
+    lambda plan: plan.update(severity="critical"),
+    lambda plan: plan.update(mood="stressed"),
+    lambda plan: plan.update(mood="calm/panic/anxious"),
+    lambda plan: [step.update(estimated_time_minutes=f"{step['estimated_time_minutes']} minutes")
+                  for step in plan["action_steps"]],
+    lambda plan: [step.update(priority="urgent") for step in plan["action_steps"][:2]],
+    lambda plan: plan.update(action_steps=plan["action_steps"] + plan["action_steps"][:2]),
+    lambda plan: plan.update(needs_emergency_support="false"),
+    lambda plan: plan.pop("final_advice"),
+    lambda plan: plan.pop("calming_steps"),
+)
+SHAPE_DRIFTS = (
+    lambda plan: plan.update(action_steps=[step["step"] for step in plan["action_steps"]]),
+    lambda plan: plan.update(action_steps=[{"action": step["step"]} for step in plan["action_steps"]]),
+    lambda plan: plan.update(calming_steps=[step["instruction"] for step in plan.get("calming_steps", [])]),
+)
+
+def drifted_plan(plan: dict, rng) -> dict:
+    """A copy of plan with one or two DRIFTS and, half the time, a SHAPE_DRIFT."""
+    plan = json.loads(json.dumps(plan))
+    for drift in rng.sample(DRIFTS, rng.randint(1, 2)):
+        drift(plan)
+    if rng.random() < 0.5:
+        rng.choice(SHAPE_DRIFTS)(plan)
+    return plan
+
+def malformed(content: str, config) -> str:
+    kind = config["malformed_kind"]
+    if kind == "mixed":
+        kind = app.state.random.choice(("truncated", "prose"))
+    if kind == "drift":
+        return json.dumps(drifted_plan(json.loads(content), app.state.random))
+    if kind == "truncated":
+        return content[:len(content) // 2]
+    return "Sure! Here is a plan: call your bank, pay the urgent bills first and breathe."
+
+def json_validate_failed_response(content: str):
+    """What Groq's JSON mode answers when the model's reply isn't a JSON object."""
+    return JSONResponse(
+        status_code=400,
+        content={"error": {
+            "message": "Failed to generate JSON. Please adjust your prompt. See 'failed_generation' for more details.",
+            "type": "invalid_request_error",
+            "code": "json_validate_failed",
+            "failed_generation": content,
+        }},
+    )
+
+def is_json_object(content: str) -> bool:
+    try:
+        return isinstance(json.loads(content), dict)
+    except ValueError:
+        return False
+
+def rate_limited_response(config):
+    retry_after_ms = config["retry_after_ms"]
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after-ms": str(retry_after_ms), "retry-after": str(retry_after_ms / 1000)},
+        content={"error": {
+            "message": "Rate limit reached for model (fake). Please try again shortly.",
+            "type": "tokens",
+            "code": "rate_limit_exceeded",
+        }},
+    )
+
+def completion_body(model: str, content: str):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": USAGE
+    }
+
+def chunk_body(completion_id: str, model: str, content: str = None, finish_reason: str = None):
+    delta = {"content": content} if content is not None else {}
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    if finish_reason:
+        # Like Groq: streamed usage arrives on the last chunk, under x_groq
+        body["x_groq"] = {"id": completion_id, "usage": USAGE}
+    return body
+
+async def stream_completion(model: str, content: str, latency: float, ttft: float):
+    """First token after the TTFT, remaining tokens spread over the rest of the latency."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+    ttft = min(ttft, latency)
+    gap = (latency - ttft) / max(len(pieces), 1)
+
+    await asyncio.sleep(ttft)
+    for piece in pieces:
+        yield f"data: {json.dumps(chunk_body(completion_id, model, piece))}\n\n"
+        await asyncio.sleep(gap)
+    yield f"data: {json.dumps(chunk_body(completion_id, model, finish_reason='stop'))}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    try:
+        body = await request.json()
+    except ClientDisconnect:
+        # The caller gave up before sending the body (client timeouts under overload)
+        return Response(status_code=499)
+    rng, stats = app.state.random, app.state.stats
+    model = body.get("model", "fake")
+    config = model_config(model)
+    stats["requests"] += 1
+    stats["by_model"][model] = stats["by_model"].get(model, 0) + 1
+
+    if rng.random() < config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return rate_limited_response(config)
+    if rng.random() < config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse(
+            status_code=config["error_status"],
+            content={"error": {"message": "Internal server error (fake)", "type": "internal_server_error"}},
+        )
+
+    content = json.dumps(SAMPLE_PLAN)
+    if rng.random() < config["malformed_rate"]:
+        stats["malformed"] += 1
+        content = malformed(content, config)
+
+    latency = sample_latency(config)
+    capacity = app.state.capacity
+    if capacity is not None:
+        await capacity.acquire()
+    release = capacity.release if capacity is not None else (lambda: None)
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    if json_mode:
+        stats["json_mode"] += 1
+    if body.get("stream") and (not json_mode or is_json_object(content)):
+        stats["streamed"] += 1
+        return StreamingResponse(
+            stream_completion(model, content, latency, config["ttft"]), media_type="text/event-stream",
+            background=BackgroundTask(release),
+        )
+
+    try:
+        await asyncio.sleep(latency)
+    finally:
+        release()
+    if json_mode and not is_json_object(content):
+        return json_validate_failed_response(content)
+    return completion_body(model, content)
+
+@app.post("/_fake/config")
+async def update_config(request: Request):
+    """Change behaviour between benchmark scenarios; also resets the stats."""
+    changes = await request.json()
+    unknown = set(changes) - set(DEFAULT_CONFIG)
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"unknown settings: {sorted(unknown)}"})
+    config = {**app.state.config, **changes}
+    if config["latency_dist"] not in LATENCY_DISTRIBUTIONS or config["malformed_kind"] not in MALFORMED_KINDS:
+        return JSONResponse(status_code=400, content={"error": "unknown latency_dist or malformed_kind"})
+    app.state.config = config
+    app.state.capacity = _capacity(config)
+    app.state.stats = _new_stats()
+    return config
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return {**app.state.stats, "config": app.state.config}
+
+def start_fake_groq(latency: float, port: int, **settings):
+    """
+    Run the fake server in its own process so it doesn't share our GIL.
+    Extra settings become FAKE_GROQ_* env vars (e.g. malformed_rate=0.2).
+    """
+    import httpx
+
+    env = dict(os.environ, FAKE_GROQ_LATENCY=str(latency))
+    env.update({
+        f"FAKE_GROQ_{name.upper()}": json.dumps(value) if isinstance(value, dict) else str(value)
+        for name, value in settings.items()
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_groq:app",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/_fake/stats")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake Groq server did not start")
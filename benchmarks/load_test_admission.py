@@ -0,0 +1,184 @@
+"""
+/chat under overload, with and without admission control
+(agent/admission.py).
+
+The fake Groq server generates at most --capacity replies at once, each
+taking --latency seconds, so the upstream serves capacity / latency
+requests per second. Open-loop Poisson arrivals come at --overload times
+that rate for --seconds; --emergency of them have emergency=True. Clients
+give up after --client-timeout seconds. Inputs are distinct financial
+messages from benchmarks/data/preclassifier_samples.jsonl, so nothing is
+served from a cache.
+
+- no admission: every request waits behind Groq
+- admission: ADMISSION_MAX_IN_FLIGHT = --capacity and
+  ADMISSION_DEADLINE_SECONDS = --deadline; shed requests get the degraded
+  answer at once
+
+Reported per mode: client latency percentiles, LLM plans and degraded
+answers returned in time, client timeouts, and the share of emergency and
+other requests that got an LLM plan.
+
+Checks (admission): p99 latency within the deadline plus --slack, no
+client timeouts, every request answered with a plan, emergency requests
+admitted at least as often as the rest, and at least as many LLM plans
+delivered in time as without admission.
+
+    python -m benchmarks.load_test_admission --overload 5 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8916
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "preclassifier_samples.jsonl")
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+def make_arrivals(rate: float, seconds: float, emergency: float, seed: int):
+    """(offset seconds, request body) pairs, Poisson at `rate` per second."""
+    rng = random.Random(seed)
+    with open(SAMPLES_PATH, encoding="utf-8") as file:
+        texts = [sample["text"] for sample in map(json.loads, filter(str.strip, file))
+                 if sample["label"] == "financial"]
+    arrivals = []
+    offset = rng.expovariate(rate)
+    while offset < seconds:
+        body = {"user_input": f"{rng.choice(texts)} (request {len(arrivals)})"}
+        if rng.random() < emergency:
+            body["emergency"] = True
+        arrivals.append((offset, body))
+        offset += rng.expovariate(rate)
+    return arrivals
+
+def reset(latency: float, capacity: int):
+    import httpx
+    from llm.response_cache import response_cache
+
+    response_cache.clear()
+    httpx.post(f"{FAKE_URL}/_fake/config", json={"latency": latency, "max_concurrency": capacity}).raise_for_status()
+
+async def run_mode(http, arrivals, client_timeout: float):
+    """(latency, emergency, outcome) per request; outcome is plan, degraded, timeout or error."""
+    async def one(offset, body):
+        await asyncio.sleep(max(0.0, started + offset - time.perf_counter()))
+        sent = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(http.post("/chat", json=body), client_timeout)
+        except asyncio.TimeoutError:
+            return client_timeout, bool(body.get("emergency")), "timeout"
+        output = response.json() if response.status_code == 200 else {}
+        if not output.get("action_steps"):
+            outcome = "error"
+        else:
+            outcome = "degraded" if output.get("degraded") else "plan"
+        return time.perf_counter() - sent, bool(body.get("emergency")), outcome
+
+    started = time.perf_counter()
+    return await asyncio.gather(*(one(offset, body) for offset, body in arrivals))
+
+def summarize(results):
+    latencies = [latency for latency, _, _ in results]
+    outcomes = [outcome for _, _, outcome in results]
+
+    def plan_share(emergency: bool) -> float:
+        group = [outcome for _, flag, outcome in results if flag == emergency]
+        return group.count("plan") / len(group) if group else 0.0
+
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "plans": outcomes.count("plan"),
+        "degraded": outcomes.count("degraded"),
+        "timeouts": outcomes.count("timeout"),
+        "errors": outcomes.count("error"),
+        "emergency_plans": plan_share(True),
+        "other_plans": plan_share(False),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Groq reply time in seconds")
+    parser.add_argument("--capacity", type=int, default=8, help="replies the fake Groq server generates at once")
+    parser.add_argument("--overload", type=float, default=5.0, help="arrival rate / upstream capacity")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--emergency", type=float, default=0.1, help="share of emergency=True requests")
+    parser.add_argument("--deadline", type=float, default=3.0)
+    parser.add_argument("--client-timeout", type=float, default=10.0)
+    parser.add_argument("--slack", type=float, default=0.5, help="allowed p99 over the deadline, seconds")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+    fake_server = start_fake_groq(args.latency, FAKE_PORT, max_concurrency=args.capacity)
+
+    import httpx
+    from agent.admission import admission
+    from app import app
+
+    upstream_rate = args.capacity / args.latency
+    arrivals = make_arrivals(upstream_rate * args.overload, args.seconds, args.emergency, args.seed)
+    admission.max_in_flight = args.capacity
+    admission.deadline_seconds = args.deadline
+    admission.service_seconds = args.latency
+    # Admission first: requests abandoned without it keep the fake server busy
+    modes = [("admission", True), ("no admission", False)]
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as http:
+            results = {}
+            for name, enabled in modes:
+                reset(args.latency, args.capacity)
+                admission.enabled = enabled
+                results[name] = summarize(await run_mode(http, arrivals, args.client_timeout))
+            return results
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        fake_server.terminate()
+
+    emergencies = sum(1 for _, body in arrivals if body.get("emergency"))
+    print(f"{len(arrivals)} requests ({emergencies} emergency) over {args.seconds:g}s, "
+          f"{args.overload:g}x an upstream of {upstream_rate:g} req/s "
+          f"({args.capacity} at once, {args.latency}s each); deadline {args.deadline:g}s, "
+          f"client timeout {args.client_timeout:g}s:")
+    print(f"{'mode':<13} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6} {'max s':>6} {'plans':>6} {'degraded':>9} "
+          f"{'timeouts':>9} {'errors':>7} {'emerg plan %':>13} {'other plan %':>13}")
+    for name, row in results.items():
+        print(f"{name:<13} {row['p50']:>6.2f} {row['p95']:>6.2f} {row['p99']:>6.2f} {row['max']:>6.2f} "
+              f"{row['plans']:>6} {row['degraded']:>9} {row['timeouts']:>9} {row['errors']:>7} "
+              f"{row['emergency_plans'] * 100:>13.0f} {row['other_plans'] * 100:>13.0f}")
+
+    admitted, baseline = results["admission"], results["no admission"]
+    checks = {
+        "bounded_tail": admitted["p99"] <= args.deadline + args.slack,
+        "no_timeouts": admitted["timeouts"] == 0,
+        "all_answered": admitted["errors"] == 0,
+        "emergency_first": admitted["emergency_plans"] >= admitted["other_plans"],
+        "goodput_kept": admitted["plans"] >= baseline["plans"],
+    }
+    print()
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+/chat/batch throughput against the local fake Groq server, compared with
+looping over /chat one message at a time (what partner uploads do today).
+
+The batch is a seeded mix of intake messages built from the financial
+inputs in benchmarks/data/preclassifier_samples.jsonl: mostly distinct,
+some exact repeats (--duplicates) and two invalid items. Every mode
+starts with an empty response cache.
+
+Checks: every item gets exactly one line, invalid items get an error and
+the rest a plan, repeats share one Groq call, the summary line comes
+last, and the batch at the default concurrency is several times faster
+than the loop.
+
+    python -m benchmarks.load_test_batch --items 120 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8915
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "preclassifier_samples.jsonl")
+INVALID_ITEMS = ({"steps": 5}, {"user_input": "Rent is due", "steps": "five"})
+
+def make_items(count: int, duplicates: float, seed: int):
+    rng = random.Random(seed)
+    with open(SAMPLES_PATH, encoding="utf-8") as file:
+        texts = [sample["text"] for sample in map(json.loads, filter(str.strip, file))
+                 if sample["label"] == "financial"]
+    items = []
+    for number in range(count - len(INVALID_ITEMS)):
+        if items and rng.random() < duplicates:
+            items.append(dict(rng.choice(items)))
+        else:
+            items.append({"user_input": f"{rng.choice(texts)} (intake {number})"})
+    for item in INVALID_ITEMS:
+        items.insert(rng.randrange(len(items)), item)
+    return items
+
+def reset(latency: float):
+    import httpx
+    from llm.response_cache import response_cache
+
+    response_cache.clear()
+    httpx.post(f"{FAKE_URL}/_fake/config", json={"latency": latency}).raise_for_status()
+
+def groq_calls() -> int:
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()["requests"]
+
+async def loop_chat(http, items):
+    """One /chat call per item, sequentially."""
+    lines = []
+    for index, item in enumerate(items):
+        response = await http.post("/chat", json=item)
+        lines.append({"index": index, "output": response.json()} if response.status_code == 200
+                     else {"index": index, "error": response.status_code})
+    return lines
+
+async def batch_chat(http, items, concurrency: int):
+    lines = []
+    async with http.stream("POST", "/chat/batch", json={"items": items, "concurrency": concurrency}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line:
+                lines.append(json.loads(line))
+    return lines
+
+def check_lines(lines, items, summary_last: bool):
+    results = [line for line in lines if "summary" not in line]
+    invalid = {index for index, item in enumerate(items) if item in INVALID_ITEMS}
+    return (
+        sorted(line["index"] for line in results) == list(range(len(items)))
+        and all(("error" in line) == (line["index"] in invalid) for line in results)
+        and all("crisis_type" in line["output"] for line in results if "output" in line)
+        and (not summary_last or "summary" in lines[-1])
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Groq latency in seconds")
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+    fake_server = start_fake_groq(args.latency, FAKE_PORT)
+
+    import httpx
+    from app import app
+    from config.settings import BATCH_CONCURRENCY
+
+    items = make_items(args.items, args.duplicates, args.seed)
+    unique = len({json.dumps(item, sort_keys=True) for item in items if item not in INVALID_ITEMS})
+    modes = [("loop /chat", None)] + [(f"batch c={level}", level) for level in args.concurrency]
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=600) as http:
+            results = {}
+            for name, level in modes:
+                reset(args.latency)
+                started = time.perf_counter()
+                if level is None:
+                    lines = await loop_chat(http, items)
+                else:
+                    lines = await batch_chat(http, items, level)
+                results[name] = (time.perf_counter() - started, groq_calls(), lines)
+            return results
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        fake_server.terminate()
+
+    print(f"{len(items)} items ({unique} distinct, {len(INVALID_ITEMS)} invalid), fake Groq latency {args.latency}s:")
+    print(f"{'mode':<12} {'seconds':>8} {'items/s':>8} {'groq calls':>11} {'lines ok':>9}")
+    checks = {}
+    for name, level in modes:
+        seconds, calls, lines = results[name]
+        ok = check_lines(lines, items, summary_last=level is not None)
+        print(f"{name:<12} {seconds:>8.2f} {len(items) / seconds:>8.1f} {calls:>11} {'yes' if ok else 'NO':>9}")
+        checks[f"lines_{name}"] = ok
+        if level is not None:
+            checks[f"deduplicated_{name}"] = calls == unique
+    loop_seconds = results["loop /chat"][0]
+    default = f"batch c={BATCH_CONCURRENCY}"
+    if default in results:
+        checks["faster_than_loop"] = results[default][0] * 4 < loop_seconds
+
+    print()
+    failed = [name for name, ok in checks.items() if not ok]
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Concurrency test for the calming timer: many Streamlit sessions start their
+calming countdown at the same time against one `streamlit run` server.
+
+Each simulated browser speaks Streamlit's websocket protocol. It submits a
+situation, presses Start on the calming timer, keeps the socket open while
+its countdown runs "in the browser", then sends the timer's finish event.
+The checks:
+
+- every script run (submit, start, finish) returns in well under the
+  calming duration, so no script thread waits on a timer
+- a probe session stays responsive while all the timers are running
+- the server burns ~no CPU while the timers count down
+- every session shows the completion message (calming_completed is set)
+
+    python -m benchmarks.load_test_calming_timer --sessions 8 32 --hold 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8902
+APP_PORT = 8903
+CALM_KEY = "calm_timer_initial"
+COMPLETION_TEXT = "Great! Ab aage badhte hain."
+
+def start_streamlit(port: int, groq_url: str):
+    import httpx
+
+    env = dict(os.environ, GROQ_BASE_URL=groq_url, GROQ_API_KEY="fake")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
+         "--server.headless", "true", "--server.port", str(port),
+         "--server.enableCORS", "false", "--server.enableXsrfProtection", "false",
+         "--server.fileWatcherType", "none", "--logger.level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/_stcore/health")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("streamlit server did not start")
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process (Linux /proc)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+class BrowserSession:
+    """Just enough of the Streamlit frontend to rerun scripts and send widget events."""
+
+    def __init__(self, port: int):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.page_script_hash = ""
+        self.elements = {}
+
+    async def __aenter__(self):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        await self.rerun()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, widgets=(), fragment_id=""):
+        """Send one rerun request; return (seconds, texts rendered) once the run finishes."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page_script_hash
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(widgets)
+
+        texts = []
+        start = time.perf_counter()
+        await self.ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                body = getattr(element, element_type)
+                if hasattr(body, "id") and body.id:
+                    self.elements[(element_type, body.id.rsplit("-", 1)[-1])] = (
+                        body.id, forward.delta.fragment_id
+                    )
+                if hasattr(body, "body"):
+                    texts.append(body.body)
+            elif kind == "script_finished":
+                return time.perf_counter() - start, texts
+
+    def widget(self, element_type: str, key: str):
+        for (kind, element_key), value in self.elements.items():
+            if kind == element_type and element_key == key:
+                return value
+        for (kind, _), value in self.elements.items():
+            if kind == element_type and key == "":
+                return value
+        raise KeyError((element_type, key))
+
+    async def chat(self, text: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, _ = self.widget("chat_input", "None")
+        state = WidgetState(id=widget_id)
+        state.chat_input_value.data = text
+        return await self.rerun([state])
+
+    async def component_event(self, key: str, event: dict):
+        from streamlit.components.v2.bidi_component.main import _make_trigger_id
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, fragment_id = self.widget("bidi_component", key)
+        state = WidgetState(
+            id=_make_trigger_id(widget_id, "events"),
+            json_trigger_value=json.dumps([{"event": "event", "value": event}]),
+        )
+        return await self.rerun([state], fragment_id)
+
+async def run_session(port: int, index: int, hold: float, duration: int,
+                      started: list, sessions: int, all_started: asyncio.Event):
+    async with BrowserSession(port) as session:
+        submit, _ = await session.chat(f"Salary delayed, EMI pending (session {index})")
+        start, _ = await session.component_event(CALM_KEY, {"type": "start", "remaining": duration})
+        started.append(index)
+        if len(started) == sessions:
+            all_started.set()
+        await all_started.wait()
+        await asyncio.sleep(hold)  # every countdown is now running in its browser
+        finish, texts = await session.component_event(CALM_KEY, {"type": "finish", "remaining": 0})
+        return {"submit": submit, "start": start, "finish": finish, "completed": COMPLETION_TEXT in texts}
+
+async def probe(port: int, until: float):
+    """A separate session interacting while all the timers run."""
+    latencies = []
+    async with BrowserSession(port) as session:
+        while time.perf_counter() < until:
+            elapsed, _ = await session.rerun()
+            latencies.append(elapsed)
+            await asyncio.sleep(0.5)
+    return latencies
+
+async def run_level(port: int, server_pid: int, sessions: int, hold: float, duration: int):
+    wall_start = time.perf_counter()
+    started, all_started = [], asyncio.Event()
+    tasks = [
+        asyncio.create_task(run_session(port, i, hold, duration, started, sessions, all_started))
+        for i in range(sessions)
+    ]
+
+    # While every session's timer is running: first idle CPU, then a probe
+    await all_started.wait()
+    cpu_start = cpu_seconds(server_pid)
+    window_start = time.perf_counter()
+    await asyncio.sleep(hold / 3)
+    cpu_window = cpu_seconds(server_pid) - cpu_start
+    window = time.perf_counter() - window_start
+    probe_latencies = await probe(port, time.perf_counter() + hold / 3)
+
+    results = await asyncio.gather(*tasks)
+    runs = sorted(r[step] for r in results for step in ("submit", "start", "finish"))
+    return {
+        "sessions": sessions,
+        "wall_seconds": round(time.perf_counter() - wall_start, 1),
+        "script_run_p50": round(statistics.median(runs), 3),
+        "script_run_max": round(runs[-1], 3),
+        "probe_p50": round(statistics.median(probe_latencies), 3),
+        "server_cpu_while_counting": f"{cpu_window / window:.1%}",
+        "completed": sum(r["completed"] for r in results),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--hold", type=float, default=20.0,
+                        help="seconds each calming countdown runs in the browser")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency")
+    args = parser.parse_args()
+
+    from benchmarks.fake_groq import SAMPLE_PLAN
+    duration = SAMPLE_PLAN["calming_steps"][0]["duration_seconds"]
+
+    fake = start_fake_groq(args.latency, FAKE_PORT)
+    app = start_streamlit(APP_PORT, f"http://127.0.0.1:{FAKE_PORT}")
+    try:
+        failed = False
+        for sessions in args.sessions:
+            result = asyncio.run(run_level(APP_PORT, app.pid, sessions, args.hold, duration))
+            print(result)
+            failed |= result["completed"] < sessions or result["script_run_max"] >= duration
+        print("\nFAIL" if failed else "\nOK: no script thread waited on a calming timer")
+        raise SystemExit(1 if failed else 0)
+    finally:
+        app.kill()
+        fake.kill()
+
+if __name__ == "__main__":
+    main()
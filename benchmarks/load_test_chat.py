@@ -0,0 +1,91 @@
+"""
+Load test for /chat against the local fake Groq server.
+
+Compares the async /chat route with the previous sync route (one threadpool
+worker held per in-flight request) at increasing concurrency levels.
+Every request has its own user_input and the response and semantic caches
+are off, so each one reaches the fake Groq server.
+
+    python -m benchmarks.load_test_chat --latency 2 --levels 10 40 80 160
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8901
+_request_numbers = itertools.count(1)
+
+async def run_level(app, path: str, concurrency: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as http:
+        latencies = []
+
+        async def one():
+            payload = {
+                "user_input": f"Salary delayed, EMI pending (load test #{next(_request_numbers)})",
+                "steps": 5,
+                "emergency": False,
+            }
+            start = time.perf_counter()
+            response = await http.post(path, json=payload)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 2),
+        "requests_per_second": round(concurrency / wall, 1),
+        "p50_seconds": round(statistics.median(latencies), 2),
+        "max_seconds": round(latencies[-1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=2.0, help="fake Groq latency in seconds")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 40, 80, 160])
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}"
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+    os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+    fake_server = start_fake_groq(args.latency, FAKE_PORT)
+
+    from app import app
+    from schemas.request_schema import ChatRequest
+    from agent.state import AgentState
+    from nodes.reasoning_node import reasoning_node
+
+    # The pre-async endpoint, kept here only as the comparison baseline
+    @app.post("/chat-sync-baseline")
+    def chat_sync(request: ChatRequest):
+        state = AgentState.from_request(request)
+        return reasoning_node(state).output
+
+    async def run_all():
+        for path in ("/chat-sync-baseline", "/chat"):
+            print(f"\n{path} (fake Groq latency {args.latency}s)")
+            for level in args.levels:
+                print(await run_level(app, path, level))
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        fake_server.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Checks for the resilient Groq client against the local fake Groq server:
+
+- deadline: a stalled Groq reply ends at the deadline with the default plan
+- retry_429 / retry_5xx: injected errors are retried, and a retry after a
+  429 never starts before its Retry-After
+- hedging: tail latency with and without a hedged second request, and
+  the extra load the hedge costs
+- circuit_breaker: during an outage requests fall back at once without
+  reaching Groq, and the breaker closes again once Groq recovers
+- probe_*: a half-open probe that ends without success re-opens the
+  breaker, and a later probe still closes it, however the first one ended:
+  a 400, a 400 json_validate_failed, a rate-limit queue timeout or
+  cancellation
+
+    python -m benchmarks.load_test_resilience
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8907
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+
+def configure_fake(**settings):
+    import httpx
+
+    defaults = {"latency": 0.05, "latency_dist": "constant", "jitter": 0.0,
+                "rate_limit_rate": 0.0, "error_rate": 0.0, "error_status": 500,
+                "malformed_rate": 0.0, "malformed_kind": "mixed"}
+    httpx.post(f"{FAKE_URL}/_fake/config", json={**defaults, **settings}).raise_for_status()
+
+def fake_requests() -> int:
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()["requests"]
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+async def timed_calls(count: int, concurrency: int):
+    """(latencies of successful calls, number of failed calls)."""
+    from llm.groq_client import async_call_groq
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await async_call_groq("Salary delayed, EMI pending")
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return latencies, failures
+
+async def run_agent_request(number: int):
+    from agent.agent_runner import arun_agent
+    from agent.state import AgentState
+
+    start = time.perf_counter()
+    state = await arun_agent(AgentState(user_input=f"Salary delayed, EMI pending (resilience {number})"))
+    return time.perf_counter() - start, state.output
+
+async def deadline_check():
+    import llm.groq_client as groq_client
+    from nodes.reasoning_node import create_default_response
+
+    configure_fake(latency=5.0)
+    groq_client.LLM_DEADLINE_SECONDS = 0.5
+    try:
+        elapsed, output = await run_agent_request(0)
+    finally:
+        groq_client.LLM_DEADLINE_SECONDS = 30.0
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "fallback": output == create_default_response(),
+        "ok": elapsed < 1.0 and output == create_default_response(),
+    }
+
+async def retry_check(requests: int, **fault):
+    retry_after = 0.3
+    configure_fake(retry_after_ms=int(retry_after * 1000), **fault)
+    latencies, failures = await timed_calls(requests, concurrency=10)
+    calls = fake_requests()
+    # A retry after a 429 waits at least Retry-After, so no call that needed
+    # one finishes between a clean reply (~50ms) and Retry-After. 5xx
+    # replies carry no Retry-After; plain jittered backoff applies there.
+    early = []
+    if "rate_limit_rate" in fault:
+        early = [latency for latency in latencies if 0.15 < latency < retry_after]
+    return {
+        "requests": requests,
+        "failed": failures,
+        "retries": calls - requests,
+        "retried_before_retry_after": len(early),
+        "ok": failures <= requests * 0.1 and calls > requests and not early,
+    }
+
+async def hedging_check(requests: int):
+    import llm.groq_client as groq_client
+
+    results = {}
+    for hedged in (False, True):
+        configure_fake(latency=0.2, latency_dist="lognormal", jitter=1.0)
+        groq_client.LLM_HEDGE_ENABLED = hedged
+        groq_client._latencies.clear()
+        await timed_calls(40, concurrency=10)  # warm the latency tracker
+        configure_fake(latency=0.2, latency_dist="lognormal", jitter=1.0)
+        latencies, failures = await timed_calls(requests, concurrency=10)
+        results["hedged" if hedged else "plain"] = {
+            "p50_ms": round(statistics.median(latencies) * 1000),
+            "p95_ms": round(percentile(latencies, 95) * 1000),
+            "p99_ms": round(percentile(latencies, 99) * 1000),
+            "extra_groq_calls": f"{fake_requests() / requests - 1:.1%}",
+            "failed": failures,
+        }
+    groq_client.LLM_HEDGE_ENABLED = False
+    results["ok"] = results["hedged"]["p99_ms"] < results["plain"]["p99_ms"]
+    return results
+
+async def breaker_check():
+    import llm.groq_client as groq_client
+    from llm.resilience import CircuitBreaker
+    from nodes.reasoning_node import create_default_response
+
+    reset_seconds = 1.0
+    groq_client.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=reset_seconds)
+    configure_fake(error_rate=1.0)
+
+    outage = [await run_agent_request(number) for number in range(1, 11)]
+    calls_during_outage = fake_requests()
+    state_during_outage = groq_client.breaker.state
+    fast = [elapsed for elapsed, _ in outage[3:]]
+
+    configure_fake()
+    await asyncio.sleep(reset_seconds + 0.1)
+    _, output = await run_agent_request(11)
+    return {
+        "state_during_outage": state_during_outage,
+        "groq_calls_during_outage": calls_during_outage,
+        "open_fallback_max_ms": round(max(fast) * 1000, 2),
+        "all_fallbacks": all(output == create_default_response() for _, output in outage),
+        "recovered": output != create_default_response(),
+        "state_after_recovery": groq_client.breaker.state,
+        "ok": (max(fast) < 0.05 and calls_during_outage <= 3 * (groq_client.LLM_MAX_RETRIES + 1)
+               and output != create_default_response() and groq_client.breaker.state == "closed"),
+    }
+
+async def probe_check(exit_kind: str):
+    import llm.groq_client as groq_client
+    from llm.resilience import CircuitBreaker, Deadline
+    from llm.scheduler import scheduler_for
+
+    reset_seconds = 0.3
+    groq_client.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=reset_seconds)
+    groq_client.breaker.record_failure()
+    await asyncio.sleep(reset_seconds + 0.05)
+
+    scheduler = scheduler_for(groq_client.MODEL_NAME)
+    if exit_kind == "bad_request":
+        configure_fake(error_rate=1.0, error_status=400)
+    elif exit_kind == "json_validate_failed":
+        configure_fake(malformed_rate=1.0, malformed_kind="prose")
+    elif exit_kind == "queue_timeout":
+        # Rate-limit queue held shut for longer than the probe's deadline
+        scheduler.enabled = True
+        scheduler.pause(2.0)
+    elif exit_kind == "cancelled":
+        configure_fake(latency=2.0)
+    probe = asyncio.ensure_future(groq_client.async_call_groq("Salary delayed, EMI pending",
+                                                              deadline=Deadline(0.5)))
+    try:
+        if exit_kind == "cancelled":
+            await asyncio.sleep(0.1)
+            probe.cancel()
+        await probe
+    except BaseException:
+        pass
+    finally:
+        scheduler.enabled = False
+        scheduler._paused_until = scheduler.clock()
+    state_after_probe = groq_client.breaker.state
+
+    configure_fake()
+    await asyncio.sleep(reset_seconds + 0.05)
+    try:
+        recovered = bool(await groq_client.async_call_groq("Salary delayed, EMI pending"))
+    except Exception:
+        recovered = False
+    return {
+        "state_after_probe": state_after_probe,
+        "recovered": recovered,
+        "state_after_recovery": groq_client.breaker.state,
+        "ok": state_after_probe == "open" and recovered and groq_client.breaker.state == "closed",
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+    fake_server = start_fake_groq(0.05, FAKE_PORT, seed=7)
+
+    async def run_all():
+        from llm.groq_client import close_async_client
+
+        try:
+            return {
+                "deadline": await deadline_check(),
+                "retry_429": await retry_check(args.requests, rate_limit_rate=0.3),
+                "retry_5xx": await retry_check(args.requests, error_rate=0.3),
+                "hedging": await hedging_check(args.requests),
+                "circuit_breaker": await breaker_check(),
+                **{f"probe_{kind}": await probe_check(kind)
+                   for kind in ("bad_request", "json_validate_failed", "queue_timeout", "cancelled")},
+            }
+        finally:
+            await close_async_client()
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        fake_server.terminate()
+
+    for name, result in results.items():
+        print(f"{name}: {result}")
+    failed = [name for name, result in results.items() if not result["ok"]]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Checks that concurrent identical reasoning requests share one Groq call
+(single-flight), against the local fake Groq server:
+
+- async: N identical /chat-style requests on one event loop
+- threads: N identical sync run_agent calls from a thread pool
+- stream_mixed: streamed and non-streamed requests for the same input
+- sync_and_async: sync threads and an event loop in flight together
+- distinct: different inputs still get one call each
+- disabled: with single-flight off, every request calls Groq (baseline)
+
+Identical means the same normalized input, steps and emergency flag, so
+the requests vary in case and whitespace. Each check expects exactly one
+upstream call per distinct input and no fallback plans.
+
+    python -m benchmarks.load_test_single_flight --requests 50
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8910
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+LATENCY = 0.5
+
+def reset_fake():
+    import httpx
+
+    httpx.post(f"{FAKE_URL}/_fake/config", json={"latency": LATENCY}).raise_for_status()
+
+def fake_requests() -> int:
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()["requests"]
+
+def variants(user_input: str, count: int):
+    """The same request as users type it: different case and spacing."""
+    forms = (user_input, user_input.upper(), f"  {user_input}  ", user_input.replace(" ", "   "))
+    return [forms[number % len(forms)] for number in range(count)]
+
+def new_state(user_input: str):
+    from agent.state import AgentState
+
+    return AgentState(user_input=user_input)
+
+def sync_request(user_input: str):
+    from agent.agent_runner import run_agent
+
+    return run_agent(new_state(user_input)).output
+
+async def async_request(user_input: str):
+    from agent.agent_runner import arun_agent
+
+    return (await arun_agent(new_state(user_input))).output
+
+async def stream_request(user_input: str):
+    from agent.agent_runner import astream_agent
+
+    plan = None
+    async for event, data in astream_agent(new_state(user_input)):
+        if event == "plan":
+            plan = data
+    return plan
+
+def result(outputs, expected_calls: int, started: float):
+    from nodes.reasoning_node import create_default_response
+
+    calls = fake_requests()
+    fallbacks = sum(output == create_default_response() for output in outputs)
+    return {
+        "requests": len(outputs),
+        "groq_calls": calls,
+        "fallbacks": fallbacks,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        "ok": calls == expected_calls and fallbacks == 0 and None not in outputs,
+    }
+
+def prepare():
+    from llm.response_cache import response_cache
+
+    response_cache.clear()
+    reset_fake()
+    return time.perf_counter()
+
+async def async_check(requests: int):
+    started = prepare()
+    outputs = await asyncio.gather(*(async_request(text) for text in variants("Salary delayed, EMI pending", requests)))
+    return result(outputs, 1, started)
+
+def thread_check(requests: int):
+    started = prepare()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        outputs = list(pool.map(sync_request, variants("Rent is due and I am short this month", requests)))
+    return result(outputs, 1, started)
+
+async def stream_mixed_check(requests: int):
+    started = prepare()
+    texts = variants("My bank account is frozen and bills are due", requests)
+    outputs = await asyncio.gather(*(
+        (stream_request if number % 2 else async_request)(text) for number, text in enumerate(texts)
+    ))
+    return result(outputs, 1, started)
+
+async def sync_and_async_check(requests: int):
+    started = prepare()
+    texts = variants("Lost my job and the EMI is due next week", requests)
+    outputs = []
+    # Threads with their own blocking Groq client, alongside this event loop
+    threads = [threading.Thread(target=lambda text=text: outputs.append(sync_request(text)))
+               for text in texts[: requests // 2]]
+    for thread in threads:
+        thread.start()
+    outputs.extend(await asyncio.gather(*(async_request(text) for text in texts[requests // 2:])))
+    await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+    return result(outputs, 1, started)
+
+async def distinct_check(requests: int):
+    started = prepare()
+    inputs = [f"Salary delayed for {months} months, EMI pending" for months in range(2, 7)]
+    texts = [text for user_input in inputs for text in variants(user_input, requests // len(inputs))]
+    outputs = await asyncio.gather(*(async_request(text) for text in texts))
+    return result(outputs, len(inputs), started)
+
+async def disabled_check(requests: int):
+    from llm.single_flight import plan_flights
+
+    started = prepare()
+    plan_flights.enabled = False
+    try:
+        outputs = await asyncio.gather(*(async_request(text) for text in variants("Medical bills piling up", requests)))
+    finally:
+        plan_flights.enabled = True
+    return result(outputs, requests, started)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+    fake_server = start_fake_groq(LATENCY, FAKE_PORT)
+
+    async def run_async(check):
+        from llm.groq_client import close_async_client
+
+        try:
+            return await check(args.requests)
+        finally:
+            await close_async_client()
+
+    try:
+        results = {
+            "async": asyncio.run(run_async(async_check)),
+            "threads": thread_check(args.requests),
+            "stream_mixed": asyncio.run(run_async(stream_mixed_check)),
+            "sync_and_async": asyncio.run(run_async(sync_and_async_check)),
+            "distinct": asyncio.run(run_async(distinct_check)),
+            "disabled": asyncio.run(run_async(disabled_check)),
+        }
+    finally:
+        fake_server.terminate()
+
+    from llm.single_flight import plan_flights
+
+    for name, outcome in results.items():
+        print(f"{name}: {outcome}")
+    failed = [name for name, outcome in results.items() if not outcome["ok"]]
+    if plan_flights.in_flight():
+        failed.append("flights_left_in_flight")
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Simulation of the Groq rate-limit scheduler (llm/scheduler.py) on a
+synthetic arrival trace, with a virtual clock: no Groq, no sleeping.
+
+The trace has steady traffic at about 60% of the request budget, then an
+incident (a bank outage, a salary-delay wave) at several times the
+budget, then a recovery. Each call's priority and size follow the app's
+mix: urgent (emergency / high-severity) plans, first plans, Need Help
+re-evaluations and alternatives prefetches. Calls report somewhat fewer
+tokens than estimated when they finish, as real replies do.
+
+The same trace also runs through a FIFO scheduler (every call at one
+priority), as a baseline. Checks:
+
+- budget: no 60s window admits more requests or tokens than the limit
+- priority: during the incident, waits are ordered urgent < plan <
+  need_help < prefetch, and urgent calls wait less than under FIFO
+- fifo: within a priority, calls are admitted in arrival order
+- drained: every call is admitted by the end of the trace
+
+    python -m benchmarks.sim_scheduler
+"""
+import argparse
+import heapq
+import random
+import statistics
+
+# (priority, share of calls, prompt characters)
+MIX = [
+    ("urgent", 0.10, 3200),
+    ("plan", 0.45, 3000),
+    ("need_help", 0.20, 500),
+    ("prefetch", 0.25, 900),
+]
+CALL_SECONDS = 2.0
+PROMPT_TEXT = "My salary is delayed by three weeks and the EMI on my car loan is due on Friday. "
+
+def make_trace(seconds: float, base_rate: float, incident: tuple, seed: int):
+    """[(arrival time, priority, prompt characters)], Poisson arrivals."""
+    rng = random.Random(seed)
+    start, end, multiplier = incident
+    trace, now = [], 0.0
+    while True:
+        rate = base_rate * (multiplier if start <= now < end else 1.0)
+        now += rng.expovariate(rate)
+        if now >= seconds:
+            return trace
+        priority, _, chars = rng.choices(MIX, weights=[share for _, share, _ in MIX])[0]
+        trace.append((now, priority, int(chars * rng.uniform(0.8, 1.2))))
+
+def simulate(trace, requests_per_minute: int, tokens_per_minute: int, fifo: bool, seed: int):
+    """Run the trace; returns one record per call."""
+    from llm.scheduler import GroqScheduler, estimate_tokens
+
+    clock = [0.0]
+    scheduler = GroqScheduler("sim", requests_per_minute, tokens_per_minute,
+                              clock=lambda: clock[0], enabled=True)
+    rng = random.Random(seed)
+    settles = []  # heap of (finish time, estimated, actual)
+    calls = []
+    pending = list(reversed(trace))
+    next_admission = None
+
+    while pending or scheduler.depth() or settles:
+        candidates = [pending[-1][0]] if pending else []
+        if next_admission is not None:
+            candidates.append(clock[0] + next_admission)
+        if settles:
+            candidates.append(settles[0][0])
+        clock[0] = max(clock[0], min(candidates))
+
+        while settles and settles[0][0] <= clock[0]:
+            _, estimated, actual = heapq.heappop(settles)
+            scheduler.settle(estimated, actual)
+        while pending and pending[-1][0] <= clock[0]:
+            arrival, priority, chars = pending.pop()
+            tokens = estimate_tokens((PROMPT_TEXT * (chars // len(PROMPT_TEXT) + 1))[:chars])
+            ticket = scheduler.submit("plan" if fifo else priority, tokens)
+            calls.append({"arrival": arrival, "priority": priority, "tokens": tokens,
+                          "actual": int(tokens * rng.uniform(0.6, 1.05)), "ticket": ticket})
+        next_admission = scheduler.dispatch()
+
+        for call in calls:
+            if "admitted" not in call and call["ticket"].future.done():
+                call["admitted"] = call["arrival"] + call["ticket"].future.result()
+                heapq.heappush(settles, (call["admitted"] + CALL_SECONDS, call["tokens"], call["actual"]))
+    return calls
+
+def max_window(calls, key, window: float = 60.0) -> float:
+    """Most requests (key=None) or actual tokens admitted in any `window` seconds."""
+    events = sorted((call["admitted"], 1 if key is None else call[key]) for call in calls)
+    total, best, start = 0, 0, 0
+    for end in range(len(events)):
+        total += events[end][1]
+        while events[start][0] <= events[end][0] - window:
+            total -= events[start][1]
+            start += 1
+        best = max(best, total)
+    return best
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))] if values else 0.0
+
+def wait_summary(calls, incident):
+    start, end, _ = incident
+    summary = {}
+    for priority, _, _ in MIX:
+        waits = [call["admitted"] - call["arrival"] for call in calls
+                 if call["priority"] == priority and start <= call["arrival"] < end]
+        summary[priority] = {
+            "calls": len(waits),
+            "mean_s": round(statistics.mean(waits), 2) if waits else 0.0,
+            "p95_s": round(percentile(waits, 95), 2),
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--requests-per-minute", type=int, default=300)
+    parser.add_argument("--tokens-per-minute", type=int, default=300000)
+    parser.add_argument("--incident-multiplier", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    incident = (120.0, 300.0, args.incident_multiplier)
+    trace = make_trace(args.seconds, 0.6 * args.requests_per_minute / 60, incident, args.seed)
+    prioritized = simulate(trace, args.requests_per_minute, args.tokens_per_minute, False, args.seed)
+    fifo = simulate(trace, args.requests_per_minute, args.tokens_per_minute, True, args.seed)
+
+    waits, fifo_waits = wait_summary(prioritized, incident), wait_summary(fifo, incident)
+    print(f"{len(trace)} calls over {args.seconds:.0f}s, incident {incident[0]:.0f}-{incident[1]:.0f}s "
+          f"at {args.incident_multiplier}x; limits {args.requests_per_minute} req/min, "
+          f"{args.tokens_per_minute} tokens/min")
+    print(f"\nwaits during the incident:\n{'priority':>10} {'calls':>6} {'mean':>8} {'p95':>8} "
+          f"{'FIFO mean':>10} {'FIFO p95':>9}")
+    for priority in waits:
+        row, base = waits[priority], fifo_waits[priority]
+        print(f"{priority:>10} {row['calls']:>6} {row['mean_s']:>7.2f}s {row['p95_s']:>7.2f}s "
+              f"{base['mean_s']:>9.2f}s {base['p95_s']:>8.2f}s")
+
+    request_peak = max_window(prioritized, None)
+    token_peak = max_window(prioritized, "actual")
+    means = [waits[priority]["mean_s"] for priority, _, _ in MIX]
+    in_order = all(
+        [call["arrival"] for call in sorted(
+            (call for call in prioritized if call["priority"] == priority), key=lambda call: call["admitted"]
+        )] == sorted(call["arrival"] for call in prioritized if call["priority"] == priority)
+        for priority, _, _ in MIX
+    )
+    checks = {
+        "budget": request_peak <= args.requests_per_minute and token_peak <= args.tokens_per_minute,
+        "priority": means == sorted(means) and waits["urgent"]["p95_s"] < fifo_waits["urgent"]["p95_s"],
+        "fifo": in_order,
+        "drained": all("admitted" in call for call in prioritized),
+    }
+    print(f"\npeak 60s window: {request_peak} requests, {token_peak} tokens")
+    for name, ok in checks.items():
+        print(f"{name}: {'ok' if ok else 'FAIL'}")
+    failed = [name for name, ok in checks.items() if not ok]
+    print(f"\nFAIL: {', '.join(failed)}" if failed else "\nOK")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
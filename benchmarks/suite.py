@@ -0,0 +1,301 @@
+"""
+Offline benchmark suite: runs every scenario against the local fake Groq
+server and writes one JSON report, so two commits can be compared without
+spending Groq quota.
+
+    python -m benchmarks.suite --output bench.json
+    git checkout other-branch
+    python -m benchmarks.suite --output other.json --compare bench.json
+
+Scenarios:
+
+- single_request: sequential reasoning_node calls (cache misses), in process
+- chat_concurrent_cN: N concurrent /chat requests on the FastAPI app,
+  served by uvicorn in its own process
+- chat_stream_cN: the same over /chat/stream, plus time to first event
+- cache_mix_hitN: /chat with N% exact-cache hits, the rest misses
+- parse_failure_KIND: every reply malformed (truncated or prose)
+- rate_limited: a share of calls answered with 429, retried by the SDK
+
+Latency figures are in milliseconds. "fallbacks" counts requests that
+ended in create_default_response().
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.fake_groq import start_fake_groq
+
+FAKE_PORT = 8904
+FAKE_URL = f"http://127.0.0.1:{FAKE_PORT}"
+APP_PORT = 8905
+APP_URL = f"http://127.0.0.1:{APP_PORT}"
+
+# Distinct financial inputs; a request number keeps each one an exact-cache miss
+INPUTS = [
+    "Salary delayed, EMI pending",
+    "Lost my job and rent is due next week",
+    "Someone stole my bike, loan still running",
+    "Medical bills piling up after surgery",
+    "Credit card debt is out of control",
+    "Got scammed on a UPI payment",
+]
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+def summarize(latencies, wall: float, errors: int = 0, fallbacks: int = 0, **extra):
+    latencies = sorted(latencies)
+    requests = len(latencies) + errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "fallbacks": fallbacks,
+        "requests_per_second": round(requests / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+        **extra,
+    }
+
+def miss_input(scenario: str, number: int) -> str:
+    return f"{INPUTS[number % len(INPUTS)]} ({scenario} request {number})"
+
+def is_fallback(output) -> bool:
+    from nodes.reasoning_node import create_default_response
+
+    return output == create_default_response()
+
+def configure_fake(**settings):
+    """Apply settings (none: keep the current ones) and reset the fake server's stats."""
+    import httpx
+
+    response = httpx.post(f"{FAKE_URL}/_fake/config", json=settings)
+    response.raise_for_status()
+
+def fake_stats():
+    import httpx
+
+    return httpx.get(f"{FAKE_URL}/_fake/stats").json()
+
+def start_app(port: int):
+    """The FastAPI app under uvicorn, talking to the fake Groq server."""
+    import httpx
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/cache/stats")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("app server did not start")
+
+def single_request(requests: int):
+    from agent.state import AgentState
+    from nodes.reasoning_node import reasoning_node
+
+    latencies, fallbacks = [], 0
+    wall_start = time.perf_counter()
+    for number in range(requests):
+        start = time.perf_counter()
+        state = reasoning_node(AgentState(user_input=miss_input("single_request", number)))
+        latencies.append(time.perf_counter() - start)
+        fallbacks += is_fallback(state.output)
+    return summarize(latencies, time.perf_counter() - wall_start, fallbacks=fallbacks)
+
+async def drive_chat(inputs, concurrency: int, stream: bool = False):
+    """POST every input to /chat (or /chat/stream), at most `concurrency` at once."""
+    import httpx
+
+    path = "/chat/stream" if stream else "/chat"
+    latencies, first_events = [], []
+    counts = {"errors": 0, "fallbacks": 0}
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=APP_URL, limits=limits, timeout=120) as http:
+        async def one(user_input):
+            async with gate:
+                payload = {"user_input": user_input, "steps": 5, "emergency": False}
+                start = time.perf_counter()
+                try:
+                    if stream:
+                        output = await read_stream(http, path, payload, start, first_events)
+                    else:
+                        response = await http.post(path, json=payload)
+                        response.raise_for_status()
+                        output = response.json()
+                except Exception:
+                    counts["errors"] += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+                counts["fallbacks"] += is_fallback(output)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one(user_input) for user_input in inputs))
+        wall = time.perf_counter() - wall_start
+
+    extra = {"concurrency": concurrency}
+    if stream:
+        first_events.sort()
+        extra["first_event_p50_ms"] = round(percentile(first_events, 50) * 1000, 1)
+        extra["first_event_p95_ms"] = round(percentile(first_events, 95) * 1000, 1)
+    return summarize(latencies, wall, **counts, **extra)
+
+async def read_stream(http, path, payload, start, first_events):
+    """Read an SSE reply; record time to the first event and return the plan."""
+    plan, event = None, None
+    async with http.stream("POST", path, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                if event is None:
+                    first_events.append(time.perf_counter() - start)
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "plan":
+                plan = json.loads(line[len("data: "):])
+    return plan
+
+def chat_concurrent(scenario: str, requests: int, concurrency: int, stream: bool = False):
+    inputs = [miss_input(scenario, number) for number in range(requests)]
+    return asyncio.run(drive_chat(inputs, concurrency, stream))
+
+def cache_mix(scenario: str, requests: int, concurrency: int, hit_ratio: float):
+    # Hits repeat inputs primed before the timed run; misses are fresh inputs
+    primed = [f"{user_input} ({scenario})" for user_input in INPUTS]
+    asyncio.run(drive_chat(primed, concurrency))
+    configure_fake()  # don't count the priming calls
+
+    hits = round(requests * hit_ratio)
+    inputs = []
+    for number in range(requests):
+        if number * hits // requests != (number + 1) * hits // requests:
+            inputs.append(primed[number % len(primed)])
+        else:
+            inputs.append(miss_input(scenario, number))
+    result = asyncio.run(drive_chat(inputs, concurrency))
+    result["hit_ratio"] = hit_ratio
+    return result
+
+def scenarios(args):
+    """(name, fake server settings, callable) for every scenario, in run order."""
+    requests, concurrency = args.requests, args.concurrency
+    entries = [("single_request", {}, lambda name: single_request(args.single_requests))]
+    entries.append((f"chat_concurrent_c{concurrency}", {},
+                    lambda name: chat_concurrent(name, requests, concurrency)))
+    entries.append((f"chat_stream_c{concurrency}", {},
+                    lambda name: chat_concurrent(name, requests, concurrency, stream=True)))
+    for hit_ratio in args.hit_ratios:
+        entries.append((f"cache_mix_hit{round(hit_ratio * 100)}", {},
+                        lambda name, hit_ratio=hit_ratio: cache_mix(name, requests, concurrency, hit_ratio)))
+    for kind in ("truncated", "prose"):
+        entries.append((f"parse_failure_{kind}", {"malformed_rate": 1.0, "malformed_kind": kind},
+                        lambda name: chat_concurrent(name, requests, concurrency)))
+    entries.append(("rate_limited", {"rate_limit_rate": args.rate_limit_rate},
+                    lambda name: chat_concurrent(name, requests, concurrency)))
+    return entries
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit.stdout.strip(), "dirty": bool(status.stdout.strip())}
+
+def compare(report, baseline):
+    """Print the change of each latency/throughput figure against a baseline report."""
+    metrics = ("p50_ms", "p95_ms", "p99_ms", "requests_per_second")
+    print(f"\n{'scenario':<24}" + "".join(f"{metric:>24}" for metric in metrics))
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for metric in metrics:
+            old, new = before.get(metric, 0), result.get(metric, 0)
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            cells.append(f"{old:>8} -> {new:<8} {change:>6}")
+        print(f"{name:<24}" + "".join(f"{cell:>24}" for cell in cells))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="median fake Groq latency in seconds")
+    parser.add_argument("--latency-dist", choices=("constant", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.3, help="uniform spread or lognormal sigma")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrent scenario")
+    parser.add_argument("--single-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hit-ratios", type=float, nargs="+", default=[0.0, 0.5, 0.9])
+    parser.add_argument("--rate-limit-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--only", nargs="+", help="run only these scenarios (name prefixes)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    os.environ["GROQ_BASE_URL"] = FAKE_URL
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    # Keep the semantic tier doing its lookup work but never hitting, so a
+    # miss stays a miss; hits in cache_mix come from exact repeats
+    os.environ.setdefault("SEMANTIC_CACHE_THRESHOLD", "1.01")
+    # The fake server has no rate limits; don't pace it like Groq
+    os.environ.setdefault("GROQ_SCHEDULER_ENABLED", "false")
+    # Library plans never reach the LLM; these scenarios measure the LLM path
+    os.environ.setdefault("PLAN_LIBRARY_ENABLED", "false")
+
+    base_settings = {"latency": args.latency, "latency_dist": args.latency_dist, "jitter": args.jitter}
+    fake_server = start_fake_groq(args.latency, FAKE_PORT, seed=args.seed)
+    app_server = start_app(APP_PORT)
+    report = {
+        "meta": {
+            **git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "fake_groq": {**base_settings, "seed": args.seed},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {},
+    }
+    try:
+        for name, settings, run in scenarios(args):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            configure_fake(**{**base_settings, "malformed_rate": 0.0, "rate_limit_rate": 0.0, **settings})
+            result = run(name)
+            result["fake_groq"] = {key: value for key, value in fake_stats().items() if key != "config"}
+            report["scenarios"][name] = result
+            print(f"{name}: {result}", file=sys.stderr)
+    finally:
+        app_server.terminate()
+        fake_server.terminate()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
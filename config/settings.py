@@ -8,3 +8,187 @@ MODEL_NAME = "llama-3.3-70b-versatile"
 
 MAX_STEPS = 7
 OPTIMAL_STEPS = 5
+
+# Connection pool for the shared async Groq client
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "200"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "50"))
+
+# Exact-match response cache in front of the reasoning LLM call
+# Backend: "memory" (per process), "sqlite" (shared by workers) or "none"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_SQLITE_PATH = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "response_cache.sqlite3")
+
+# Semantic (near-duplicate) cache tier, checked after an exact-cache miss.
+# Plans are only shared between inputs with the same pre-classifier category
+# and matched feature groups, never for negated or danger inputs. Off by
+# default: serving a plan written for someone else's message needs a
+# measured near-miss false-positive rate first (benchmarks/bench_semantic_cache.py).
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# Search is one (batch x dim) @ (dim x entries) product: 128 keeps a batched
+# query under 1 ms at 100k entries; scoping, not the dimension, keeps near
+# misses apart (bench_semantic_cache)
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "128"))
+
+# Local pre-classifier: confident non-financial inputs are answered without an LLM call
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "true").lower() == "true"
+PRECLASSIFIER_REJECT_CONFIDENCE = float(os.getenv("PRECLASSIFIER_REJECT_CONFIDENCE", "0.85"))
+
+# "Need Help" alternatives, prefetched in one batched call per plan
+ALTERNATIVES_PREFETCH_ENABLED = os.getenv("ALTERNATIVES_PREFETCH_ENABLED", "true").lower() == "true"
+ALTERNATIVES_PREFETCH_WORKERS = int(os.getenv("ALTERNATIVES_PREFETCH_WORKERS", "4"))
+
+# Compacted assessments kept in AgentState.history (ring buffer)
+STATE_HISTORY_MAX_ENTRIES = int(os.getenv("STATE_HISTORY_MAX_ENTRIES", "20"))
+
+# Conversation memory (agent/memory.py): the last MEMORY_RECENT_TURNS turns
+# go into the reasoning prompt verbatim, older ones as one-line summaries
+# (crisis_type, severity, completed steps), all within MEMORY_TOKEN_BUDGET
+# tokens (utils/tokens.py estimate). Memories live in the session store.
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "600"))
+MEMORY_SUMMARY_MAX_ENTRIES = int(os.getenv("MEMORY_SUMMARY_MAX_ENTRIES", "20"))
+
+# Session store (agent/session_store.py): conversation memory and Streamlit
+# chat/step progress per session. "memory" keeps sessions in process;
+# "sqlite" also writes them behind to a file, batched every
+# SESSION_FLUSH_INTERVAL_SECONDS (0 writes through on every save), so a
+# restart or another worker on the host can resume them. Sessions expire
+# SESSION_TTL_SECONDS after their last save; at most SESSION_MAX_IN_MEMORY
+# stay in process (LRU) and only the last SESSION_MAX_MESSAGES chat
+# messages are kept.
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_STORE_SQLITE_PATH = os.getenv("SESSION_STORE_SQLITE_PATH", "sessions.sqlite3")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_MAX_IN_MEMORY = int(os.getenv("SESSION_MAX_IN_MEMORY", "10000"))
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", "1.0"))
+SESSION_FLUSH_MAX_BATCH = int(os.getenv("SESSION_FLUSH_MAX_BATCH", "256"))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "50"))
+
+# /chat/batch: items run BATCH_CONCURRENCY at a time (a request may ask for
+# fewer, or up to BATCH_MAX_CONCURRENCY), below interactive traffic in the
+# Groq scheduler
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+# Admission control for /chat and /chat/stream (agent/admission.py): at most
+# ADMISSION_MAX_IN_FLIGHT requests run per worker (by default one per Groq
+# connection; more would only wait for one), the rest wait in a bounded
+# queue per priority, emergency=True first. A request that would not finish
+# within ADMISSION_DEADLINE_SECONDS (expected queue wait plus the running
+# average request time), or finds its queue full, gets a degraded local
+# answer (the general plan and emergency contacts) at once.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(GROQ_MAX_CONNECTIONS)))
+ADMISSION_DEADLINE_SECONDS = float(os.getenv("ADMISSION_DEADLINE_SECONDS", "8"))
+# Starting estimate of a request's time, until requests have been measured
+ADMISSION_SERVICE_SECONDS = float(os.getenv("ADMISSION_SERVICE_SECONDS", "2"))
+# Highest first
+ADMISSION_PRIORITIES = ("emergency", "chat")
+ADMISSION_QUEUE_LIMITS = {
+    "emergency": int(os.getenv("ADMISSION_EMERGENCY_QUEUE_LIMIT", "256")),
+    "chat": int(os.getenv("ADMISSION_CHAT_QUEUE_LIMIT", "128")),
+}
+
+# Per-request stage times and token usage in /chat response headers
+# (Server-Timing and X-LLM-Tokens) and in the /chat/stream done event
+METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "false").lower() == "true"
+
+# Resilient Groq calls: overall deadline per call, retries on 429/5xx,
+# optional hedged second request, and a circuit breaker
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.25"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+CIRCUIT_BREAKER_FAILURES = int(os.getenv("CIRCUIT_BREAKER_FAILURES", "5"))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+
+# Ask Groq for a JSON object (response_format json_object) on non-streamed
+# calls; replies are then validated against llm/output_schema.json
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "true").lower() == "true"
+
+# Single-flight: concurrent identical reasoning requests (same normalized
+# input, steps, emergency) share one in-flight LLM call. Followers give up
+# and fall back after SINGLE_FLIGHT_WAIT_SECONDS.
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "65"))
+
+# Plan library (llm/plan_library.json): vetted plans for the common crisis
+# categories, served without an LLM call when the pre-classifier is confident
+# and its matched terms account for the whole (short, un-negated, danger-free)
+# input, so a generic plan covers it. With
+# PLAN_LIBRARY_PERSONALIZE, a small-model call rewrites crisis_type and
+# final_advice for the user; the steps always come from the library.
+PLAN_LIBRARY_ENABLED = os.getenv("PLAN_LIBRARY_ENABLED", "true").lower() == "true"
+PLAN_LIBRARY_PATH = os.getenv(
+    "PLAN_LIBRARY_PATH", os.path.join(os.path.dirname(__file__), "..", "llm", "plan_library.json")
+)
+PLAN_LIBRARY_MIN_CONFIDENCE = float(os.getenv("PLAN_LIBRARY_MIN_CONFIDENCE", "0.85"))
+PLAN_LIBRARY_MAX_INPUT_CHARS = int(os.getenv("PLAN_LIBRARY_MAX_INPUT_CHARS", "200"))
+# Share of the message's non-filler words the matched classifier terms must cover
+PLAN_LIBRARY_MIN_COVERAGE = float(os.getenv("PLAN_LIBRARY_MIN_COVERAGE", "0.9"))
+PLAN_LIBRARY_PERSONALIZE = os.getenv("PLAN_LIBRARY_PERSONALIZE", "false").lower() == "true"
+PLAN_LIBRARY_PERSONALIZE_DEADLINE_SECONDS = float(os.getenv("PLAN_LIBRARY_PERSONALIZE_DEADLINE_SECONDS", "3"))
+
+# Model router: which model each kind of LLM call uses (see llm/router.py).
+# Short, low-severity plans and Need Help re-evaluations go to the small
+# model; emergency and high-severity plans stay on the large one. A small
+# model reply that fails plan/alternatives validation is retried on the
+# "escalation" tier.
+MODEL_ROUTER_ENABLED = os.getenv("MODEL_ROUTER_ENABLED", "true").lower() == "true"
+SMALL_MODEL_NAME = os.getenv("SMALL_MODEL_NAME", "llama-3.1-8b-instant")
+MODEL_TIERS = {
+    "small": SMALL_MODEL_NAME,
+    "large": MODEL_NAME,
+}
+MODEL_ROUTES = {
+    "plan_emergency": "large",       # emergency=True, or a pre-classifier danger term
+    "plan_high_severity": "large",   # pre-classifier category in ROUTER_HIGH_SEVERITY_CATEGORIES
+    "plan_short": "small",           # input up to ROUTER_SHORT_INPUT_CHARS, nothing above
+    "plan": "large",                 # any other plan
+    "alternatives": "small",         # Need Help re-evaluations
+    "personalize": "small",          # plan library crisis_type / final_advice
+    "escalation": "large",
+}
+ROUTER_SHORT_INPUT_CHARS = int(os.getenv("ROUTER_SHORT_INPUT_CHARS", "160"))
+ROUTER_HIGH_SEVERITY_CATEGORIES = {"fraud", "medical_bills", "vehicle_theft", "job_loss"}
+
+# Rate-limit scheduler in front of every Groq call (llm/scheduler.py):
+# request and token budgets per model tier, matching the Groq account's
+# per-minute limits, and the order queued calls go out in when a budget
+# runs short. Tokens are estimated from the prompt (utils/tokens.py) plus
+# an expected reply size, then corrected from the usage Groq reports.
+GROQ_SCHEDULER_ENABLED = os.getenv("GROQ_SCHEDULER_ENABLED", "true").lower() == "true"
+GROQ_RATE_LIMITS = {
+    "large": {
+        "requests_per_minute": int(os.getenv("GROQ_LARGE_REQUESTS_PER_MINUTE", "1000")),
+        "tokens_per_minute": int(os.getenv("GROQ_LARGE_TOKENS_PER_MINUTE", "300000")),
+    },
+    "small": {
+        "requests_per_minute": int(os.getenv("GROQ_SMALL_REQUESTS_PER_MINUTE", "1000")),
+        "tokens_per_minute": int(os.getenv("GROQ_SMALL_TOKENS_PER_MINUTE", "250000")),
+    },
+}
+# Buckets hold this many seconds of refill; the refill rate is lowered to
+# match, so a full burst plus 60s of refill stays within each limit
+GROQ_RATE_BURST_SECONDS = float(os.getenv("GROQ_RATE_BURST_SECONDS", "10"))
+GROQ_REPLY_TOKENS_ESTIMATE = int(os.getenv("GROQ_REPLY_TOKENS_ESTIMATE", "600"))
+# Highest first: emergency and high-severity plans, other first plans,
+# Need Help re-evaluations, speculative prefetches, then /chat/batch items
+SCHEDULER_PRIORITIES = ("urgent", "plan", "need_help", "prefetch", "batch")
+ROUTE_PRIORITIES = {
+    "plan_emergency": "urgent",
+    "plan_high_severity": "urgent",
+    "plan_short": "plan",
+    "plan": "plan",
+    "alternatives": "need_help",
+    "personalize": "plan",
+}
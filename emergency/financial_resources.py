@@ -1,3 +1,6 @@
+from functools import lru_cache
+from utils.keyword_matcher import KeywordMatcher
+
 FINANCIAL_SUPPORT = {
     "india": [
         "https://www.nabard.org",
@@ -28,28 +31,58 @@ EMERGENCY_CONTACTS = {
 def get_resources(region="india"):
     return FINANCIAL_SUPPORT.get(region, [])
 
+# Declarative trigger table: term groups, with optional per-region additions
+TRIGGER_TERMS = {
+    "default": {
+        "vehicle": ["car", "cars", "vehicle", "vehicles", "bike", "bikes", "scooter", "scooty",
+                    "motorcycle", "motorbike"],
+        "theft": ["stolen", "stole", "steal", "theft", "thief", "robbery", "robbed", "snatched",
+                  "fraud", "scam", "scammed", "cheated"],
+        "lost": ["lost", "missing"],
+        "medical": ["medical", "medical emergency", "hospital", "hospitalized", "accident",
+                    "injury", "injured", "ambulance"],
+        "consumer": ["fraud", "scam", "scammed", "cheated", "consumer", "consumer complaint"],
+    },
+    "india": {
+        "theft": ["chori", "chor"],
+        "lost": ["kho gaya", "kho gayi", "gum ho gaya"],
+    },
+}
+
+# A rule fires when any group in any_of matched, or every group in all_of matched
+CONTACT_RULES = [
+    {"contact": "Police", "resource": "police", "any_of": ["theft"]},
+    {"contact": "Police", "resource": "police", "all_of": ["vehicle", "lost"]},
+    {"contact": "Ambulance", "resource": "ambulance", "any_of": ["medical"]},
+    {"contact": "Consumer Helpline", "resource": "consumer_helpline", "any_of": ["consumer"]},
+]
+
+@lru_cache(maxsize=None)
+def _contact_matcher(region: str):
+    """Compile the trigger table once per region."""
+    rules = {group: list(terms) for group, terms in TRIGGER_TERMS["default"].items()}
+    for group, terms in TRIGGER_TERMS.get(region, {}).items():
+        rules.setdefault(group, []).extend(terms)
+    return KeywordMatcher(rules)
+
 def get_emergency_contacts(situation_text: str, region="india"):
-    """Get emergency contacts only when truly needed (police/ambulance/consumer)."""
+    """
+    Get emergency contacts only when truly needed (police/ambulance/consumer).
+    The text is scanned once with whole-word matching, so "scar" does not
+    trigger "car" and "emergency fund" does not trigger an ambulance.
+    """
     contacts = {}
-    
-    situation_lower = situation_text.lower()
-
-    vehicle_terms = ["car", "vehicle", "bike", "scooter", "motorcycle"]
-    theft_terms = ["stolen", "theft", "robbery", "fraud", "scam", "cheated"]
-    lost_terms = ["lost", "missing"]
-
-    # Police-related: theft/robbery/fraud or lost vehicle
-    if any(term in situation_lower for term in theft_terms) or (
-        any(v in situation_lower for v in vehicle_terms) and any(l in situation_lower for l in lost_terms)
-    ):
-        contacts["Police"] = EMERGENCY_CONTACTS["police"].get(region, EMERGENCY_CONTACTS["police"]["general"])
-    
-    # Medical emergency
-    if any(word in situation_lower for word in ["medical", "hospital", "health", "accident", "injury", "emergency"]):
-        contacts["Ambulance"] = EMERGENCY_CONTACTS["ambulance"].get(region, EMERGENCY_CONTACTS["ambulance"]["general"])
-    
-    # Consumer issues (fraud/scam)
-    if any(word in situation_lower for word in ["fraud", "scam", "cheated", "consumer"]):
-        contacts["Consumer Helpline"] = EMERGENCY_CONTACTS["consumer_helpline"].get(region, EMERGENCY_CONTACTS["consumer_helpline"]["general"])
-    
+    groups = _contact_matcher(region).labels(situation_text)
+    if not groups:
+        return contacts
+
+    for rule in CONTACT_RULES:
+        if rule["contact"] in contacts:
+            continue
+        if groups.intersection(rule.get("any_of", ())) or (
+            rule.get("all_of") and groups.issuperset(rule["all_of"])
+        ):
+            numbers = EMERGENCY_CONTACTS[rule["resource"]]
+            contacts[rule["contact"]] = numbers.get(region, numbers["general"])
+
     return contacts
@@ -0,0 +1,197 @@
+"""
+"Need Help" alternatives for the action steps of a plan.
+
+As soon as a plan is shown, one batched prompt asks for a simpler
+alternative to every action step, on a small worker pool shared by all
+sessions. The Need Help button then serves from that result instead of
+making the user wait for a fresh LLM call. A step the batch did not cover,
+or a click before the batch has finished, falls back to the original
+single-step prompt at need_help priority; an unfinished batch is cancelled
+rather than waited for.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import ALTERNATIVES_PREFETCH_ENABLED, ALTERNATIVES_PREFETCH_WORKERS
+from llm.output_schema import is_valid_output, repair_alternative
+from llm.prompts import Prompt, PromptTemplate
+from llm.router import task_route, routed_call
+from utils.json_formatter import safe_json_parse
+
+_executor = ThreadPoolExecutor(
+    max_workers=ALTERNATIVES_PREFETCH_WORKERS, thread_name_prefix="alternatives"
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "prefetched": 0,   # batched prefetch calls submitted
+    "cancelled": 0,    # dropped before they reached the LLM
+    "wasted": 0,       # reached the LLM, but no alternative was ever served
+    "hits": 0,         # Need Help served from a prefetch
+    "misses": 0,       # Need Help that needed its own LLM call
+}
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+def prefetch_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    served = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / served, 3) if served else None
+    return stats
+
+ALTERNATIVE_PROMPT = PromptTemplate(
+    "alternative",
+    system="""
+A user in a financial crisis is stuck on one action step of their plan.
+Provide ONE alternative step or break this down into smaller actions. Respond with JSON:
+{
+    "alternative_step": "simpler alternative action",
+    "priority": "high/medium",
+    "estimated_time_minutes": 10
+}
+Respond ONLY in valid JSON.
+""",
+    user="""
+User is stuck on this step: {step}
+
+Original situation: {crisis_type}
+""",
+)
+
+ALTERNATIVES_PROMPT = PromptTemplate(
+    "alternatives",
+    system="""
+A user in a financial crisis may get stuck on the numbered action steps of their plan.
+For EACH step, provide ONE simpler alternative or a smaller first action. Respond with JSON:
+{
+    "alternatives": [
+        {
+            "index": 1,
+            "alternative_step": "simpler alternative action",
+            "priority": "high/medium",
+            "estimated_time_minutes": 10
+        }
+    ]
+}
+Respond ONLY in valid JSON.
+""",
+    user="""
+Action steps:
+{numbered}
+
+Original situation: {crisis_type}
+""",
+)
+
+def build_alternative_prompt(step: str, crisis_type: str) -> Prompt:
+    return ALTERNATIVE_PROMPT.render(step=step, crisis_type=crisis_type)
+
+def build_alternatives_prompt(steps, crisis_type: str) -> Prompt:
+    numbered = "\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1))
+    return ALTERNATIVES_PROMPT.render(numbered=numbered, crisis_type=crisis_type)
+
+def parse_alternatives(raw: str, count: int):
+    """Map 0-based step index to its alternative; unusable entries are left out."""
+    parsed = safe_json_parse(raw)
+    entries = parsed.get("alternatives") if isinstance(parsed, dict) else None
+    if not isinstance(entries, list):
+        return {}
+
+    alternatives = {}
+    for position, entry in enumerate(entries):
+        entry = repair_alternative(entry)
+        if not _has_alternative(entry):
+            continue
+        index = entry.get("index", position + 1)
+        if isinstance(index, int) and 1 <= index <= count:
+            alternatives[index - 1] = entry
+    return alternatives
+
+def parse_alternative(raw: str):
+    return repair_alternative(safe_json_parse(raw))
+
+def _has_alternative(parsed) -> bool:
+    return is_valid_output("alternative", parsed)
+
+def fetch_alternative(step: str, crisis_type: str):
+    """One LLM call for one step. Returns None if the reply is unusable."""
+    prompt = build_alternative_prompt(step, crisis_type)
+    parsed = routed_call(prompt, task_route("alternatives"), parse_alternative, _has_alternative)
+    if _has_alternative(parsed):
+        return parsed
+    return None
+
+class AlternativesPrefetch:
+    """
+    Alternatives for one plan, fetched in the background. Keep it with the
+    session and call cancel() when the plan is replaced or cleared.
+    """
+
+    def __init__(self, plan):
+        self.crisis_type = plan.get("crisis_type", "")
+        self.steps = [
+            step.get("step", "") if isinstance(step, dict) else str(step)
+            for step in plan.get("action_steps", [])
+        ]
+        self._served = 0
+        self._cancelled = False
+        self._future = None
+        if ALTERNATIVES_PREFETCH_ENABLED and self.steps:
+            self._future = _executor.submit(self._fetch_all)
+            _count("prefetched")
+
+    def _covers_all_steps(self, alternatives) -> bool:
+        return len(alternatives) == len(self.steps)
+
+    def _fetch_all(self):
+        prompt = build_alternatives_prompt(self.steps, self.crisis_type)
+        # Speculative: queued behind every call a user is waiting on, and never
+        # escalated; steps a partial reply misses get their own call on click
+        return routed_call(
+            prompt,
+            task_route("alternatives", priority="prefetch"),
+            lambda raw: parse_alternatives(raw, len(self.steps)),
+            self._covers_all_steps,
+        )
+
+    def _prefetched(self, index: int):
+        if self._future is None or self._cancelled:
+            return None
+        if not self._future.done():
+            # The prefetch waits at prefetch priority behind every other call;
+            # a user who clicked should not wait behind it
+            self.cancel()
+            return None
+        try:
+            return self._future.result().get(index)
+        except Exception:
+            return None
+
+    def alternative(self, index: int):
+        """
+        Alternative for action step `index`: from the prefetch if it has
+        finished, otherwise from a new call made right away.
+        """
+        alternative = self._prefetched(index)
+        if alternative is not None:
+            self._served += 1
+            _count("hits")
+            return alternative
+
+        _count("misses")
+        return fetch_alternative(self.steps[index], self.crisis_type)
+
+    def cancel(self):
+        """
+        Drop the prefetch. A call still queued never runs; one already sent
+        can't be recalled, so it counts as wasted unless something was served.
+        """
+        if self._cancelled or self._future is None:
+            return
+        self._cancelled = True
+        if self._future.cancel():
+            _count("cancelled")
+        elif not self._served:
+            _count("wasted")
@@ -1,20 +1,368 @@
+import asyncio
 import os
-from groq import Groq
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+import httpx
+from groq import Groq, AsyncGroq, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
+from config.settings import (
+    MODEL_NAME,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_DEADLINE_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_RESET_SECONDS,
+    GROQ_JSON_MODE,
+)
+from llm.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceeded,
+    LatencyTracker,
+    backoff_seconds,
+    is_retryable,
+    retry_after_seconds,
+)
+from llm.prompts import PromptInput, prompt_messages
+from llm.scheduler import QueueTimeout, estimate_tokens, scheduler_for
+from utils.metrics import (
+    CIRCUIT_OPENED,
+    LLM_CALLS,
+    LLM_HEDGES,
+    LLM_RETRIES,
+    MODEL_SECONDS,
+    observe_stage,
+    record_usage,
+)
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Retries are ours (deadline-aware, jittered), not the SDK's
+client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
 
-MODEL_NAME = "llama-3.3-70b-versatile"
+# Created lazily so it binds to the running event loop (FastAPI / benchmarks)
+_async_client = None
 
-def call_groq(prompt: str) -> str:
+breaker = CircuitBreaker(CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS)
+# Per model: the small and large models have very different latency
+_latencies = defaultdict(LatencyTracker)
+# Sync hedging waits on the primary from the caller's thread; a losing
+# request can't be interrupted and finishes in the background
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="groq-hedge")
+
+def _build_messages(prompt: PromptInput):
+    # Templates put their fixed text in the system message, first, so
+    # Groq can serve it from its prompt cache
+    return prompt_messages(prompt)
+
+def _reply_format(stream: bool):
+    # JSON mode keeps prose out of the reply; Groq doesn't support it on
+    # streams, which the incremental parser reads as they come
+    if GROQ_JSON_MODE and not stream:
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+def _failed_generation(error: Exception):
+    """The reply JSON mode rejected (400 json_validate_failed), or None for other errors."""
+    body = getattr(error, "body", None)
+    details = body.get("error", body) if isinstance(body, dict) else None
+    if getattr(error, "status_code", None) != 400 or not isinstance(details, dict):
+        return None
+    if details.get("code") != "json_validate_failed":
+        return None
+    return details.get("failed_generation") or ""
+
+def _chunk_usage(chunk):
+    # Groq reports streamed usage on the last chunk, under x_groq
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(chunk, "usage", None) or getattr(x_groq, "usage", None)
+
+def _finish_call(started: float, model: str, outcome: str, usage=None, tokens: int = None):
+    """The llm_call stage runs from the request to the last streamed chunk."""
+    seconds = time.perf_counter() - started
+    observe_stage("llm_call", seconds)
+    MODEL_SECONDS.observe(seconds, model=model)
+    LLM_CALLS.inc(outcome=outcome)
+    record_usage(usage)
+    if usage is not None and tokens is not None:
+        scheduler_for(model).settle(tokens, usage.total_tokens)
+
+def _admit() -> bool:
+    """
+    Fail fast while the breaker is open; callers fall back to the default
+    plan. True when this call is the half-open probe.
+    """
+    admitted = breaker.allow()
+    if admitted is None:
+        LLM_CALLS.inc(outcome="circuit_open")
+        raise CircuitOpenError("Groq circuit breaker is open")
+    return admitted == "half_open"
+
+def _settle_probe():
+    # Runs however the probe ended; only a success (already recorded) may
+    # close the circuit, so a 400, a queue timeout or a cancellation re-opens it
+    if breaker.probe_failed():
+        CIRCUIT_OPENED.inc()
+
+def _record_failure(error: Exception):
+    # Bad requests say nothing about Groq's health; timeouts, 429s and 5xx do.
+    # Neither does a call that never left our own rate-limit queue.
+    if isinstance(error, QueueTimeout):
+        return
+    if is_retryable(error) or isinstance(error, DeadlineExceeded):
+        if breaker.record_failure():
+            CIRCUIT_OPENED.inc()
+
+def _failed_call(error: Exception, started: float, model: str) -> str:
+    """Record a call that raised; re-raise unless it is a reply JSON mode rejected."""
+    _record_failure(error)
+    generation = _failed_generation(error)
+    _finish_call(started, model, "error" if generation is None else "json_invalid")
+    if generation is None:
+        raise error
+    return generation
+
+def _hedge_delay(model: str, remaining: float):
+    """Seconds to wait before a hedged second request, or None for no hedge."""
+    if not LLM_HEDGE_ENABLED:
+        return None
+    percentile = _latencies[model].percentile(LLM_HEDGE_PERCENTILE)
+    if percentile is None:
+        return None
+    delay = max(percentile, LLM_HEDGE_MIN_DELAY_SECONDS)
+    return delay if delay < remaining else None
+
+def _retry_pause(error: Exception, attempt: int, model: str, deadline: Deadline):
+    """Seconds to sleep before retrying, or None to give up and re-raise."""
+    if isinstance(error, QueueTimeout):
+        return None
+    if getattr(error, "status_code", None) == 429:
+        # Groq's limit is shared: hold back every queued call, not just this one
+        scheduler_for(model).pause(retry_after_seconds(error) or LLM_RETRY_BASE_SECONDS)
+    if deadline.remaining() <= 0:
+        raise DeadlineExceeded("LLM deadline exceeded") from error
+    if not is_retryable(error) or attempt >= LLM_MAX_RETRIES:
+        return None
+    pause = backoff_seconds(attempt, error, LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS)
+    if pause >= deadline.remaining():
+        return None
+    LLM_RETRIES.inc(reason=getattr(error, "status_code", None) or type(error).__name__)
+    return pause
+
+def _create(prompt: PromptInput, model: str, stream: bool, timeout: float, priority: str, tokens: int):
+    timeout -= scheduler_for(model).acquire(priority, tokens, timeout)
+    started = time.perf_counter()
     response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {"role": "system", "content": "Respond ONLY in valid JSON."},
-            {"role": "user", "content": prompt}
-        ],
+        model=model,
+        messages=_build_messages(prompt),
+        temperature=0.3,
+        stream=stream,
+        timeout=timeout,
+        **_reply_format(stream),
+    )
+    if not stream:
+        _latencies[model].record(time.perf_counter() - started)
+    return response
+
+def _hedged_create(prompt: PromptInput, model: str, timeout: float, delay: float, priority: str, tokens: int):
+    primary = _hedge_pool.submit(_create, prompt, model, False, timeout, priority, tokens)
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeout:
+        pass
+
+    LLM_HEDGES.inc(outcome="sent")
+    hedge = _hedge_pool.submit(_create, prompt, model, False, timeout - delay, priority, tokens)
+    pending, error = {primary, hedge}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    LLM_HEDGES.inc(outcome="won")
+                return future.result()
+            error = future.exception()
+    raise error
+
+def _resilient_create(prompt: PromptInput, model: str, stream: bool, deadline: Deadline, priority: str, tokens: int):
+    attempt = 0
+    while True:
+        remaining = deadline.check()
+        try:
+            delay = None if stream else _hedge_delay(model, remaining)
+            if delay is None:
+                return _create(prompt, model, stream, remaining, priority, tokens)
+            return _hedged_create(prompt, model, remaining, delay, priority, tokens)
+        except Exception as error:
+            pause = _retry_pause(error, attempt, model, deadline)
+            if pause is None:
+                raise
+        time.sleep(pause)
+        attempt += 1
+
+def _iter_deltas(chunks, started: float, model: str, deadline: Deadline, tokens: int):
+    usage, outcome = None, "error"
+    try:
+        for chunk in chunks:
+            deadline.check()
+            usage = _chunk_usage(chunk) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = "ok"
+    except Exception as error:
+        _record_failure(error)
+        raise
+    finally:
+        _finish_call(started, model, outcome, usage, tokens)
+
+def call_groq(prompt: PromptInput, stream: bool = False, deadline: Deadline = None, model: str = MODEL_NAME,
+              priority: str = "plan"):
+    """
+    Return the reply text, or an iterator of text deltas when stream=True.
+    The whole call, retries and time queued for rate limits included, must
+    finish within `deadline` (LLM_DEADLINE_SECONDS by default). Raises
+    CircuitOpenError at once while the circuit breaker is open. `model`
+    and `priority` come from llm.router. A reply JSON mode rejected is
+    returned as is, for the repairing parser and validation to judge.
+    """
+    deadline = deadline or Deadline(LLM_DEADLINE_SECONDS)
+    probe = _admit()
+    tokens = estimate_tokens(prompt)
+    started = time.perf_counter()
+    try:
+        response = _resilient_create(prompt, model, stream, deadline, priority, tokens)
+        # A stream that started means Groq is answering
+        breaker.record_success()
+    except Exception as error:
+        return _failed_call(error, started, model)
+    finally:
+        if probe:
+            _settle_probe()
+    if stream:
+        return _iter_deltas(response, started, model, deadline, tokens)
+    _finish_call(started, model, "ok", response.usage, tokens)
+    return response.choices[0].message.content
+
+def get_async_client() -> AsyncGroq:
+    """Shared AsyncGroq client backed by one pooled httpx connection pool."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                )
+            ),
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+async def _acreate(prompt: PromptInput, model: str, stream: bool, timeout: float, priority: str, tokens: int):
+    timeout -= await scheduler_for(model).aacquire(priority, tokens, timeout)
+    started = time.perf_counter()
+    response = await get_async_client().chat.completions.create(
+        model=model,
+        messages=_build_messages(prompt),
         temperature=0.3,
+        stream=stream,
+        timeout=timeout,
+        **_reply_format(stream),
     )
+    if not stream:
+        _latencies[model].record(time.perf_counter() - started)
+    return response
+
+async def _ahedged_create(prompt: PromptInput, model: str, timeout: float, delay: float, priority: str, tokens: int):
+    primary = asyncio.ensure_future(_acreate(prompt, model, False, timeout, priority, tokens))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+
+        LLM_HEDGES.inc(outcome="sent")
+        hedge = asyncio.ensure_future(_acreate(prompt, model, False, timeout - delay, priority, tokens))
+        tasks.add(hedge)
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        LLM_HEDGES.inc(outcome="won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The loser (or both, if we were cancelled) stops here
+        for task in tasks:
+            task.cancel()
+
+async def _aresilient_create(prompt: PromptInput, model: str, stream: bool, deadline: Deadline,
+                             priority: str, tokens: int):
+    attempt = 0
+    while True:
+        remaining = deadline.check()
+        try:
+            delay = None if stream else _hedge_delay(model, remaining)
+            if delay is None:
+                return await _acreate(prompt, model, stream, remaining, priority, tokens)
+            return await _ahedged_create(prompt, model, remaining, delay, priority, tokens)
+        except Exception as error:
+            pause = _retry_pause(error, attempt, model, deadline)
+            if pause is None:
+                raise
+        await asyncio.sleep(pause)
+        attempt += 1
+
+async def _aiter_deltas(chunks, started: float, model: str, deadline: Deadline, tokens: int):
+    usage, outcome = None, "error"
+    try:
+        async for chunk in chunks:
+            deadline.check()
+            usage = _chunk_usage(chunk) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = "ok"
+    except Exception as error:
+        _record_failure(error)
+        raise
+    finally:
+        _finish_call(started, model, outcome, usage, tokens)
+
+async def async_call_groq(prompt: PromptInput, stream: bool = False, deadline: Deadline = None,
+                          model: str = MODEL_NAME, priority: str = "plan"):
+    """Async call_groq; with stream=True returns an async iterator of text deltas."""
+    deadline = deadline or Deadline(LLM_DEADLINE_SECONDS)
+    probe = _admit()
+    tokens = estimate_tokens(prompt)
+    started = time.perf_counter()
+    try:
+        response = await _aresilient_create(prompt, model, stream, deadline, priority, tokens)
+        breaker.record_success()
+    except Exception as error:
+        return _failed_call(error, started, model)
+    finally:
+        # Cancellation (a hedged caller's loser, a client gone) skips the except
+        if probe:
+            _settle_probe()
+    if stream:
+        return _aiter_deltas(response, started, model, deadline, tokens)
+    _finish_call(started, model, "ok", response.usage, tokens)
     return response.choices[0].message.content
@@ -0,0 +1,245 @@
+"""
+JSON Schema for LLM replies (llm/output_schema.json): the reasoning plan,
+the non-financial redirect and Need Help alternatives.
+
+The schema is checked with jsonschema and compiled once at import into
+plain Python checks (local $refs inlined, one closure per keyword), which
+is what validates every reply; jsonschema's own validator is several
+times slower per reply and is kept for error messages. The repair
+functions fix what a model commonly gets almost right (an enum in the
+wrong case or as a synonym, steps as bare strings, "15 minutes" for a
+number, one step too many, a missing field that has a schema default)
+instead of discarding the whole reply.
+"""
+import json
+import os
+import re
+
+from jsonschema import Draft7Validator
+
+from config.settings import MAX_STEPS
+from llm.plan_library import plan_library
+from utils.metrics import OUTPUT_REPAIRS
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "output_schema.json")
+
+with open(SCHEMA_PATH, encoding="utf-8") as _file:
+    SCHEMA = json.load(_file)
+Draft7Validator.check_schema(SCHEMA)
+DEFINITIONS = SCHEMA["definitions"]
+
+def _inline(node):
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline(DEFINITIONS[node["$ref"].rsplit("/", 1)[-1]])
+        return {key: _inline(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_inline(value) for value in node]
+    return node
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Draft 7 semantics: booleans are not numbers, 3.0 is an integer
+_TYPES = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: _is_number(value) and float(value).is_integer(),
+    "number": _is_number,
+    "null": lambda value: value is None,
+}
+_ANNOTATIONS = {"$schema", "title", "description", "default"}
+
+def _compile(schema: dict):
+    """One predicate for an inlined schema, built from the keywords it uses."""
+    checks = []
+    for keyword, argument in schema.items():
+        if keyword in _ANNOTATIONS:
+            continue
+        if keyword == "type":
+            checks.insert(0, _TYPES[argument])
+        elif keyword == "enum":
+            checks.append(lambda value, allowed=tuple(argument): value in allowed)
+        elif keyword == "const":
+            checks.append(lambda value, const=argument: value == const and type(value) is type(const))
+        elif keyword == "required":
+            checks.append(lambda value, keys=tuple(argument): not isinstance(value, dict)
+                          or all(key in value for key in keys))
+        elif keyword == "properties":
+            properties = tuple((name, _compile(sub)) for name, sub in argument.items())
+            checks.append(lambda value, properties=properties: not isinstance(value, dict)
+                          or all(check(value[name]) for name, check in properties if name in value))
+        elif keyword == "items":
+            check_item = _compile(argument)
+            checks.append(lambda value, check_item=check_item: not isinstance(value, list)
+                          or all(check_item(item) for item in value))
+        elif keyword in ("minItems", "maxItems", "minLength", "maxLength"):
+            kind = list if keyword.endswith("Items") else str
+            low, high = (argument, float("inf")) if keyword.startswith("min") else (0, argument)
+            checks.append(lambda value, kind=kind, low=low, high=high: not isinstance(value, kind)
+                          or low <= len(value) <= high)
+        elif keyword in ("minimum", "maximum"):
+            low, high = (argument, float("inf")) if keyword == "minimum" else (float("-inf"), argument)
+            checks.append(lambda value, low=low, high=high: not _is_number(value) or low <= value <= high)
+        else:
+            # A keyword the compiler would silently ignore is a schema bug
+            raise ValueError(f"llm/output_schema.json: unsupported keyword {keyword!r}")
+    checks = tuple(checks)
+    return lambda value: all(check(value) for check in checks)
+
+VALIDATORS = {name: _compile(_inline(definition)) for name, definition in DEFINITIONS.items()}
+_REFERENCE_VALIDATORS = {name: Draft7Validator(_inline(definition)) for name, definition in DEFINITIONS.items()}
+
+def is_valid_output(name: str, value) -> bool:
+    """Does `value` match schema definition `name` ("plan", "redirect", "alternative")?"""
+    return VALIDATORS[name](value)
+
+def output_errors(name: str, value):
+    """jsonschema's messages for why `value` fails definition `name`; slow, for diagnostics."""
+    return [
+        f"{'/'.join(map(str, error.absolute_path)) or '(root)'}: {error.message}"
+        for error in _REFERENCE_VALIDATORS[name].iter_errors(value)
+    ]
+
+# Words models use instead of the enum values the prompts ask for
+ENUM_ALIASES = {
+    "critical": "high", "severe": "high", "urgent": "high",
+    "moderate": "medium", "normal": "medium",
+    "mild": "low", "minor": "low",
+    "stressed": "anxious", "worried": "anxious", "nervous": "anxious",
+    "scared": "panic", "afraid": "panic", "panicked": "panic", "panicking": "panic",
+    "frustrated": "angry", "sad": "depressed", "hopeless": "depressed",
+}
+# The item's text field first, then keys models put the same text under
+TEXT_KEYS = {
+    "calming_step": ("instruction", "step", "text", "description"),
+    "action_step": ("step", "action", "description", "text", "title"),
+    "alternative": ("alternative_step", "step", "alternative", "action"),
+}
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_ENUM_WORDS = re.compile(r"[\s/,|]+")
+
+def _text(value, spec):
+    if isinstance(value, str) and value.strip():
+        return value.strip()[:spec["maxLength"]].rstrip()
+    return spec.get("default")
+
+def _choice(value, spec):
+    if isinstance(value, str):
+        # "High" or "critical" name one member; the prompt's own "low/medium/high"
+        # echoed back names several, so it says nothing and gets the default
+        words = {ENUM_ALIASES.get(word, word) for word in _ENUM_WORDS.split(value.strip().lower())}
+        members = [member for member in spec["enum"] if member in words]
+        if len(members) == 1:
+            return members[0]
+    return spec["default"]
+
+def _integer(value, spec):
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        value = float(match.group()) if match else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return spec["default"]
+    return min(max(int(round(value)), spec["minimum"]), spec["maximum"])
+
+def _truthy(value):
+    """True/False for the ways models write a boolean, None if it isn't one."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    if isinstance(value, (int, float)):
+        return bool(value)
+    return None
+
+def _flag(value, spec):
+    flag = _truthy(value)
+    return spec["default"] if flag is None else flag
+
+def _value(value, spec):
+    if "enum" in spec:
+        return _choice(value, spec)
+    return {"integer": _integer, "boolean": _flag}.get(spec["type"], _text)(value, spec)
+
+def _repair_fields(source: dict, repaired: dict, definition: str) -> None:
+    for name, spec in DEFINITIONS[definition]["properties"].items():
+        if "default" in spec:
+            repaired[name] = _value(source.get(name), spec)
+
+def _repair_item(item, definition: str):
+    """One step as the schema wants it, or None if it has no usable text."""
+    text_key = TEXT_KEYS[definition][0]
+    if isinstance(item, str):
+        item = {text_key: item}
+    if not isinstance(item, dict):
+        return None
+    source = next(
+        (key for key in TEXT_KEYS[definition] if isinstance(item.get(key), str) and item[key].strip()),
+        None,
+    )
+    if source is None:
+        return None
+    repaired = dict(item)
+    text = repaired[source] if source == text_key else repaired.pop(source)
+    repaired[text_key] = _text(text, DEFINITIONS[definition]["properties"][text_key])
+    _repair_fields(item, repaired, definition)
+    return repaired
+
+def _repair_items(items, definition: str, limit: int):
+    if isinstance(items, dict):
+        # {"1": {...}, "2": {...}} instead of a list
+        items = list(items.values())
+    if not isinstance(items, list):
+        return []
+    repaired = (_repair_item(item, definition) for item in items)
+    return [item for item in repaired if item is not None][:limit]
+
+def _count_repairs(schema: str, before: dict, after: dict) -> None:
+    for field, value in after.items():
+        if before.get(field) != value:
+            OUTPUT_REPAIRS.inc(schema=schema, field=field)
+
+def repair_plan(parsed, steps: int = MAX_STEPS):
+    """
+    Coerce a parsed plan or redirect reply towards the schema; returns a
+    new dict. Action steps past `steps` are dropped. Missing or unusable
+    action steps are left out rather than invented, so the reply still
+    fails is_valid_output("plan") and the router can escalate it.
+    Anything that isn't a parsed object is returned unchanged.
+    """
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return parsed
+
+    repaired = dict(parsed)
+    if "not_financial" in parsed:
+        if _truthy(parsed["not_financial"]):
+            repaired["not_financial"] = True
+            _repair_fields(parsed, repaired, "redirect")
+            _count_repairs("redirect", parsed, repaired)
+            return repaired
+        del repaired["not_financial"]
+
+    _repair_fields(parsed, repaired, "plan")
+    plan = DEFINITIONS["plan"]["properties"]
+    repaired["calming_steps"] = (
+        _repair_items(parsed.get("calming_steps"), "calming_step", plan["calming_steps"]["maxItems"])
+        or plan_library.calming_steps()
+    )
+    action_steps = _repair_items(
+        parsed.get("action_steps"), "action_step", min(steps, plan["action_steps"]["maxItems"])
+    )
+    if action_steps:
+        repaired["action_steps"] = action_steps
+    else:
+        repaired.pop("action_steps", None)
+    _count_repairs("plan", parsed, repaired)
+    return repaired
+
+def repair_alternative(parsed):
+    """repair_plan for one Need Help alternative; None if it has no usable step."""
+    repaired = _repair_item(parsed, "alternative")
+    if repaired is not None:
+        _count_repairs("alternative", parsed if isinstance(parsed, dict) else {}, repaired)
+    return repaired
@@ -0,0 +1,168 @@
+"""
+Plan library: vetted calming and action steps per crisis category and
+step count (llm/plan_library.json, versioned).
+
+The common categories the pre-classifier recognises are answered from
+here without an LLM call, when the message says nothing a generic plan
+would miss. Optionally a small-model call personalizes
+crisis_type and final_advice; the steps themselves always come from the
+library. The "general" category is the fallback plan used when an LLM
+reply is unusable.
+"""
+import copy
+import json
+import re
+from typing import Optional
+
+from config.settings import (
+    PLAN_LIBRARY_ENABLED,
+    PLAN_LIBRARY_PATH,
+    PLAN_LIBRARY_MIN_CONFIDENCE,
+    PLAN_LIBRARY_MAX_INPUT_CHARS,
+    PLAN_LIBRARY_MIN_COVERAGE,
+)
+from llm.prompts import Prompt, PromptTemplate
+from utils.metrics import PLAN_LIBRARY
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about the situation. Everything else in a message
+# must be accounted for by a matched classifier term ("but", "inside",
+# "house" and family members deliberately are not filler).
+FILLER_WORDS = frozenset((
+    "a", "an", "the", "i", "im", "me", "my", "mine", "myself", "we", "us", "our", "you", "your",
+    "it", "its", "this", "that", "is", "am", "are", "was", "were", "be", "been", "being",
+    "has", "have", "had", "do", "does", "did", "got", "get", "gets", "getting", "gotten",
+    "and", "so", "to", "of", "in", "on", "at", "for", "from", "by", "about", "with",
+    "just", "very", "really", "please", "help", "need", "now", "today", "yesterday",
+    "someone", "somebody", "due", "what", "how", "should", "can", "could", "will", "would",
+    "s", "m", "ve", "ll", "d",
+))
+
+PLAN_FIELDS = ("crisis_type", "severity", "mood", "calming_steps", "needs_emergency_support", "final_advice")
+
+class PlanLibrary:
+    def __init__(self, data: dict):
+        self.version = data["version"]
+        self._categories = data["categories"]
+        self._validate()
+
+    @classmethod
+    def load(cls, path: str = PLAN_LIBRARY_PATH) -> "PlanLibrary":
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def _validate(self) -> None:
+        # A broken data file should fail at start-up, not on a user's request
+        if "general" not in self._categories:
+            raise ValueError("plan library has no 'general' category")
+        for name, category in self._categories.items():
+            missing = [field for field in PLAN_FIELDS + ("steps", "plans") if field not in category]
+            if missing:
+                raise ValueError(f"plan library category {name!r} is missing {missing}")
+            for count, step_ids in category["plans"].items():
+                unknown = set(step_ids) - set(category["steps"])
+                if len(step_ids) != int(count) or unknown:
+                    raise ValueError(f"plan library category {name!r}: bad {count}-step plan {step_ids}")
+
+    @property
+    def categories(self):
+        return set(self._categories) - {"general"}
+
+    def has_plan(self, category: str, steps: int) -> bool:
+        return category in self._categories and str(steps) in self._categories[category]["plans"]
+
+    def covers(self, category: str, matched_terms) -> bool:
+        """Does the category's plan fit an input that matched these classifier terms?"""
+        required = self._categories[category].get("requires_terms")
+        return not required or bool(set(required) & set(matched_terms))
+
+    def calming_steps(self, category: str = "general"):
+        return copy.deepcopy(self._categories[category]["calming_steps"])
+
+    def action_steps(self, category: str = "general", steps: int = 5):
+        entry = self._categories[category]
+        return [dict(entry["steps"][step_id]) for step_id in entry["plans"][str(steps)]]
+
+    def plan(self, category: str, steps: int) -> dict:
+        """A fresh plan dict, in the shape the reasoning prompt asks the LLM for."""
+        entry = self._categories[category]
+        plan = {field: copy.deepcopy(entry[field]) for field in PLAN_FIELDS}
+        plan["action_steps"] = self.action_steps(category, steps)
+        return plan
+
+plan_library = PlanLibrary.load()
+
+def _matched_terms(classification):
+    groups = classification.get("features", {}).get("financial", {})
+    return [term for terms in groups.values() for term in terms]
+
+def term_coverage(classification, user_input: str) -> float:
+    """
+    Share of the message's words, filler and amounts aside, that are part
+    of a matched financial term. "my car was stolen with my kid inside"
+    covers 2 of 4.
+    """
+    covered = {word for term in _matched_terms(classification) for word in _WORDS.findall(term)}
+    words = [word for word in _WORDS.findall(user_input.lower())
+             if word not in FILLER_WORDS and not word.isdigit()]
+    if not words:
+        return 0.0
+    return sum(word in covered for word in words) / len(words)
+
+def library_category(classification, user_input: str, steps: int) -> Optional[str]:
+    """
+    The library category to answer from, or None when the LLM should plan:
+    the classifier is unsure, the category isn't in the library, the
+    message has a negation or a danger term, or it says more than the
+    matched terms (and so a generic plan) cover.
+    """
+    if not PLAN_LIBRARY_ENABLED or not classification or classification.get("label") != "financial":
+        return None
+    category = classification.get("category")
+    if (
+        category in plan_library.categories
+        and not classification.get("guards")
+        and classification.get("confidence", 0) >= PLAN_LIBRARY_MIN_CONFIDENCE
+        and len(user_input) <= PLAN_LIBRARY_MAX_INPUT_CHARS
+        and term_coverage(classification, user_input) >= PLAN_LIBRARY_MIN_COVERAGE
+        and plan_library.has_plan(category, steps)
+        and plan_library.covers(category, _matched_terms(classification))
+    ):
+        return category
+    return None
+
+PERSONALIZE_PROMPT = PromptTemplate(
+    "personalize",
+    system="""
+A vetted plan will be shown to the user whose message follows. Rewrite only these two fields for their situation, in the same language and tone as the message:
+- crisis_type: one short phrase naming their specific financial issue
+- final_advice: one or two short, supportive sentences
+
+Do not add steps, amounts or promises. Respond with JSON:
+{
+    "crisis_type": "...",
+    "final_advice": "..."
+}
+Respond ONLY in valid JSON.
+""",
+    user="""
+Vetted plan: "{crisis_type}"
+
+User message:
+{user_input}
+""",
+)
+
+def build_personalize_prompt(plan: dict, user_input: str) -> Prompt:
+    return PERSONALIZE_PROMPT.render(crisis_type=plan["crisis_type"], user_input=user_input)
+
+def apply_personalization(plan: dict, parsed, category: str) -> dict:
+    """Take crisis_type and final_advice from the reply if usable; keep the library text otherwise."""
+    fields = {
+        field: parsed.get(field).strip()
+        for field, limit in (("crisis_type", 160), ("final_advice", 400))
+        if isinstance(parsed, dict) and isinstance(parsed.get(field), str) and 0 < len(parsed[field].strip()) <= limit
+    }
+    PLAN_LIBRARY.inc(category=category, outcome="personalized" if fields else "personalize_failed")
+    return {**plan, **fields}
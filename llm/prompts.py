@@ -0,0 +1,73 @@
+"""
+Prompt templates: a fixed system message plus a small user message.
+
+Everything that is the same on every call (rules, JSON shape, examples)
+lives in the template's system message, built once at import, so it is
+byte-identical across requests and the provider can cache it as a prompt
+prefix. Only per-request values (the user's message, step count,
+conversation context) go into the user message, whose format string is
+parsed once here rather than on every call.
+"""
+from operator import itemgetter
+from string import Formatter
+from typing import Dict, List, NamedTuple, Union
+
+from utils.tokens import count_tokens
+
+# Sent with bare-string prompts, as before templates
+DEFAULT_SYSTEM = "Respond ONLY in valid JSON."
+
+class Prompt(NamedTuple):
+    system: str
+    user: str
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user},
+        ]
+
+PromptInput = Union[str, Prompt]
+
+def prompt_messages(prompt: PromptInput) -> List[Dict[str, str]]:
+    if isinstance(prompt, Prompt):
+        return prompt.messages()
+    return Prompt(DEFAULT_SYSTEM, prompt).messages()
+
+TEMPLATES: Dict[str, "PromptTemplate"] = {}
+
+class PromptTemplate:
+    """
+    A named prompt: `system` is used verbatim (no placeholders, so no brace
+    escaping for JSON examples); `user` is a str.format string whose fields
+    render() fills.
+    """
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system.strip() + "\n"
+        parts = list(Formatter().parse(user.strip() + "\n"))
+        self.fields = tuple(field for _, field, _, _ in parts if field)
+        # Parsed once into a %-format and a getter for its values: rendering
+        # is two C-level calls
+        getter = itemgetter(*self.fields) if self.fields else (lambda values: ())
+        self._values = getter if len(self.fields) != 1 else (lambda values: (getter(values),))
+        self._literal = "".join(literal for literal, _, _, _ in parts)
+        self._format = "".join(
+            literal.replace("%", "%%") + ("%s" if field else "") for literal, field, _, _ in parts
+        )
+        TEMPLATES[name] = self
+
+    def render(self, **values) -> Prompt:
+        return Prompt(self.system, self._format % self._values(values))
+
+    def report(self) -> Dict[str, int]:
+        """Token counts (utils/tokens.py estimate) of the fixed parts."""
+        return {
+            "system_tokens": count_tokens(self.system),
+            "user_template_tokens": count_tokens(self._literal),
+        }
+
+def template_report() -> Dict[str, Dict[str, int]]:
+    """report() of every template imported so far, by name."""
+    return {name: template.report() for name, template in TEMPLATES.items()}
@@ -0,0 +1,151 @@
+"""
+Building blocks for the resilient Groq client: a per-call deadline, retry
+backoff that honours Retry-After, a latency tracker for the hedge delay
+and a circuit breaker.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import groq
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class LLMUnavailable(Exception):
+    """Base class for failures raised by the resilience layer itself."""
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+class CircuitOpenError(LLMUnavailable):
+    pass
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> float:
+        """Seconds left; raises DeadlineExceeded when none are."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM deadline exceeded")
+        return remaining
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (groq.APITimeoutError, groq.APIConnectionError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After from a 429/503 reply (retry-after-ms preferred), if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue  # HTTP-date form; fall back to backoff
+    return None
+
+def backoff_seconds(attempt: int, error: Exception, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
+
+class LatencyTracker:
+    """Recent successful call latencies, for a percentile-based hedge delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        samples = sorted(self._samples)
+        if len(samples) < self._min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(pct / 100 * len(samples)))]
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failure_threshold` consecutive failed
+    calls it opens and rejects calls for `reset_seconds`, then lets one
+    probe through (half-open): success closes it, anything else re-opens
+    it. The probe must always be settled, with record_success(),
+    record_failure() or probe_failed(), or no call ever gets through again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[str]:
+        """
+        None when the call is rejected, otherwise the state it goes through
+        in: "closed", or "half_open" for the probe.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return state
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return state
+            return None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failed call; True when this failure opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            # Calls already in flight when it opened don't restart the timer
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
+
+    def probe_failed(self) -> bool:
+        """
+        Settle a probe that ended without success, whatever the reason (a
+        bad request, a queue timeout, cancellation): the circuit re-opens.
+        True when this re-opened it; False if the probe was already settled.
+        """
+        with self._lock:
+            if not self._probing:
+                return False
+            self._opened_at = time.monotonic()
+            self._probing = False
+            return True
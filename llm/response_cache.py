@@ -0,0 +1,221 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.settings import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SQLITE_PATH,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_user_input(user_input: str) -> str:
+    return _WHITESPACE.sub(" ", user_input).strip().lower()
+
+def make_cache_key(user_input: str, steps: int, emergency: bool, context: str = "") -> str:
+    """`steps` is the step count the prompt asks for (requested_steps), not the raw request value."""
+    parts = [normalize_user_input(user_input), steps, bool(emergency)]
+    if context:
+        # Keys of first messages (no conversation memory) stay as they were
+        parts.append(context)
+    raw = json.dumps(parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache(ABC):
+    """
+    Base class for reasoning response caches.
+    Values are JSON-serializable dicts; every get returns a fresh copy.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "size": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class NullResponseCache(ResponseCache):
+    def get(self, key):
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def size(self):
+        return 0
+
+    def clear(self):
+        pass
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+                self._count("expirations")
+            if entry is None:
+                self._count("misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count("hits")
+            return json.loads(entry[1])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def size(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    LRU + TTL cache in a SQLite file (WAL mode), so several uvicorn workers
+    on one host can share hits. Counters are per process.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_SQLITE_PATH,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+    ):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS response_cache_last_used ON response_cache (last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and row[1] <= now:
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            row = None
+            self._count("expirations")
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute("UPDATE response_cache SET last_used = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now),
+            )
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            overflow = conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM response_cache WHERE key IN "
+                    "(SELECT key FROM response_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self._count("evictions", overflow)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM response_cache")
+
+def create_response_cache(backend: str = RESPONSE_CACHE_BACKEND) -> ResponseCache:
+    if backend == "memory":
+        return MemoryResponseCache()
+    if backend == "sqlite":
+        return SQLiteResponseCache()
+    if backend == "none":
+        return NullResponseCache()
+    raise ValueError(f"Unknown response cache backend: {backend}")
+
+response_cache = create_response_cache()
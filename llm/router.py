@@ -0,0 +1,91 @@
+"""
+Per-call model routing between the small, fast model and the large one.
+
+The routing table lives in config/settings.py (MODEL_TIERS, MODEL_ROUTES).
+Plans are routed on what is known before the call: the emergency flag,
+the pre-classifier's danger terms and category, and the input length. A small-model reply
+that fails validation is retried once on the escalation tier.
+"""
+from typing import NamedTuple, Optional
+from config.settings import (
+    MODEL_ROUTER_ENABLED,
+    MODEL_TIERS,
+    MODEL_ROUTES,
+    ROUTE_PRIORITIES,
+    ROUTER_SHORT_INPUT_CHARS,
+    ROUTER_HIGH_SEVERITY_CATEGORIES,
+)
+from llm.groq_client import call_groq, async_call_groq
+from llm.prompts import PromptInput
+from utils.metrics import ROUTER_DECISIONS, ROUTER_ESCALATIONS
+
+class Route(NamedTuple):
+    task: str      # "plan", "alternatives"
+    reason: str    # the MODEL_ROUTES entry that decided
+    tier: str
+    model: str
+    priority: str  # scheduler queue (llm/scheduler.py)
+
+def _route(task: str, reason: str, priority: str = None) -> Route:
+    tier = MODEL_ROUTES[reason] if MODEL_ROUTER_ENABLED else "large"
+    route = Route(task, reason, tier, MODEL_TIERS[tier], priority or ROUTE_PRIORITIES[reason])
+    ROUTER_DECISIONS.inc(task=task, tier=tier, reason=reason)
+    return route
+
+def plan_route(state) -> Route:
+    """Model for the reasoning (plan) call of this state."""
+    classification = state.classification or {}
+    category = classification.get("category")
+    # A danger to life or safety ("I want to end my life") is an emergency
+    # whether or not the user set the flag, and however short the message
+    if state.emergency or classification.get("guards", {}).get("danger"):
+        return _route("plan", "plan_emergency", state.priority)
+    if category in ROUTER_HIGH_SEVERITY_CATEGORIES:
+        return _route("plan", "plan_high_severity", state.priority)
+    if len(state.user_input) <= ROUTER_SHORT_INPUT_CHARS:
+        return _route("plan", "plan_short", state.priority)
+    return _route("plan", "plan", state.priority)
+
+def task_route(task: str, priority: str = None) -> Route:
+    """
+    Model for a call routed by task alone (e.g. "alternatives"). `priority`
+    overrides the task's scheduler priority, e.g. for speculative prefetches.
+    """
+    return _route(task, task, priority)
+
+# Speculative calls are not worth a large-model call: nobody is waiting on them
+NO_ESCALATION_PRIORITIES = ("prefetch",)
+
+def escalation(route: Route) -> Optional[Route]:
+    """
+    The route to retry on after a failed validation, or None if already
+    there or the call is speculative.
+    """
+    tier = MODEL_ROUTES["escalation"]
+    if route.tier == tier or route.priority in NO_ESCALATION_PRIORITIES:
+        return None
+    ROUTER_ESCALATIONS.inc(task=route.task)
+    return Route(route.task, "escalation", tier, MODEL_TIERS[tier], route.priority)
+
+def routed_call(prompt: PromptInput, route: Route, parse, is_valid):
+    """
+    Call the routed model and parse the reply; if the result fails
+    is_valid, escalate once and return the escalated parse.
+    """
+    parsed = parse(call_groq(prompt, model=route.model, priority=route.priority))
+    if is_valid(parsed):
+        return parsed
+    escalated = escalation(route)
+    if escalated is None:
+        return parsed
+    return parse(call_groq(prompt, model=escalated.model, priority=escalated.priority))
+
+async def async_routed_call(prompt: PromptInput, route: Route, parse, is_valid):
+    """Async routed_call."""
+    parsed = parse(await async_call_groq(prompt, model=route.model, priority=route.priority))
+    if is_valid(parsed):
+        return parsed
+    escalated = escalation(route)
+    if escalated is None:
+        return parsed
+    return parse(await async_call_groq(prompt, model=escalated.model, priority=escalated.priority))
@@ -0,0 +1,249 @@
+"""
+Rate-limit-aware scheduler for outbound Groq calls.
+
+Every Groq request takes one request and its estimated tokens from two
+token buckets that refill at the account's per-minute limits
+(GROQ_RATE_LIMITS, one scheduler per model). While the buckets have room
+calls go straight out; when they run short, calls queue by priority
+(SCHEDULER_PRIORITIES) and leave in that order, oldest first within a
+priority, as the buckets refill. Only the head of the highest non-empty
+queue may go next, so a large urgent call is never starved by smaller
+low-priority ones slipping past it.
+
+Admission is a function of the clock alone (dispatch(now)), so a
+scheduler can be driven with a synthetic arrival trace and a virtual
+clock (benchmarks/sim_scheduler.py). In the app a dispatcher thread
+calls it whenever a bucket refills.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Optional
+
+from config.settings import (
+    GROQ_SCHEDULER_ENABLED,
+    GROQ_RATE_LIMITS,
+    GROQ_RATE_BURST_SECONDS,
+    GROQ_REPLY_TOKENS_ESTIMATE,
+    MODEL_TIERS,
+    SCHEDULER_PRIORITIES,
+)
+from llm.prompts import PromptInput, prompt_messages
+from llm.resilience import DeadlineExceeded
+from utils.metrics import SCHEDULER_QUEUE_DEPTH, SCHEDULER_TIMEOUTS, SCHEDULER_WAIT_SECONDS, observe_stage
+from utils.tokens import count_tokens
+
+class QueueTimeout(DeadlineExceeded):
+    """The deadline ran out before the rate limits let the call go out."""
+
+def estimate_tokens(prompt: PromptInput, reply_tokens: int = GROQ_REPLY_TOKENS_ESTIMATE) -> int:
+    """Prompt tokens, system message included (utils/tokens.py estimate), plus the expected reply."""
+    return sum(count_tokens(message["content"]) for message in prompt_messages(prompt)) + reply_tokens
+
+class TokenBucket:
+    """
+    Refilled continuously, holding at most `burst_seconds` of refill. The
+    rate leaves room for a full bucket, so a burst plus 60s of refill never
+    passes `per_minute`.
+    """
+
+    def __init__(self, per_minute: float, now: float, burst_seconds: float = GROQ_RATE_BURST_SECONDS):
+        self.rate = per_minute / (60.0 + burst_seconds)
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill(now)
+        # A call bigger than the whole bucket goes out once the bucket is full
+        amount = min(amount, self.capacity)
+        # Tolerate float drift from refilling, or the wait rounds to nothing forever
+        return 0.0 if self.level + 1e-6 >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        """Return (or, if negative, charge) units after the fact."""
+        self.level = min(self.capacity, self.level + amount)
+
+class Ticket:
+    """A queued call. `future` resolves with the seconds it waited once admitted."""
+
+    __slots__ = ("priority", "tokens", "enqueued", "future")
+
+    def __init__(self, priority: str, tokens: int, enqueued: float):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.future = Future()
+
+class GroqScheduler:
+    def __init__(self, model: str, requests_per_minute: int, tokens_per_minute: int,
+                 clock=time.monotonic, enabled: bool = GROQ_SCHEDULER_ENABLED,
+                 burst_seconds: float = GROQ_RATE_BURST_SECONDS):
+        self.model = model
+        self.clock = clock
+        self.enabled = enabled
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, now, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, now, burst_seconds)
+        self._queues = {priority: deque() for priority in SCHEDULER_PRIORITIES}
+        self._paused_until = now
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+    def submit(self, priority: str, tokens: int) -> Ticket:
+        """Queue a call and admit whatever the buckets allow right now."""
+        with self._cond:
+            ticket = Ticket(priority, tokens, self.clock())
+            self._queues[priority].append(ticket)
+            SCHEDULER_QUEUE_DEPTH.inc(model=self.model, priority=priority)
+            self._dispatch(ticket.enqueued)
+            self._cond.notify()
+        return ticket
+
+    def dispatch(self, now: float = None) -> Optional[float]:
+        """
+        Admit queued calls in priority order while the buckets allow.
+        Returns the seconds until the next queued call can go, or None
+        when nothing is queued.
+        """
+        with self._cond:
+            return self._dispatch(self.clock() if now is None else now)
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        while True:
+            ticket = self._head()
+            if ticket is None:
+                return None
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(ticket.tokens, now),
+            )
+            if wait > 0:
+                return wait
+            self._queues[ticket.priority].popleft()
+            SCHEDULER_QUEUE_DEPTH.dec(model=self.model, priority=ticket.priority)
+            self.requests.take(1, now)
+            self.tokens.take(ticket.tokens, now)
+            ticket.future.set_result(max(0.0, now - ticket.enqueued))
+
+    def _head(self) -> Optional[Ticket]:
+        for priority in SCHEDULER_PRIORITIES:
+            if self._queues[priority]:
+                return self._queues[priority][0]
+        return None
+
+    def cancel(self, ticket: Ticket) -> bool:
+        """Withdraw a queued call; False if it was already admitted."""
+        with self._cond:
+            queue = self._queues[ticket.priority]
+            if ticket not in queue:
+                return False
+            queue.remove(ticket)
+            SCHEDULER_QUEUE_DEPTH.dec(model=self.model, priority=ticket.priority)
+            # The head may have changed
+            self._cond.notify()
+            return True
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once Groq reports what a call really used."""
+        with self._cond:
+            self.tokens.give(estimated - actual)
+            self._cond.notify()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued call back, e.g. for the Retry-After of a 429."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+    def depth(self, priority: str = None) -> int:
+        priorities = (priority,) if priority else SCHEDULER_PRIORITIES
+        return sum(len(self._queues[name]) for name in priorities)
+
+    def _abandon(self, ticket: Ticket) -> None:
+        # Admitted just as the caller gave up: hand its budget back
+        if not self.cancel(ticket):
+            with self._cond:
+                self.requests.give(1)
+                self.tokens.give(ticket.tokens)
+                self._cond.notify()
+
+    def _start_dispatcher(self) -> None:
+        with self._cond:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._run, name=f"groq-scheduler-{self.model}", daemon=True
+                )
+                self._dispatcher.start()
+
+    def _run(self) -> None:
+        with self._cond:
+            while True:
+                self._cond.wait(timeout=self._dispatch(self.clock()))
+
+    def _admitted(self, ticket: Ticket, waited: float) -> float:
+        SCHEDULER_WAIT_SECONDS.observe(waited, priority=ticket.priority)
+        observe_stage("queue_wait", waited)
+        return waited
+
+    def acquire(self, priority: str, tokens: int, timeout: float) -> float:
+        """
+        Block until a call may go out; returns the seconds it waited.
+        Raises QueueTimeout if it is still queued after `timeout`.
+        """
+        if not self.enabled:
+            return 0.0
+        ticket = self.submit(priority, tokens)
+        if not ticket.future.done():
+            self._start_dispatcher()
+        try:
+            waited = ticket.future.result(timeout=max(timeout, 0))
+        except FutureTimeout:
+            self._abandon(ticket)
+            SCHEDULER_TIMEOUTS.inc(priority=priority)
+            raise QueueTimeout("LLM deadline exceeded while queued for Groq rate limits")
+        return self._admitted(ticket, waited)
+
+    async def aacquire(self, priority: str, tokens: int, timeout: float) -> float:
+        """Async acquire; the wait does not block the event loop."""
+        if not self.enabled:
+            return 0.0
+        ticket = self.submit(priority, tokens)
+        if not ticket.future.done():
+            self._start_dispatcher()
+        try:
+            waited = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(ticket.future)), max(timeout, 0)
+            )
+        except asyncio.TimeoutError:
+            self._abandon(ticket)
+            SCHEDULER_TIMEOUTS.inc(priority=priority)
+            raise QueueTimeout("LLM deadline exceeded while queued for Groq rate limits")
+        except asyncio.CancelledError:
+            self._abandon(ticket)
+            raise
+        return self._admitted(ticket, waited)
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def scheduler_for(model: str) -> GroqScheduler:
+    """The shared scheduler for a model; Groq limits are per model."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model)
+        if scheduler is None:
+            tier = next((tier for tier, name in MODEL_TIERS.items() if name == model), "large")
+            scheduler = _schedulers[model] = GroqScheduler(model, **GROQ_RATE_LIMITS[tier])
+        return scheduler
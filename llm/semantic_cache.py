@@ -0,0 +1,238 @@
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_DIM,
+)
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+# Paraphrases often swap the object ("bike" vs "scooter"), so each word also
+# emits a shared concept feature for the categories the reasoning prompt lists.
+CONCEPTS = {
+    "vehicle": ["car", "cars", "vehicle", "bike", "bikes", "scooter", "scooty", "motorcycle", "motorbike", "auto"],
+    "device": ["phone", "mobile", "iphone", "laptop", "tablet", "smartphone"],
+    "theft": ["stolen", "stole", "steal", "theft", "robbed", "robbery", "snatched", "pickpocketed"],
+    "lost": ["lost", "missing", "misplaced", "lose"],
+    "salary": ["salary", "salaries", "paycheck", "wages", "wage", "pay", "payment", "stipend"],
+    "delay": ["delayed", "delay", "late", "pending", "held", "unpaid", "stuck"],
+    "loan": ["loan", "loans", "emi", "emis", "debt", "debts", "installment", "credit", "overdue"],
+    "medical": ["medical", "hospital", "surgery", "treatment", "doctor", "bills", "bill"],
+    "fraud": ["fraud", "scam", "scammed", "cheated", "phishing", "otp", "fake", "duped"],
+    "rent": ["rent", "landlord", "eviction", "evicted", "lease"],
+    "job": ["job", "fired", "laid", "layoff", "unemployed", "terminated", "jobless"],
+    "business": ["business", "shop", "bankrupt", "bankruptcy", "losses"],
+}
+_CONCEPT_OF = {word: name for name, words in CONCEPTS.items() for word in words}
+
+# Char trigrams absorb typos and inflections; concepts carry most of the meaning
+TRIGRAM_WEIGHT = 0.3
+CONCEPT_WEIGHT = 3.0
+
+SEED_CORPUS = [
+    "my car was stolen and the loan emi is still due",
+    "lost my phone, need to replace it and block the sim",
+    "salary delayed this month and emi pending",
+    "cannot pay my loan emi, bank is calling",
+    "hospital bill is too high, no insurance",
+    "i got scammed on upi, money gone from account",
+    "rent due and landlord threatening eviction",
+    "lost my job yesterday, no income now",
+    "my business made huge losses, heading to bankruptcy",
+    "credit card debt keeps growing",
+]
+
+class HashedTfidfVectorizer:
+    """
+    Hashed word / word-bigram / char-trigram / concept features weighted by
+    sublinear TF-IDF and L2-normalized. Uses crc32 so vectors are stable
+    across processes; no model download or network call.
+    """
+
+    def __init__(self, n_features: int = SEMANTIC_CACHE_DIM):
+        self.n_features = n_features
+        self.idf = np.ones(n_features, dtype=np.float32)
+
+    def _features(self, text: str) -> Dict[int, float]:
+        words = _WORDS.findall(text.lower())
+        grams = [(word, 1.0) for word in words]
+        grams += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            grams += [(f"#{padded[i:i + 3]}", TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+            if word in _CONCEPT_OF:
+                grams.append((f"@{_CONCEPT_OF[word]}", CONCEPT_WEIGHT))
+
+        counts = {}
+        for gram, weight in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            index = h % self.n_features
+            sign = 1.0 if h & 0x80000000 else -1.0
+            counts[index] = counts.get(index, 0.0) + sign * weight
+        return counts
+
+    def fit(self, corpus: Sequence[str]) -> "HashedTfidfVectorizer":
+        df = np.zeros(self.n_features, dtype=np.float32)
+        for text in corpus:
+            df[list(self._features(text))] += 1
+        self.idf = (np.log((1 + len(corpus)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, count in self._features(text).items():
+                if abs(count) > 1:
+                    count = math.copysign(1 + math.log(abs(count)), count)
+                vectors[row, index] = count
+        vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+def semantic_scope(classification) -> Optional[str]:
+    """
+    The partition a cached plan may be shared in: the pre-classifier
+    category plus the exact set of feature groups it matched, so "lost my
+    phone" never meets "lost my job". None (no semantic lookup) when the
+    input has no confident financial category, or has a negation or danger
+    term: those change the meaning in ways similar wording hides.
+    """
+    if not classification or classification.get("label") != "financial" or not classification.get("category"):
+        return None
+    if classification.get("guards"):
+        return None
+    groups = sorted(classification.get("features", {}).get("financial", {}))
+    return f"{classification['category']}:{','.join(groups)}"
+
+class SemanticCache:
+    """
+    Size-capped in-memory vector index of reasoning plans.
+
+    Entries only match queries with the same steps/emergency settings and
+    the same semantic_scope(). When full, the least recently used entry is
+    overwritten.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        vectorizer: Optional[HashedTfidfVectorizer] = None,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.vectorizer = vectorizer or HashedTfidfVectorizer().fit(SEED_CORPUS)
+        dim = self.vectorizer.n_features
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._partitions = np.full(max_entries, -1, dtype=np.int32)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._values: List[Optional[str]] = [None] * max_entries
+        self._partition_ids: Dict[Tuple[int, bool, str], int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _partition(self, steps: int, emergency: bool, scope: str) -> int:
+        key = (int(steps), bool(emergency), scope)
+        partition = self._partition_ids.get(key)
+        if partition is None:
+            partition = self._partition_ids.setdefault(key, len(self._partition_ids))
+        return partition
+
+    def search(self, queries: np.ndarray, partitions: np.ndarray, k: int = 1, min_score: float = -1.0):
+        """
+        Batched top-k search. Returns (indices, scores), each shaped (len(queries), k);
+        slots with no entry at or above min_score hold index -1.
+        """
+        n = self._size
+        batch = len(queries)
+        indices = np.full((batch, k), -1, dtype=np.int64)
+        scores = np.full((batch, k), -np.inf, dtype=np.float32)
+        if n == 0:
+            return indices, scores
+
+        sims = queries @ self._vectors[:n].T
+        np.putmask(sims, self._partitions[:n][None, :] != partitions[:, None], -np.inf)
+
+        # Row maxima are cheap; only rows that can return something get sorted
+        best = sims.max(axis=1)
+        for row in np.flatnonzero(best >= min_score):
+            row_sims = sims[row]
+            candidates = np.flatnonzero(row_sims >= min_score)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(row_sims[candidates], -k)[-k:]]
+            candidates = candidates[np.argsort(-row_sims[candidates])]
+            indices[row, :len(candidates)] = candidates
+            scores[row, :len(candidates)] = row_sims[candidates]
+        return indices, scores
+
+    def lookup_many(self, user_inputs: Sequence[str], steps: Sequence[int], emergency: Sequence[bool],
+                    scopes: Sequence[str]):
+        queries = self.vectorizer.transform(user_inputs)
+        partitions = np.array(
+            [self._partition(s, e, scope) for s, e, scope in zip(steps, emergency, scopes)], dtype=np.int32
+        )
+        results = []
+        with self._lock:
+            indices, _ = self.search(queries, partitions, k=1, min_score=self.threshold)
+            now = time.monotonic()
+            for index in indices[:, 0]:
+                if index < 0:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self._last_used[index] = now
+                    results.append(json.loads(self._values[index]))
+        return results
+
+    def lookup(self, user_input: str, steps: int, emergency: bool, scope: str) -> Optional[Dict[str, Any]]:
+        return self.lookup_many([user_input], [steps], [emergency], [scope])[0]
+
+    def add(self, user_input: str, steps: int, emergency: bool, scope: str, value: Dict[str, Any]) -> None:
+        vector = self.vectorizer.transform([user_input])[0]
+        payload = json.dumps(value)
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._partitions[slot] = self._partition(steps, emergency, scope)
+            self._last_used[slot] = time.monotonic()
+            self._values[slot] = payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._partitions[:] = -1
+            self._values = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "size": self._size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
@@ -0,0 +1,112 @@
+"""
+Single-flight: concurrent requests for the same key share one in-flight
+call. The first caller (the leader) runs it; the others (followers) wait
+for its result. Keys are only held while the call is in flight; later
+requests are served by the response cache the leader fills.
+
+Works across threads and event loops: each flight is a
+concurrent.futures.Future, which sync followers block on and async
+followers await through asyncio.wrap_future.
+"""
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+
+from config.settings import SINGLE_FLIGHT_ENABLED, SINGLE_FLIGHT_WAIT_SECONDS
+from utils.metrics import SINGLE_FLIGHT
+
+class FlightAbandoned(Exception):
+    """The leader was cancelled (e.g. its client disconnected) before it finished."""
+
+class Flight:
+    def __init__(self, group: "SingleFlight", key: str, future: Future, leader: bool):
+        self._group = group
+        self.key = key
+        self.future = future
+        self.leader = leader
+
+    def publish(self, value) -> None:
+        """Leader: hand `value` to the followers and release the key."""
+        # Followers get their own copies: the leader goes on to mutate its plan
+        self._settle(lambda: self.future.set_result(copy.deepcopy(value)))
+
+    def fail(self, error: BaseException) -> None:
+        """Leader: the call failed; followers see the same error."""
+        if not isinstance(error, Exception):
+            error = FlightAbandoned(f"single-flight leader for {self.key[:12]} did not finish")
+        self._settle(lambda: self.future.set_exception(error))
+
+    def _settle(self, settle) -> None:
+        self._group._release(self)
+        if not self.future.done():
+            settle()
+
+    def result(self, timeout: float = SINGLE_FLIGHT_WAIT_SECONDS):
+        """Follower: block until the leader publishes."""
+        return copy.deepcopy(self.future.result(timeout=timeout))
+
+    async def aresult(self, timeout: float = SINGLE_FLIGHT_WAIT_SECONDS):
+        """Follower: await the leader, which may run in another thread or loop."""
+        # shield: a cancelled follower must not cancel the shared future
+        waiter = asyncio.shield(asyncio.wrap_future(self.future))
+        return copy.deepcopy(await asyncio.wait_for(waiter, timeout))
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> Flight:
+        """
+        The leader gets a Flight it must publish() or fail(); followers
+        get one to wait on with result() / aresult().
+        """
+        with self._lock:
+            future = self._flights.get(key) if self.enabled else None
+            leader = future is None
+            if leader:
+                future = Future()
+                if self.enabled:
+                    self._flights[key] = future
+        SINGLE_FLIGHT.inc(call=self.name, role="leader" if leader else "follower")
+        return Flight(self, key, future, leader)
+
+    def _release(self, flight: Flight) -> None:
+        with self._lock:
+            if self._flights.get(flight.key) is flight.future:
+                del self._flights[flight.key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def do(self, key: str, func):
+        """Run func() once for all concurrent callers with this key."""
+        flight = self.join(key)
+        if not flight.leader:
+            return flight.result()
+        try:
+            value = func()
+        except BaseException as error:
+            flight.fail(error)
+            raise
+        flight.publish(value)
+        return value
+
+    async def ado(self, key: str, afunc):
+        """Async do: awaits afunc() once for all concurrent callers with this key."""
+        flight = self.join(key)
+        if not flight.leader:
+            return await flight.aresult()
+        try:
+            value = await afunc()
+        except BaseException as error:
+            flight.fail(error)
+            raise
+        flight.publish(value)
+        return value
+
+# Reasoning (plan) calls, keyed by make_cache_key(user_input, steps, emergency)
+plan_flights = SingleFlight("plan")
@@ -0,0 +1,12 @@
+from agent.state import AgentState
+from emergency.financial_resources import get_emergency_contacts
+from utils.metrics import stage
+
+def contacts_node(state: AgentState) -> AgentState:
+    """
+    Look up emergency contacts from the user's message. Purely local, so the
+    graph runs it alongside the LLM call instead of after it.
+    """
+    with stage("contacts_lookup"):
+        state.emergency_contacts = get_emergency_contacts(state.user_input)
+    return state
@@ -1,17 +1,26 @@
 from config.settings import MAX_STEPS
+from agent.state import AgentState, compact_assessment, new_history
+from nodes.reasoning_node import finalize_output
 
-def guard_node(state, llm_output):
-    state.step_count += 1
+def guard_node(state: AgentState) -> AgentState:
+    """
+    Join point of the agent graph: cap the plan at MAX_STEPS, attach the
+    emergency contacts found in parallel and record a compacted assessment
+    in the bounded history.
+    """
+    parsed = state.output
+    if parsed is not None and not parsed.get("not_financial"):
+        action_steps = parsed.get("action_steps")
+        if isinstance(action_steps, list) and len(action_steps) > MAX_STEPS:
+            parsed = {**parsed, "action_steps": action_steps[:MAX_STEPS]}
+            parsed["final_advice"] = (
+                parsed.get("final_advice", "") + "\nWe will pause here to avoid overload."
+            ).strip()
 
-    if state.step_count >= MAX_STEPS:
-        llm_output["next_action"]["instruction_to_user"] += (
-            "\nWe will pause here to avoid overload."
-        )
-
-    if llm_output["internal_assessment"]["needs_emergency_support"]:
-        state.emergency_triggered = True
-
-    state.last_assessment = llm_output
-    state.history.append(llm_output)
+    finalize_output(state, parsed, state.emergency_contacts)
 
+    state.last_assessment = state.output
+    # A fresh ring rather than an in-place append: the old one may be shared graph state
+    state.history = new_history(state.history)
+    state.history.append(compact_assessment(state.output))
     return state
@@ -0,0 +1,146 @@
+from agent.state import AgentState
+from utils.keyword_matcher import KeywordMatcher
+from config.settings import PRECLASSIFIER_ENABLED, PRECLASSIFIER_REJECT_CONFIDENCE
+
+NOT_FINANCIAL_MESSAGE = "Main financial crisis situations me help karta hu. Apni financial problem batao."
+
+# Feature groups, mirroring the categories in the reasoning prompt rules and
+# the emergency-contact triggers. Phrases act as n-gram features.
+FINANCIAL_FEATURES = {
+    "vehicle": ["car", "cars", "vehicle", "bike", "scooter", "scooty", "motorcycle", "motorbike"],
+    "valuables": ["phone", "mobile", "iphone", "laptop", "jewelry", "jewellery", "gold", "wallet", "purse", "valuables"],
+    "theft": ["stolen", "stole", "theft", "robbed", "robbery", "snatched", "pickpocketed"],
+    "lost": ["lost", "missing", "misplaced"],
+    "salary": ["salary", "salaries", "paycheck", "wages", "stipend", "not paid", "unpaid"],
+    "delay": ["delayed", "delay", "late", "pending", "held up", "on hold"],
+    "loan": ["loan", "loans", "emi", "emis", "debt", "debts", "installment", "overdue", "default",
+             "credit card", "credit score", "cibil", "recovery agent", "recovery agents", "mortgage"],
+    "medical": ["medical bill", "medical bills", "hospital bill", "hospital bills", "hospital", "surgery",
+                "treatment", "medicine cost", "insurance claim", "health insurance"],
+    "job": ["lost my job", "lost job", "job loss", "fired", "laid off", "layoff", "layoffs", "unemployed",
+            "unemployment", "terminated", "jobless", "no job", "no income"],
+    "fraud": ["fraud", "scam", "scammed", "scammer", "cheated", "phishing", "otp", "fake call",
+              "money stolen", "hacked"],
+    "rent": ["rent", "landlord", "eviction", "evicted", "lease", "deposit"],
+    "business": ["business", "shop", "startup", "bankrupt", "bankruptcy", "losses", "loss"],
+    "money": ["money", "rupees", "rs", "inr", "lakh", "lakhs", "crore", "bank", "account", "bill", "bills",
+              "pay", "payment", "payments", "insurance", "savings", "budget", "afford", "expenses", "income",
+              "finance", "financial", "upi", "cash", "fees", "tax", "penalty", "cost", "costs",
+              "borrow", "borrowed", "lend", "lent", "owe", "owes", "invest", "investment", "stock", "stocks",
+              "crypto", "pension", "dollars", "price", "paisa", "paise", "kharcha", "udhaar"],
+}
+
+NON_FINANCIAL_FEATURES = {
+    "small_talk": ["hi", "hello", "hey", "good morning", "good night", "how are you", "thank you", "thanks",
+                   "who are you", "what is your name", "tell me a joke", "joke"],
+    "off_topic": ["weather", "recipe", "cook", "movie", "movies", "song", "songs", "cricket", "football",
+                  "match score", "poem", "story", "homework", "essay", "python", "javascript", "code",
+                  "capital of", "translate", "horoscope", "game", "games", "travel plan"],
+    "relationship": ["girlfriend", "boyfriend", "breakup", "broke up", "crush", "divorce", "marriage",
+                     "friend", "friends", "parents", "fight", "argument", "lonely", "love"],
+    "health": ["headache", "fever", "cold", "cough", "sleep", "insomnia", "diet", "weight", "exercise",
+               "tired", "pain", "sad", "depressed", "anxiety", "stress", "stressed", "bored"],
+}
+
+# Terms that change what the rest of the message means: a negation ("my car
+# was not stolen") or a risk to someone's life or safety. A message with any
+# of them is always planned by the LLM, never from a canned or cached plan.
+GUARD_FEATURES = {
+    "negation": ["not", "never", "no longer", "neither", "nor", "cannot", "can't", "cant", "don't", "dont",
+                 "didn't", "didnt", "doesn't", "doesnt", "isn't", "isnt", "wasn't", "wasnt", "weren't",
+                 "aren't", "won't", "wont", "hasn't", "hasnt", "haven't", "havent", "hadn't",
+                 "couldn't", "couldnt", "without"],
+    "danger": ["suicide", "suicidal", "kill myself", "killing myself", "end my life", "ending my life",
+               "end it all", "take my life", "want to die", "wanna die", "self harm", "hurt myself",
+               "no reason to live", "better off dead", "kidnapped", "kidnap", "kid inside", "child inside",
+               "baby inside", "with my kid", "with my child", "with my baby", "with my son",
+               "with my daughter", "injured", "injury", "accident", "attacked", "assaulted", "beaten",
+               "bleeding", "weapon", "knife", "gun", "unsafe", "in danger", "threatening to kill"],
+}
+
+_FINANCIAL_MATCHER = KeywordMatcher(FINANCIAL_FEATURES)
+_NON_FINANCIAL_MATCHER = KeywordMatcher(NON_FINANCIAL_FEATURES)
+_GUARD_MATCHER = KeywordMatcher(GUARD_FEATURES)
+
+# Strong groups name a crisis on their own; "money" and "lost"/"delay" only support one
+_STRONG_GROUPS = {"salary", "loan", "medical", "job", "fraud", "rent", "business", "theft"}
+
+# (category, required feature groups), checked in order
+CATEGORY_RULES = [
+    ("vehicle_theft", {"vehicle", "theft"}),
+    ("vehicle_theft", {"vehicle", "lost"}),
+    ("phone_loss", {"valuables", "theft"}),
+    ("phone_loss", {"valuables", "lost"}),
+    ("fraud", {"fraud"}),
+    ("salary_delay", {"salary"}),
+    ("job_loss", {"job"}),
+    ("medical_bills", {"medical"}),
+    ("emi_default", {"loan"}),
+    ("rent", {"rent"}),
+    ("business_loss", {"business"}),
+]
+
+def classify_financial(text: str):
+    """
+    Cheap keyword/n-gram classifier run before the LLM.
+
+    Returns {"label": "financial" | "not_financial" | "ambiguous",
+             "category": str | None, "confidence": float, "features": {...},
+             "guards": {"negation" | "danger": [terms]}}.
+    Only inputs with non-financial signals and no financial signal at all are
+    labelled not_financial; everything uncertain stays "ambiguous".
+    """
+    financial = _FINANCIAL_MATCHER.scan(text)
+    non_financial = _NON_FINANCIAL_MATCHER.scan(text)
+    groups = set(financial)
+
+    category = None
+    for name, required in CATEGORY_RULES:
+        if required <= groups:
+            category = name
+            break
+
+    if groups:
+        strong = len(groups & _STRONG_GROUPS)
+        score = 2 * strong + len(groups - _STRONG_GROUPS)
+        label = "financial"
+        confidence = min(0.5 + 0.12 * score, 0.99)
+    elif non_financial:
+        hits = sum(len(terms) for terms in non_financial.values())
+        label = "not_financial"
+        confidence = min(0.8 + 0.05 * hits, 0.97)
+    else:
+        label = "ambiguous"
+        confidence = 0.5
+
+    return {
+        "label": label,
+        "category": category,
+        "confidence": round(confidence, 2),
+        "features": {"financial": financial, "non_financial": non_financial},
+        "guards": _GUARD_MATCHER.scan(text),
+    }
+
+def not_financial_response():
+    return {
+        "not_financial": True,
+        "redirect_message": NOT_FINANCIAL_MESSAGE
+    }
+
+def preclassifier_node(state: AgentState) -> AgentState:
+    """
+    Classify locally and, for confident non-financial input, set the redirect
+    output so the LLM call can be skipped. Follow-ups in a conversation are
+    only classified: on its own, "my wife is upset about it" is not about money.
+    """
+    if not PRECLASSIFIER_ENABLED:
+        return state
+
+    state.classification = classify_financial(state.user_input)
+    if (
+        not state.context
+        and state.classification["label"] == "not_financial"
+        and state.classification["confidence"] >= PRECLASSIFIER_REJECT_CONFIDENCE
+    ):
+        state.output = not_financial_response()
+    return state
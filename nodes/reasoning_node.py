@@ -1,21 +1,25 @@
-from schemas.agent_state_schema import AgentState
-from llm.groq_client import call_groq
-from utils.json_formatter import safe_json_parse
+import time
+from agent.state import AgentState
+from config.settings import OPTIMAL_STEPS, PLAN_LIBRARY_PERSONALIZE, PLAN_LIBRARY_PERSONALIZE_DEADLINE_SECONDS
+from llm.groq_client import call_groq, async_call_groq
+from llm.output_schema import is_valid_output, repair_plan
+from llm.plan_library import plan_library, library_category, build_personalize_prompt, apply_personalization
+from llm.prompts import Prompt, PromptTemplate
+from llm.resilience import Deadline
+from llm.router import plan_route, task_route, escalation, routed_call, async_routed_call
+from llm.response_cache import response_cache, make_cache_key
+from llm.semantic_cache import semantic_cache, semantic_scope
+from llm.single_flight import plan_flights
+from utils.json_formatter import safe_json_parse, IncrementalJSONParser
 from emergency.financial_resources import get_emergency_contacts
+from nodes.preclassifier_node import preclassifier_node
+from utils.metrics import FALLBACKS, PARSE_FAILURES, PLAN_LIBRARY, observe_stage, stage
 
-def reasoning_node(state: AgentState) -> AgentState:
-    # Optimal 5 steps, max 7 for emergency
-    optimal_steps = 5
-    max_steps = 7 if state.emergency else 5
-    
-    steps = min(state.steps, max_steps)
-
-    prompt = f"""
+REASONING_PROMPT = PromptTemplate(
+    "reasoning",
+    system="""
 You are a FINANCIAL CRISIS support assistant. You ONLY help with FINANCIAL and MONEY-RELATED problems.
 
-User message:
-{state.user_input}
-
 IMPORTANT RULES:
 1. These are FINANCIAL problems - ALWAYS ACCEPT and provide help:
    - Lost/stolen car, vehicle, bike → insurance claims, loan EMI, transportation costs, police report
@@ -34,130 +38,433 @@ IMPORTANT RULES:
    - Emotional/mental health (unless causing job/income loss)
    
    For non-financial, respond:
-   {{
+   {
        "not_financial": true,
        "redirect_message": "Main financial crisis situations me help karta hu. Apni financial problem batao."
-   }}
+   }
 
-3. For ALL FINANCIAL problems, provide this JSON with EXACTLY {steps} action steps:
-{{
+3. For ALL FINANCIAL problems, provide this JSON with EXACTLY the number of action steps asked for:
+{
     "crisis_type": "specific financial issue (e.g., 'Vehicle theft impacting insurance and transportation costs')",
     "severity": "low/medium/high",
     "mood": "calm/panic/anxious/depressed/angry/overwhelmed",
     "calming_steps": [
-        {{
+        {
             "instruction": "Take 5 deep breaths - we will solve this step by step",
             "type": "breathing",
             "duration_seconds": 20
-        }}
+        }
     ],
     "action_steps": [
-        {{
+        {
             "step": "Short, basic, calming action step (one sentence)",
             "priority": "high/medium",
             "estimated_time_minutes": 20
-        }}
+        }
     ],
     "needs_emergency_support": false,
     "final_advice": "Supportive message"
-}}
+}
 
 CRITICAL: 
 - Lost car/vehicle = FINANCIAL CRISIS (insurance, loan, transport costs)
 - Lost valuables = FINANCIAL CRISIS (replacement, insurance)
 - Detect the user's mood from their message and provide calming steps that match it.
 - Keep steps short, gentle, and basic. Avoid harsh or overwhelming language.
-- Provide ONLY 1-2 calming steps and EXACTLY {steps} action steps.
-"""
+- The user's message may follow up on the conversation so far: plan for the new message in light of it.
+- Provide ONLY 1-2 calming steps and EXACTLY the number of action steps asked for.
+
+Respond ONLY in valid JSON.
+""",
+    user="""
+{conversation}User message:
+{user_input}
+
+Action steps: EXACTLY {steps}.
+""",
+)
+
+def build_reasoning_prompt(state: AgentState) -> Prompt:
+    with stage("prompt_build"):
+        return _reasoning_prompt(state)
+
+def requested_steps(state: AgentState) -> int:
+    # Optimal 5 steps, max 7 for emergency
+    max_steps = 7 if state.emergency else 5
+    return min(state.steps, max_steps)
+
+def _reasoning_prompt(state: AgentState) -> Prompt:
+    conversation = f"Conversation so far:\n{state.context}\n\n" if state.context else ""
+    return REASONING_PROMPT.render(
+        conversation=conversation, user_input=state.user_input, steps=requested_steps(state)
+    )
+
+def parse_reply(raw: str):
+    with stage("json_parse"):
+        return safe_json_parse(raw)
+
+def repair_reply(parsed, steps: int = OPTIMAL_STEPS):
+    with stage("schema_repair"):
+        return repair_plan(parsed, steps)
+
+def parse_plan(raw: str, steps: int = OPTIMAL_STEPS):
+    """Parse a plan reply and repair it towards llm/output_schema.json."""
+    return repair_reply(parse_reply(raw), steps)
+
+def _plan_parser(state: AgentState):
+    return lambda raw: parse_plan(raw, requested_steps(state))
+
+def _plan_check(state: AgentState):
+    return lambda parsed: is_valid_plan(parsed, requested_steps(state))
+
+def parse_llm_output(raw: str, steps: int = OPTIMAL_STEPS):
+    """Parse and repair the LLM reply, fill default steps if needed. Returns None if unusable."""
+    return complete_plan(parse_plan(raw, steps))
+
+def is_valid_plan(parsed, steps: int = 1) -> bool:
+    """
+    Does a parsed, repaired reply match the output schema, with at least
+    `steps` action steps, before default steps are filled in? Replies
+    that don't are escalated to the large model by the router.
+    """
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return False
+    if parsed.get("not_financial"):
+        return is_valid_output("redirect", parsed)
+    return is_valid_output("plan", parsed) and len(parsed["action_steps"]) >= steps
+
+def complete_plan(parsed):
+    """
+    Fill default action steps into a parsed, repaired reply that has none
+    and validate the result. Returns None if unusable.
+    """
+    with stage("fill_defaults"):
+        completed = _complete_plan(parsed)
+    if completed is None:
+        PARSE_FAILURES.inc()
+    return completed
+
+def _complete_plan(parsed):
+    if not isinstance(parsed, dict) or "error" in parsed:
+        return None
+
+    # Check if it's a non-financial issue
+    if parsed.get("not_financial"):
+        return parsed if is_valid_output("redirect", parsed) else None
+
+    if "action_steps" not in parsed:
+        parsed["action_steps"] = get_default_action_steps()
+    return parsed if is_valid_output("plan", parsed) else None
+
+def finalize_output(state: AgentState, parsed, emergency_contacts=None) -> AgentState:
+    if parsed is None:
+        FALLBACKS.inc()
+        state.output = create_default_response()
+        return state
+
+    if not parsed.get("not_financial"):
+        # Check for emergency and add resources
+        if emergency_contacts is None:
+            with stage("contacts_lookup"):
+                emergency_contacts = get_emergency_contacts(state.user_input)
+        if parsed.get("needs_emergency_support") or emergency_contacts:
+            state.emergency_triggered = True
+            if emergency_contacts:
+                parsed["emergency_contacts"] = emergency_contacts
+
+    state.output = parsed
+    return state
+
+def _answered_locally(state: AgentState) -> bool:
+    """Confident non-financial input gets the redirect without an LLM call."""
+    preclassifier_node(state)
+    return state.output is not None
+
+def _library_plan(state: AgentState):
+    """(category, vetted plan) for a confidently classified common crisis, or None."""
+    if state.context:
+        # A follow-up is planned with its conversation, not from a generic plan
+        return None
+    with stage("plan_library"):
+        steps = requested_steps(state)
+        category = library_category(state.classification, state.user_input, steps)
+        if category is None:
+            return None
+        PLAN_LIBRARY.inc(category=category, outcome="served")
+        return category, plan_library.plan(category, steps)
+
+def _personalize_call(plan, state: AgentState):
+    route = task_route("personalize", state.priority)
+    prompt = build_personalize_prompt(plan, state.user_input)
+    return prompt, route, Deadline(PLAN_LIBRARY_PERSONALIZE_DEADLINE_SECONDS)
+
+def _serve_from_library(state: AgentState) -> bool:
+    """Put a library plan in state.output, personalized if enabled; False if none applies."""
+    library = _library_plan(state)
+    if library is None:
+        return False
+    category, plan = library
+    if PLAN_LIBRARY_PERSONALIZE:
+        prompt, route, deadline = _personalize_call(plan, state)
+        try:
+            parsed = parse_reply(call_groq(prompt, deadline=deadline, model=route.model, priority=route.priority))
+        except Exception as e:
+            parsed = None
+        plan = apply_personalization(plan, parsed, category)
+    state.output = plan
+    return True
+
+async def _aserve_from_library(state: AgentState) -> bool:
+    library = _library_plan(state)
+    if library is None:
+        return False
+    category, plan = library
+    if PLAN_LIBRARY_PERSONALIZE:
+        prompt, route, deadline = _personalize_call(plan, state)
+        try:
+            parsed = parse_reply(
+                await async_call_groq(prompt, deadline=deadline, model=route.model, priority=route.priority)
+            )
+        except Exception as e:
+            parsed = None
+        plan = apply_personalization(plan, parsed, category)
+    state.output = plan
+    return True
+
+def _lookup_cached_plan(state: AgentState):
+    """Exact-match cache first, then the near-duplicate (semantic) tier."""
+    with stage("cache_lookup"):
+        key = make_cache_key(state.user_input, requested_steps(state), state.emergency, state.context)
+        cached = response_cache.get(key)
+        # Near-duplicate inputs can mean different things in different conversations
+        scope = semantic_scope(state.classification) if semantic_cache is not None and not state.context else None
+        if cached is None and scope is not None:
+            cached = semantic_cache.lookup(state.user_input, requested_steps(state), state.emergency, scope)
+    return key, cached
+
+def _store_plan(state: AgentState, key: str, parsed) -> None:
+    # Only real LLM plans are cached, never the create_default_response() fallback
+    if parsed is None:
+        return
+    response_cache.set(key, parsed)
+    if semantic_cache is not None and not parsed.get("not_financial") and not state.context:
+        scope = semantic_scope(state.classification)
+        if scope is not None:
+            semantic_cache.add(state.user_input, requested_steps(state), state.emergency, scope, parsed)
+
+def _generate_plan(state: AgentState, key: str):
+    prompt = build_reasoning_prompt(state)
 
     try:
-        raw = call_groq(prompt)
-        parsed = safe_json_parse(raw)
-        
-        # Check if it's a non-financial issue
-        if isinstance(parsed, dict) and parsed.get("not_financial"):
-            state.output = parsed
-            return state
-        
-        # Validate and add defaults for financial issues
-        if not isinstance(parsed, dict) or "error" in parsed:
-            parsed = create_default_response()
-        else:
-            # Ensure required fields
-            if "crisis_type" not in parsed:
-                parsed["crisis_type"] = "Financial crisis requiring attention"
-            if "severity" not in parsed:
-                parsed["severity"] = "medium"
-            if "mood" not in parsed:
-                parsed["mood"] = "overwhelmed"
-            if "calming_steps" not in parsed:
-                parsed["calming_steps"] = get_default_calming_steps()
-            if "action_steps" not in parsed:
-                parsed["action_steps"] = get_default_action_steps()
-            if "final_advice" not in parsed:
-                parsed["final_advice"] = "Take it one step at a time."
-            if "needs_emergency_support" not in parsed:
-                parsed["needs_emergency_support"] = False
-            
-            # Check for emergency and add resources
-            emergency_contacts = get_emergency_contacts(state.user_input)
-            if parsed.get("needs_emergency_support") or emergency_contacts:
-                state.emergency_triggered = True
-                if emergency_contacts:
-                    parsed["emergency_contacts"] = emergency_contacts
-        
-        state.output = parsed
-        
+        parsed = complete_plan(routed_call(prompt, plan_route(state), _plan_parser(state), _plan_check(state)))
     except Exception as e:
-        state.output = create_default_response()
-    
+        parsed = None
+
+    _store_plan(state, key, parsed)
+    return parsed
+
+async def _agenerate_plan(state: AgentState, key: str):
+    prompt = build_reasoning_prompt(state)
+
+    try:
+        parsed = complete_plan(
+            await async_routed_call(prompt, plan_route(state), _plan_parser(state), _plan_check(state))
+        )
+    except Exception as e:
+        parsed = None
+
+    _store_plan(state, key, parsed)
+    return parsed
+
+def plan_node(state: AgentState) -> AgentState:
+    """
+    Graph node: put a library, cached or freshly generated plan in
+    state.output (None if the reply was unusable). guard_node finalizes
+    it. Identical requests already in flight share one LLM call
+    (llm/single_flight.py).
+    """
+    if _serve_from_library(state):
+        return state
+
+    key, cached = _lookup_cached_plan(state)
+    if cached is not None:
+        state.output = cached
+        return state
+
+    try:
+        state.output = plan_flights.do(key, lambda: _generate_plan(state, key))
+    except Exception as e:
+        # A follower whose leader took longer than SINGLE_FLIGHT_WAIT_SECONDS
+        state.output = None
+    return state
+
+async def async_plan_node(state: AgentState) -> AgentState:
+    """Same as plan_node, but awaits the pooled async Groq client."""
+    if await _aserve_from_library(state):
+        return state
+
+    key, cached = _lookup_cached_plan(state)
+    if cached is not None:
+        state.output = cached
+        return state
+
+    try:
+        state.output = await plan_flights.ado(key, lambda: _agenerate_plan(state, key))
+    except Exception as e:
+        state.output = None
     return state
 
+def stream_plan_node(state: AgentState):
+    """
+    Generator version of plan_node. Yields (event, data) pairs as soon as
+    mood, crisis_type, the first calming step and each action step are
+    parsed; library plans and cache hits yield nothing. state.output is
+    set once it ends. A request identical to one already in flight waits
+    for that plan and, like a cache hit, yields nothing.
+    """
+    if _serve_from_library(state):
+        return
+
+    key, cached = _lookup_cached_plan(state)
+    if cached is not None:
+        state.output = cached
+        return
+
+    flight = plan_flights.join(key)
+    if not flight.leader:
+        try:
+            state.output = flight.result()
+        except Exception as e:
+            state.output = None
+        return
+
+    prompt = build_reasoning_prompt(state)
+    route = plan_route(state)
+    parser = IncrementalJSONParser()
+    parse_seconds = 0.0
+
+    try:
+        for delta in call_groq(prompt, stream=True, model=route.model, priority=route.priority):
+            started = time.perf_counter()
+            events = parser.feed(delta)
+            parse_seconds += time.perf_counter() - started
+            for event in events:
+                streamed = _stream_event(event)
+                if streamed:
+                    yield streamed
+        parser.finish()
+        observe_stage("json_parse", parse_seconds)
+        steps = requested_steps(state)
+        parsed = repair_reply(parser.value, steps)
+        escalated = None if is_valid_plan(parsed, steps) else escalation(route)
+        if escalated is not None:
+            # Pieces already streamed were a preview; the final plan event carries this one
+            parsed = parse_plan(call_groq(prompt, model=escalated.model, priority=escalated.priority), steps)
+        parsed = complete_plan(parsed)
+    except Exception as e:
+        parsed = None
+    except BaseException as e:
+        # The client went away mid-stream: release the followers
+        flight.fail(e)
+        raise
+
+    _store_plan(state, key, parsed)
+    flight.publish(parsed)
+    state.output = parsed
+
+async def astream_plan_node(state: AgentState):
+    """Async generator version of stream_plan_node."""
+    if await _aserve_from_library(state):
+        return
+
+    key, cached = _lookup_cached_plan(state)
+    if cached is not None:
+        state.output = cached
+        return
+
+    flight = plan_flights.join(key)
+    if not flight.leader:
+        try:
+            state.output = await flight.aresult()
+        except Exception as e:
+            state.output = None
+        return
+
+    prompt = build_reasoning_prompt(state)
+    route = plan_route(state)
+    parser = IncrementalJSONParser()
+    parse_seconds = 0.0
+
+    try:
+        async for delta in await async_call_groq(prompt, stream=True, model=route.model, priority=route.priority):
+            started = time.perf_counter()
+            events = parser.feed(delta)
+            parse_seconds += time.perf_counter() - started
+            for event in events:
+                streamed = _stream_event(event)
+                if streamed:
+                    yield streamed
+        parser.finish()
+        observe_stage("json_parse", parse_seconds)
+        steps = requested_steps(state)
+        parsed = repair_reply(parser.value, steps)
+        escalated = None if is_valid_plan(parsed, steps) else escalation(route)
+        if escalated is not None:
+            parsed = parse_plan(
+                await async_call_groq(prompt, model=escalated.model, priority=escalated.priority), steps
+            )
+        parsed = complete_plan(parsed)
+    except Exception as e:
+        parsed = None
+    except BaseException as e:
+        # The client went away mid-stream: release the followers
+        flight.fail(e)
+        raise
+
+    _store_plan(state, key, parsed)
+    flight.publish(parsed)
+    state.output = parsed
+
+def reasoning_node(state: AgentState) -> AgentState:
+    """Pre-classify, plan and finalize in one call, without the agent graph."""
+    if _answered_locally(state):
+        return state
+
+    plan_node(state)
+    return finalize_output(state, state.output)
+
+def _action_step_event(index, step):
+    if isinstance(step, dict):
+        step = {"index": index, **step}
+    return "action_step", step
+
+def _stream_event(event):
+    """Map a parser event to the (name, data) pairs streamed to the UI."""
+    key = event["key"]
+    if event["type"] == "field" and key in ("mood", "crisis_type", "severity", "not_financial"):
+        return key, event["value"]
+    if event["type"] == "item" and key == "calming_steps" and event["index"] == 0:
+        return "calming_step", event["value"]
+    if event["type"] == "item" and key == "action_steps":
+        return _action_step_event(event["index"], event["value"])
+    return None
+
+def plan_events(output):
+    """Events for a plan that is already complete (cache hits, local answers)."""
+    for key in ("not_financial", "crisis_type", "severity", "mood"):
+        if key in output:
+            yield key, output[key]
+    for calming_step in output.get("calming_steps", [])[:1]:
+        yield "calming_step", calming_step
+    for index, step in enumerate(output.get("action_steps", [])):
+        yield _action_step_event(index, step)
+    yield "plan", output
+
 def get_default_calming_steps():
-    return [
-        {
-            "instruction": "Take 5 deep breaths - financial stress is temporary",
-            "type": "breathing",
-            "duration_seconds": 20
-        }
-    ]
+    return plan_library.calming_steps("general")
 
-def get_default_action_steps():
-    return [
-        {
-            "step": "List all your monthly income sources and their amounts",
-            "priority": "high",
-            "estimated_time_minutes": 15
-        },
-        {
-            "step": "Calculate your total monthly expenses and prioritize essential ones",
-            "priority": "high",
-            "estimated_time_minutes": 20
-        },
-        {
-            "step": "Identify immediate financial obligations (bills due this week)",
-            "priority": "high",
-            "estimated_time_minutes": 10
-        },
-        {
-            "step": "Contact your creditors or service providers to discuss payment options",
-            "priority": "medium",
-            "estimated_time_minutes": 30
-        },
-        {
-            "step": "Explore emergency funding options or financial assistance programs",
-            "priority": "medium",
-            "estimated_time_minutes": 25
-        }
-    ]
+def get_default_action_steps(steps: int = OPTIMAL_STEPS):
+    return plan_library.action_steps("general", steps)
 
 def create_default_response():
-    return {
-        "crisis_type": "Financial stress requiring budget review",
-        "severity": "medium",
-        "mood": "overwhelmed",
-        "calming_steps": get_default_calming_steps(),
-        "action_steps": get_default_action_steps(),
-        "needs_emergency_support": False,
-        "final_advice": "Financial challenges are temporary. Let's create a plan to work through this step by step."
-    }
+    return plan_library.plan("general", OPTIMAL_STEPS)
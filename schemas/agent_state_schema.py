@@ -1,14 +1,35 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
+from agent.state import AgentState as RuntimeAgentState, new_history
 
 class AgentState(BaseModel):
+    """
+    Validated, serializable view of the agent state, for API boundaries.
+    The graph itself runs on the unvalidated agent.state.AgentState.
+    """
     user_input: str
     steps: int = 5
     emergency: bool = False
+    context: str = ""
+    priority: Optional[str] = None
     output: Optional[Dict[str, Any]] = None
     current_step: int = 0
-    completed_steps: List[Dict[str, Any]] = []
+    completed_steps: List[Dict[str, Any]] = Field(default_factory=list)
     needs_reevaluation: bool = False
     emergency_triggered: bool = False
-    history: List[Dict[str, Any]] = []
+    history: List[Dict[str, Any]] = Field(default_factory=list)
     last_assessment: Optional[Dict[str, Any]] = None
+    classification: Optional[Dict[str, Any]] = None
+    emergency_contacts: Dict[str, Any] = Field(default_factory=dict)
+    node_timings: Dict[str, float] = Field(default_factory=dict)
+
+    @classmethod
+    def from_state(cls, state: RuntimeAgentState) -> "AgentState":
+        values = {name: getattr(state, name) for name in cls.model_fields}
+        values["history"] = list(state.history)
+        return cls.model_validate(values)
+
+    def to_state(self) -> RuntimeAgentState:
+        values = {name: getattr(self, name) for name in type(self).model_fields}
+        values["history"] = new_history(self.history)
+        return RuntimeAgentState(**values)
@@ -1,7 +1,17 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, List, Optional
+from config.settings import BATCH_MAX_ITEMS
 
 class ChatRequest(BaseModel):
     user_input: str
     steps: Optional[int] = 5
     emergency: Optional[bool] = False
+    # Conversation memory: requests with the same session_id see earlier turns.
+    # completed_steps are 0-based action steps of the previous plan done since.
+    session_id: Optional[str] = None
+    completed_steps: Optional[List[Annotated[int, Field(ge=0)]]] = None
+
+class ChatBatchRequest(BaseModel):
+    # Items are validated one by one, so one bad item fails only itself
+    items: List[Any] = Field(max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(default=None, ge=1)
@@ -1,9 +1,14 @@
 import streamlit as st
-from schemas.agent_state_schema import AgentState
-from nodes.reasoning_node import reasoning_node
+from agent.state import AgentState
+from agent.agent_runner import stream_agent
+from agent.session_store import session_store
 from nodes.response_node import response_node
+from utils.countdown_timer import countdown_timer
+from llm.alternatives import AlternativesPrefetch, fetch_alternative, prefetch_stats
+import copy
 import json
 import time
+import uuid
 
 # Page configuration
 st.set_page_config(
@@ -34,6 +39,30 @@ st.markdown(
 )
 st.divider()
 
+# Chat and step progress persisted in the session store, so a restart or a
+# reconnect to another replica resumes the plan. The id lives in the URL.
+PERSISTED_FIELDS = (
+    "messages", "all_steps", "current_step_index", "calming_completed", "calming_started_at",
+    "user_situation", "timer_running", "timer_remaining", "timer_step_id", "timer_last_tick", "timer_finished",
+)
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    stored = session_store.get(st.session_state.session_id)
+    for name in PERSISTED_FIELDS:
+        if name in stored.ui:
+            st.session_state[name] = copy.deepcopy(stored.ui[name])
+    # Earlier turns, so follow-up messages are planned in context
+    st.session_state.conversation = stored.memory
+
+def persist_session():
+    """Save chat and step progress; the SQLite store writes it behind."""
+    session = session_store.get(st.session_state.session_id)
+    session.memory = st.session_state.conversation
+    session.ui = {name: st.session_state[name] for name in PERSISTED_FIELDS}
+    session_store.save(session)
+
 # Initialize session state for chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -69,6 +98,55 @@ if "timer_step_id" not in st.session_state:
 if "timer_last_tick" not in st.session_state:
     st.session_state.timer_last_tick = None
 
+if "timer_finished" not in st.session_state:
+    st.session_state.timer_finished = None
+
+# Background "Need Help" alternatives for the current plan
+if "alternatives" not in st.session_state:
+    st.session_state.alternatives = None
+
+def cancel_alternatives():
+    if st.session_state.alternatives is not None:
+        st.session_state.alternatives.cancel()
+        st.session_state.alternatives = None
+
+if "calming_started_at" not in st.session_state:
+    st.session_state.calming_started_at = None
+
+def on_calming_timer_event(event):
+    if event["type"] == "start":
+        st.session_state.calming_started_at = time.time()
+    elif event["type"] == "finish":
+        st.session_state.calming_started_at = None
+        st.session_state.calming_completed = True
+    persist_session()
+
+@st.fragment
+def calming_timer(duration):
+    """
+    Countdown for the first calming step. It ticks in the browser, so the
+    script thread stays free; start and finish rerun only this fragment.
+    """
+    started_at = st.session_state.calming_started_at
+    remaining = duration
+    if started_at is not None:
+        remaining = max(0, duration - (time.time() - started_at))
+    elif st.session_state.calming_completed:
+        remaining = 0
+
+    countdown_timer(
+        key="calm_timer_initial",
+        total_seconds=duration,
+        remaining_seconds=remaining,
+        running=started_at is not None,
+        start_label=f"▶️ Start {duration}s Timer",
+        controls=False,
+        on_event=on_calming_timer_event,
+    )
+
+    if st.session_state.calming_completed:
+        st.success("Great! Ab aage badhte hain.")
+
 # Sidebar with settings
 with st.sidebar:
     st.header("⚙️ Settings")
@@ -81,6 +159,10 @@ with st.sidebar:
     
     st.markdown("### Display")
     show_details = st.checkbox("📊 Show detailed analysis", value=True, help="Show JSON details in expandable section")
+    if show_details:
+        stats = prefetch_stats()
+        hit_rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+        st.caption(f"Need Help prefetch: {hit_rate} hit rate, {stats['wasted']} wasted calls")
     
     st.divider()
     
@@ -93,7 +175,11 @@ with st.sidebar:
         st.session_state.current_step_index = 0
         st.session_state.all_steps = []
         st.session_state.calming_completed = False
+        st.session_state.calming_started_at = None
         st.session_state.user_situation = None
+        st.session_state.conversation.clear()
+        cancel_alternatives()
+        persist_session()
         st.rerun()
     
     st.divider()
@@ -161,6 +247,11 @@ for message in st.session_state.messages:
                     
                     # Show raw JSON
                     st.json(details)
+
+                    if message.get("timings"):
+                        st.caption("⏱️ " + " · ".join(
+                            f"{name} {ms:.1f} ms" for name, ms in message["timings"].items()
+                        ))
                 else:
                     st.write(details)
 
@@ -168,6 +259,9 @@ for message in st.session_state.messages:
 user_input = st.chat_input("Describe your financial situation... (e.g., 'Salary delayed, EMI pending')")
 
 if user_input:
+    # A new situation makes the old plan's alternatives useless
+    cancel_alternatives()
+
     # Display user message
     with st.chat_message("user"):
         st.markdown(user_input)
@@ -180,50 +274,80 @@ if user_input:
     
     # Process with assistant
     with st.chat_message("assistant"):
-        with st.spinner("🤔 Analyzing..."):
-            try:
-                # Create state
-                step_limit = 7 if emergency_mode else 5
-                state = AgentState(
-                    user_input=user_input,
-                    steps=min(max_steps, step_limit),
-                    emergency=emergency_mode
-                )
-                
-                # Run reasoning node
-                final_state = reasoning_node(state)
-                output = final_state.output
-                
-                # Check if not financial issue
-                if output.get("not_financial"):
-                    st.info("Main financial crisis situations me help karta hu. Apni financial problem batao.")
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": "Main financial crisis situations me help karta hu. Apni financial problem batao.",
-                        "emergency": False
-                    })
+        # Filled progressively while the plan streams in
+        situation_slot = st.empty()
+        mood_slot = st.empty()
+        calm_slot = st.empty()
+        steps_slot = st.empty()
+        situation_slot.caption("🤔 Analyzing...")
+        try:
+            # Create state
+            step_limit = 7 if emergency_mode else 5
+            state = AgentState(
+                user_input=user_input,
+                steps=min(max_steps, step_limit),
+                emergency=emergency_mode,
+                context=st.session_state.conversation.context()
+            )
+            
+            # Stream the agent graph: show each piece as soon as it is parsed
+            output = {}
+            run_info = {}
+            preview_steps = []
+            for event, data in stream_agent(state):
+                if event == "crisis_type":
+                    situation_slot.info(f"**Situation:** {data}")
+                elif event == "mood":
+                    mood_slot.caption(f"Mood detected: {data}")
+                elif event == "calming_step" and isinstance(data, dict):
+                    calm_slot.markdown(f"🧘 {data.get('instruction', '')}")
+                elif event == "action_step" and isinstance(data, dict):
+                    preview_steps.append(data)
+                    steps_slot.markdown("**Coming up:**\n" + "\n".join(
+                        f"{i}. {step.get('step', '')}" for i, step in enumerate(preview_steps, 1)
+                    ))
+                elif event == "plan":
+                    output = data
+                elif event == "done":
+                    run_info = data
+            steps_slot.empty()
+            st.session_state.conversation.add_turn(user_input, output)
+            
+            # Check if not financial issue
+            if output.get("not_financial"):
+                situation_slot.info("Main financial crisis situations me help karta hu. Apni financial problem batao.")
+                mood_slot.empty()
+                calm_slot.empty()
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": "Main financial crisis situations me help karta hu. Apni financial problem batao.",
+                    "emergency": False
+                })
+            
+            # Check for error
+            elif "error" in output:
+                situation_slot.error("Kuch issue aa raha hai. Phir se try karo.")
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": "Kuch issue aa raha hai. Phir se try karo.",
+                    "emergency": False
+                })
+            
+            else:
+                # Store situation and steps
+                st.session_state.user_situation = output
+                st.session_state.all_steps = output.get("action_steps", [])
+                st.session_state.alternatives = AlternativesPrefetch(output)
+                st.session_state.current_step_index = 0
+                st.session_state.calming_completed = False
+                st.session_state.calming_started_at = None
                 
-                # Check for error
-                elif "error" in output:
-                    st.error("Kuch issue aa raha hai. Phir se try karo.")
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": "Kuch issue aa raha hai. Phir se try karo.",
-                        "emergency": False
-                    })
+                crisis = output.get('crisis_type', 'Financial situation')
+                severity = output.get('severity', 'medium')
+                is_emergency = severity == "high" or run_info.get("emergency_triggered", False)
                 
-                else:
-                    # Store situation and steps
-                    st.session_state.user_situation = output
-                    st.session_state.all_steps = output.get("action_steps", [])
-                    st.session_state.current_step_index = 0
-                    st.session_state.calming_completed = False
-                    
-                    crisis = output.get('crisis_type', 'Financial situation')
-                    severity = output.get('severity', 'medium')
-                    is_emergency = severity == "high" or final_state.emergency_triggered
-                    
-                    # Show situation
+                # Show situation
+                with situation_slot.container():
                     if is_emergency:
                         st.error(f"🚨 **Urgent:** {crisis}")
                         if "emergency_contacts" in output:
@@ -232,62 +356,92 @@ if user_input:
                                 st.write(f"📞 {ct}: {ci}")
                     else:
                         st.info(f"**Situation:** {crisis}")
+                
+                # Show mood and FIRST calming step only
+                mood = output.get("mood", "overwhelmed")
+                mood_heading = {
+                    "panic": "🧘 Panic me ho? Pehle breathing karo",
+                    "anxious": "🧘 Anxiety kam karte hain",
+                    "depressed": "🧘 Thoda stable feel karne ke steps",
+                    "angry": "🧘 Anger settle karte hain",
+                    "calm": "🧘 Calm ho, bas ek steady step",
+                    "overwhelmed": "🧘 Overwhelmed feel ho raha hai? Pehle calm ho jao"
+                }.get(mood, "🧘 Pehle thoda calm ho jao")
+
+                mood_slot.caption(f"Mood detected: {mood}")
+
+                # Show FIRST calming step only
+                calming_steps = output.get("calming_steps", [])
+                calm_slot.empty()
+                if calming_steps and len(calming_steps) > 0:
+                    first_calm = calming_steps[0]
+                    instruction = first_calm.get("instruction", "")
+                    duration = first_calm.get("duration_seconds", 20)
                     
-                    # Show mood and FIRST calming step only
-                    mood = output.get("mood", "overwhelmed")
-                    mood_heading = {
-                        "panic": "🧘 Panic me ho? Pehle breathing karo",
-                        "anxious": "🧘 Anxiety kam karte hain",
-                        "depressed": "🧘 Thoda stable feel karne ke steps",
-                        "angry": "🧘 Anger settle karte hain",
-                        "calm": "🧘 Calm ho, bas ek steady step",
-                        "overwhelmed": "🧘 Overwhelmed feel ho raha hai? Pehle calm ho jao"
-                    }.get(mood, "🧘 Pehle thoda calm ho jao")
-
-                    st.caption(f"Mood detected: {mood}")
-
-                    # Show FIRST calming step only
-                    calming_steps = output.get("calming_steps", [])
-                    if calming_steps and len(calming_steps) > 0:
-                        first_calm = calming_steps[0]
-                        instruction = first_calm.get("instruction", "")
-                        duration = first_calm.get("duration_seconds", 20)
-                        
+                    with calm_slot.container():
                         st.markdown(f"### {mood_heading}")
                         st.write(instruction)
                         st.write(f"**Duration:** {duration} seconds")
-                        
-                        # Timer
-                        if st.button(f"▶️ Start {duration}s Timer", key="calm_timer_initial"):
-                            timer_placeholder = st.empty()
-                            progress_bar = st.progress(0)
-                            
-                            for remaining in range(duration, 0, -1):
-                                timer_placeholder.markdown(f"### ⏱️ {remaining}s")
-                                progress_bar.progress((duration - remaining) / duration)
-                                time.sleep(1)
-                            
-                            timer_placeholder.markdown("### ✅ Done!")
-                            progress_bar.progress(1.0)
-                            st.session_state.calming_completed = True
-                            st.success("Great! Ab aage badhte hain.")
                     
-                    # Save to history
-                    msg = f"Situation: {crisis}\n\nPehle calm down karo, phir steps follow karenge."
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": msg,
-                        "emergency": is_emergency,
-                        "details": output if show_details else None
-                    })
-                    
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
+                    # Counts down in the browser; the script run ends right away
+                    calming_timer(int(duration))
+                
+                # Save to history
+                msg = f"Situation: {crisis}\n\nPehle calm down karo, phir steps follow karenge."
                 st.session_state.messages.append({
                     "role": "assistant",
-                    "content": "Technical issue hai. Phir se try karo.",
-                    "emergency": False
+                    "content": msg,
+                    "emergency": is_emergency,
+                    "details": output if show_details else None,
+                    "timings": run_info.get("node_timings")
                 })
+                
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": "Technical issue hai. Phir se try karo.",
+                "emergency": False
+            })
+
+def step_timer_remaining(total_seconds):
+    """Seconds left on the step timer, derived from the last reported event."""
+    remaining = st.session_state.timer_remaining
+    if st.session_state.timer_running and st.session_state.timer_last_tick:
+        remaining -= time.time() - st.session_state.timer_last_tick
+    return max(0, min(total_seconds, remaining))
+
+def on_step_timer_event(step_timer_id, event):
+    st.session_state.timer_step_id = step_timer_id
+    st.session_state.timer_remaining = event.get("remaining", 0)
+    st.session_state.timer_running = event["type"] == "start"
+    st.session_state.timer_last_tick = time.time() if event["type"] == "start" else None
+    if event["type"] == "reset":
+        st.session_state.timer_step_id = None
+    elif event["type"] == "finish":
+        st.session_state.timer_step_id = None
+        st.session_state.timer_finished = step_timer_id
+    persist_session()
+
+@st.fragment
+def step_timer(step_timer_id, total_seconds):
+    """
+    Countdown for one action step. It ticks in the browser; start, pause,
+    reset and finish each rerun only this fragment, never the whole script.
+    """
+    active = st.session_state.timer_step_id == step_timer_id
+    countdown_timer(
+        key=f"timer_{step_timer_id}",
+        total_seconds=total_seconds,
+        remaining_seconds=step_timer_remaining(total_seconds) if active else total_seconds,
+        running=active and st.session_state.timer_running,
+        start_label=f"▶️ Start {total_seconds // 60} min",
+        on_event=lambda event: on_step_timer_event(step_timer_id, event),
+    )
+
+    if st.session_state.get("timer_finished") == step_timer_id:
+        st.session_state.timer_finished = None
+        st.success("Timer finished. Take a breath and move to the next step when ready.")
 
 # Show current step if available
 if st.session_state.all_steps and st.session_state.current_step_index < len(st.session_state.all_steps):
@@ -309,70 +463,19 @@ if st.session_state.all_steps and st.session_state.current_step_index < len(st.s
     st.caption(f"{priority_emoji} Priority: {priority} | Estimated: {est_time} min")
 
     if est_time and est_time > 0:
-        total_seconds = int(est_time * 60)
-        step_timer_id = f"step_{step_num}"
-
-        timer_cols = st.columns(3)
-        with timer_cols[0]:
-            if st.button(f"▶️ Start {est_time} min", key=f"start_{step_num}", use_container_width=True):
-                st.session_state.timer_running = True
-                st.session_state.timer_remaining = total_seconds
-                st.session_state.timer_step_id = step_timer_id
-                st.session_state.timer_last_tick = time.time()
-                st.rerun()
-
-        with timer_cols[1]:
-            if st.button("⏸️ Pause", key=f"pause_{step_num}", use_container_width=True):
-                if st.session_state.timer_step_id == step_timer_id:
-                    st.session_state.timer_running = False
-                    st.session_state.timer_last_tick = None
-                    st.rerun()
-
-        with timer_cols[2]:
-            if st.button("🔄 Reset", key=f"reset_{step_num}", use_container_width=True):
-                if st.session_state.timer_step_id == step_timer_id:
-                    st.session_state.timer_running = False
-                    st.session_state.timer_remaining = 0
-                    st.session_state.timer_step_id = None
-                    st.session_state.timer_last_tick = None
-                    st.rerun()
-
-        if st.session_state.timer_step_id == step_timer_id:
-            timer_placeholder = st.empty()
-            progress_bar = st.progress(0)
-
-            if st.session_state.timer_running and st.session_state.timer_last_tick:
-                elapsed = int(time.time() - st.session_state.timer_last_tick)
-                if elapsed > 0:
-                    st.session_state.timer_remaining = max(0, st.session_state.timer_remaining - elapsed)
-                    st.session_state.timer_last_tick = time.time()
-
-            remaining = st.session_state.timer_remaining
-            minutes = remaining // 60
-            seconds = remaining % 60
-            timer_placeholder.markdown(f"### ⏱️ {minutes:02d}:{seconds:02d}")
-            progress_bar.progress((total_seconds - remaining) / total_seconds if total_seconds else 0)
-
-            if remaining == 0 and st.session_state.timer_step_id == step_timer_id:
-                st.session_state.timer_running = False
-                st.session_state.timer_step_id = None
-                st.session_state.timer_last_tick = None
-                timer_placeholder.markdown("### ✅ Time complete!")
-                progress_bar.progress(1.0)
-                st.success("Timer finished. Take a breath and move to the next step when ready.")
-            elif st.session_state.timer_running:
-                time.sleep(1)
-                st.rerun()
+        step_timer(f"step_{step_num}", int(est_time * 60))
     
     col1, col2 = st.columns(2)
     
     with col1:
         if st.button("✅ Step Complete", key=f"complete_{step_num}", use_container_width=True):
+            st.session_state.conversation.complete_step(st.session_state.current_step_index)
             st.session_state.current_step_index += 1
             
             # Check if more steps
             if st.session_state.current_step_index < len(st.session_state.all_steps):
                 st.success("Great! Next step loading...")
+                persist_session()
                 st.rerun()
             else:
                 st.success("🎉 All steps complete! Bahut acche!")
@@ -385,31 +488,25 @@ if st.session_state.all_steps and st.session_state.current_step_index < len(st.s
         if st.button("🔄 Need Help", key=f"help_{step_num}", use_container_width=True):
             # Re-evaluate
             with st.spinner("Re-evaluating..."):
-                reevaluation_prompt = f"""
-User is stuck on this step: {current.get("step", "")}
-
-Original situation: {st.session_state.user_situation.get("crisis_type", "")}
-
-Provide ONE alternative step or break this down into smaller actions. Respond with JSON:
-{{
-    "alternative_step": "simpler alternative action",
-    "priority": "high/medium",
-    "estimated_time_minutes": 10
-}}
-"""
                 try:
-                    from llm.groq_client import call_groq
-                    from utils.json_formatter import safe_json_parse
-                    
-                    raw = call_groq(reevaluation_prompt)
-                    parsed = safe_json_parse(raw)
-                    
-                    if "alternative_step" in parsed:
+                    # Served from the plan's prefetch when it is ready
+                    prefetch = st.session_state.alternatives
+                    if prefetch is not None:
+                        parsed = prefetch.alternative(st.session_state.current_step_index)
+                    else:
+                        parsed = fetch_alternative(
+                            current.get("step", ""),
+                            st.session_state.user_situation.get("crisis_type", "")
+                        )
+
+                    if parsed:
                         st.info(f"**Alternative:** {parsed['alternative_step']}")
                         st.caption(f"Estimated: {parsed.get('estimated_time_minutes', 10)} min")
                 except:
                     st.info("Is step ko chhote parts me break karo aur ek ek karke karo.")
 
+persist_session()
+
 # Footer
 st.divider()
 st.caption("💡 This tool provides guidance only and is not professional financial advice. Always consult verified financial experts for critical decisions.")
@@ -0,0 +1,125 @@
+"""
+Browser-side countdown for the Streamlit timers.
+
+The countdown runs in the browser; the server only hears about start,
+pause, reset and finish, each as one trigger event. A running timer costs
+no script reruns in between.
+"""
+import streamlit as st
+
+_HTML = """
+<div class="countdown">
+    <div class="clock"></div>
+    <div class="bar"><div></div></div>
+    <div class="controls">
+        <button class="start"></button>
+        <button class="pause">⏸️ Pause</button>
+        <button class="reset">🔄 Reset</button>
+    </div>
+</div>
+"""
+
+_CSS = """
+.clock { font-size: 2rem; font-weight: 600; margin: 0.25rem 0; }
+.bar { height: 0.5rem; border-radius: 0.25rem; background: var(--st-secondary-background-color); }
+.bar > div { height: 100%; width: 0; border-radius: 0.25rem; background: var(--st-primary-color); }
+.controls { display: flex; gap: 0.5rem; margin-top: 0.5rem; }
+.controls button {
+    flex: 1; padding: 0.4rem; cursor: pointer; border-radius: 0.5rem;
+    border: 1px solid var(--st-border-color); background: var(--st-background-color);
+    color: var(--st-text-color); font: inherit;
+}
+.controls button[hidden] { display: none; }
+"""
+
+_JS = """
+export default function(component) {
+    const { data, parentElement, setTriggerValue } = component;
+    const root = parentElement.querySelector(".countdown");
+    const clock = root.querySelector(".clock");
+    const bar = root.querySelector(".bar > div");
+    const start = root.querySelector(".start");
+    const pause = root.querySelector(".pause");
+    const reset = root.querySelector(".reset");
+
+    const total = data.total;
+    let remaining = data.remaining;
+    let running = data.running && remaining > 0;
+    let endsAt = Date.now() + remaining * 1000;
+
+    start.textContent = data.start_label;
+    pause.hidden = !data.controls;
+    reset.hidden = !data.controls;
+
+    const left = () => running ? Math.max(0, (endsAt - Date.now()) / 1000) : remaining;
+    const send = (type) => setTriggerValue("event", { type, remaining: Math.ceil(left()) });
+
+    function render() {
+        const seconds = Math.ceil(left());
+        if (running && seconds <= 0) {
+            running = false;
+            remaining = 0;
+            send("finish");
+        }
+        const mm = String(Math.floor(seconds / 60)).padStart(2, "0");
+        const ss = String(seconds % 60).padStart(2, "0");
+        clock.textContent = seconds <= 0 ? "✅ Done!" : `⏱️ ${mm}:${ss}`;
+        bar.style.width = `${total ? 100 * (total - seconds) / total : 0}%`;
+        start.disabled = running;
+        pause.disabled = !running;
+    }
+
+    start.onclick = () => {
+        if (remaining <= 0) remaining = total;
+        running = true;
+        endsAt = Date.now() + remaining * 1000;
+        send("start");
+        render();
+    };
+    pause.onclick = () => {
+        remaining = left();
+        running = false;
+        send("pause");
+        render();
+    };
+    reset.onclick = () => {
+        running = false;
+        remaining = total;
+        send("reset");
+        render();
+    };
+
+    render();
+    const interval = setInterval(render, 250);
+    return () => clearInterval(interval);
+}
+"""
+
+def countdown_timer(key: str, total_seconds: int, remaining_seconds=None, running: bool = False,
+                    start_label: str = "▶️ Start", controls: bool = True, on_event=None):
+    """
+    Mount a countdown. `on_event(event)` runs before the next script run with
+    {"type": "start" | "pause" | "reset" | "finish", "remaining": seconds}.
+    """
+    if remaining_seconds is None:
+        remaining_seconds = total_seconds
+
+    def handle():
+        event = st.session_state[key].get("event")
+        if event and on_event is not None:
+            on_event(event)
+
+    # Registered on every mount: identical re-registration is a no-op, and it
+    # keeps working when Streamlit starts a new runtime in the same process
+    countdown = st.components.v2.component("countdown_timer", html=_HTML, css=_CSS, js=_JS)
+    countdown(
+        key=key,
+        data={
+            "total": int(total_seconds),
+            "remaining": int(round(remaining_seconds)),
+            "running": bool(running),
+            "start_label": start_label,
+            "controls": controls,
+        },
+        on_event_change=handle,
+    )
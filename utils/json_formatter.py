@@ -1,15 +1,303 @@
 import json
 import re
 
+# Jump tables for the scanner: it only stops on characters that change state
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NON_SPACE = re.compile(r"\S")
+_LITERAL_END = re.compile(r'[\s,:\[\]{}"]')
+
+_DECODER = json.JSONDecoder()
+_FAST_PATH_ATTEMPTS = 8
+
 def safe_json_parse(text: str):
+    """
+    Extract the first JSON object from LLM output in linear time.
+    Prose around the object (even with braces) is ignored, and trailing
+    commas or a missing closing brace are repaired.
+    """
+    # Fast path: well-formed object, decoded in C. Candidates that fail on
+    # their first token are prose like "{as requested}"; anything that fails
+    # deeper is a damaged object and goes to the repairing parser.
+    start = text.find("{")
+    for _ in range(_FAST_PATH_ATTEMPTS):
+        if start < 0:
+            break
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+            if isinstance(value, dict) and value:
+                return value
+        except ValueError as e:
+            if text[start + 1:getattr(e, "pos", start)].strip():
+                break
+        start = text.find("{", start + 1)
+
+    parser = IncrementalJSONParser()
     try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
+        parser.feed(text)
+        parser.finish()
     except Exception:
         pass
 
+    if parser.value is not None:
+        return parser.value
+
     return {
         "error": "Invalid JSON from LLM",
         "raw_output": text
     }
+
+class IncrementalJSONParser:
+    """
+    Feed LLM output chunk by chunk and get events as soon as pieces of the
+    top-level JSON object are complete:
+
+        {"type": "field", "key": "mood", "value": "panic"}
+        {"type": "item", "key": "action_steps", "index": 0, "value": {...}}
+
+    Text before the first "{" is skipped. Scanning tracks string/escape and
+    nesting state, so braces inside strings are ignored. Consumed text is
+    dropped after every chunk, so memory stays bounded by the largest field.
+
+    Call finish() once the stream ends to repair an unterminated object;
+    value then holds the parsed top-level object (None if none was found).
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self.done = False
+        self._reset()
+
+    def _reset(self):
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._array_key = None
+        self._item_start = None
+        self._items = []
+        self._fields = {}
+
+    @property
+    def value(self):
+        if self._fields:
+            return dict(self._fields)
+        return None
+
+    def feed(self, chunk: str):
+        events = []
+        self._text += chunk
+        text = self._text
+
+        i = self._pos
+        end = len(text)
+        while i < end and not self.done:
+            if not self._started:
+                i = text.find("{", i)
+                if i < 0:
+                    i = end
+                    break
+                self._started = True
+                self._stack.append("{")
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    i = end
+                    break
+                i = match.start()
+                if text[i] == "\\":
+                    self._escape = True
+                    i += 1
+                    continue
+                self._in_string = False
+                if self._key_start is not None:
+                    key = _loads_fragment(text[self._key_start:i + 1])
+                    self._key = None if key is _INVALID else key
+                    self._key_start = None
+                    self._expect = "colon"
+                i += 1
+                continue
+
+            c = text[i]
+            if c in " \t\r\n":
+                match = _NON_SPACE.search(text, i)
+                i = match.start() if match else end
+                continue
+
+            depth = len(self._stack)
+            if depth == 1 and self._expect == "key" and c not in '"}':
+                # Prose like "{is}" rather than a JSON object: keep looking
+                self._reset()
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1 and self._expect == "key":
+                    self._key_start = i
+                self._mark_value_start(i)
+            elif c in "{[":
+                self._mark_value_start(i)
+                if depth == 1 and c == "[":
+                    self._array_key = self._key
+                    self._items = []
+                self._stack.append(c)
+            elif c in "}]":
+                if depth == 2 and c == "]" and self._array_key is not None:
+                    self._emit_item(i, events)
+                self._stack.pop()
+                if depth == 1:
+                    self._emit_field(i, events)
+                    if self._fields:
+                        self.done = True
+                    else:
+                        self._reset()
+            elif c == ",":
+                if depth == 1:
+                    self._emit_field(i, events)
+                elif depth == 2 and self._array_key is not None:
+                    self._emit_item(i, events)
+            elif c == ":":
+                if depth == 1:
+                    self._expect = "value"
+            else:
+                # Number or true/false/null: skip to the character that ends it
+                self._mark_value_start(i)
+                match = _LITERAL_END.search(text, i + 1)
+                i = match.start() if match else end
+                continue
+            i += 1
+
+        self._pos = i
+        self._compact()
+        return events
+
+    def finish(self):
+        """
+        Close an object the stream left open: the pending array item and
+        field are repaired if possible, dropped otherwise.
+        """
+        events = []
+        if self._started and not self.done:
+            depth = len(self._stack)
+            suffix = '"' if self._in_string and self._key_start is None else ""
+
+            if depth >= 2 and self._array_key is not None and self._item_start is not None:
+                self._emit_item(None, events, suffix + _closers(self._stack[2:]))
+                suffix = ""
+            if self._array_key is not None and self._value_start is not None:
+                events.append(self._field_event(list(self._items)))
+                self._value_start = None
+            elif depth >= 1:
+                self._emit_field(None, events, suffix + _closers(self._stack[1:]))
+        self.done = True
+        return events
+
+    def _compact(self):
+        # Drop everything before the earliest fragment that may still be sliced
+        starts = [s for s in (self._key_start, self._value_start, self._item_start) if s is not None]
+        cut = min(starts) if starts else self._pos
+        if cut:
+            self._text = self._text[cut:]
+            self._pos -= cut
+            if self._key_start is not None:
+                self._key_start -= cut
+            if self._value_start is not None:
+                self._value_start -= cut
+            if self._item_start is not None:
+                self._item_start -= cut
+
+    def _mark_value_start(self, i):
+        depth = len(self._stack)
+        if depth == 1 and self._expect == "value" and self._value_start is None:
+            self._value_start = i
+        elif depth == 2 and self._array_key is not None and self._item_start is None:
+            self._item_start = i
+
+    def _field_event(self, value):
+        self._fields[self._key] = value
+        return {"type": "field", "key": self._key, "value": value}
+
+    def _emit_field(self, end, events, suffix=""):
+        if self._value_start is not None and self._key is not None:
+            if self._array_key is not None and self._array_key == self._key:
+                # Built from the items already parsed, which survives trailing commas
+                value = list(self._items)
+            else:
+                value = _loads_fragment(self._text[self._value_start:end] + suffix)
+            if value is not _INVALID:
+                events.append(self._field_event(value))
+        self._key = None
+        self._value_start = None
+        self._array_key = None
+        self._expect = "key"
+
+    def _emit_item(self, end, events, suffix=""):
+        if self._item_start is not None:
+            value = _loads_fragment(self._text[self._item_start:end] + suffix)
+            if value is not _INVALID:
+                events.append({
+                    "type": "item",
+                    "key": self._array_key,
+                    "index": len(self._items),
+                    "value": value,
+                })
+                self._items.append(value)
+        self._item_start = None
+
+_INVALID = object()
+
+def _closers(stack):
+    return "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+
+def _loads_fragment(fragment: str):
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_strip_trailing_commas(fragment))
+    except ValueError:
+        return _INVALID
+
+def _strip_trailing_commas(fragment: str) -> str:
+    """Remove commas directly before a closing bracket, outside of strings."""
+    out = []
+    in_string = escape = False
+    pending_comma = None
+    for c in fragment:
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            out.append(c)
+            continue
+        if pending_comma is not None:
+            if c in " \t\r\n":
+                pending_comma.append(c)
+                continue
+            if c not in "}]":
+                out.extend(pending_comma)
+            pending_comma = None
+        if c == ",":
+            pending_comma = [c]
+            continue
+        if c == '"':
+            in_string = True
+        out.append(c)
+    if pending_comma is not None:
+        out.extend(pending_comma)
+    return "".join(out).rstrip().rstrip(",")
@@ -0,0 +1,73 @@
+import re
+from typing import Dict, Iterable, List, Set
+
+_SPACES = re.compile(r"\s+")
+
+def _normalize(term: str) -> str:
+    return _SPACES.sub(" ", term.strip().lower())
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Build a regex from a character trie of the terms, so the engine walks at
+    most one term length per start position instead of trying every term.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+def _node_pattern(node) -> str:
+    optional = "" in node
+    branches = []
+    for ch in sorted(k for k in node if k):
+        token = r"\s+" if ch == " " else re.escape(ch)
+        branches.append(token + _node_pattern(node[ch]))
+    if not branches:
+        return ""
+    if len(branches) == 1 and not optional:
+        return branches[0]
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if optional else pattern
+
+class KeywordMatcher:
+    """
+    Single-pass, word-boundary keyword matcher built once from a rule table
+    ({label: [terms]}). Terms may be phrases ("laid off"); a term can belong
+    to several labels.
+    """
+
+    def __init__(self, rules: Dict[str, Iterable[str]]):
+        self._labels_by_term: Dict[str, Set[str]] = {}
+        for label, terms in rules.items():
+            for term in terms:
+                self._labels_by_term.setdefault(_normalize(term), set()).add(label)
+        # Case-sensitive on lowercased text, and no leading \b: both would stop
+        # the regex engine from skipping ahead to possible first characters.
+        # The leading word boundary is checked by hand in scan().
+        self.pattern = re.compile(_trie_pattern(self._labels_by_term) + r"\b")
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """Return {label: [matched terms, in order]} for every label that fired."""
+        hits: Dict[str, List[str]] = {}
+        lowered = text.lower()
+        search = self.pattern.search
+        pos = 0
+        while True:
+            match = search(lowered, pos)
+            if match is None:
+                return hits
+            start = match.start()
+            if start and (lowered[start - 1].isalnum() or lowered[start - 1] == "_"):
+                # Inside a word ("scar" for "car"): retry from the next character
+                pos = start + 1
+                continue
+            term = _normalize(match.group())
+            for label in self._labels_by_term[term]:
+                hits.setdefault(label, []).append(term)
+            pos = match.end()
+
+    def labels(self, text: str) -> Set[str]:
+        return set(self.scan(text))
@@ -0,0 +1,319 @@
+"""
+In-process metrics, rendered in the Prometheus text format for /metrics.
+
+Counters and histograms are plain thread-safe objects, so nodes can
+record from worker threads and the event loop alike. A request can also
+collect its own breakdown (stage times and token usage) with
+request_breakdown(); stage() and record_usage() add to it when one is
+active.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+# Seconds; spans local microsecond stages up to slow LLM round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(Counter):
+    """A value that goes up and down (e.g. a queue depth)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(round(values[-2], 6))}"
+            yield f"{self.name}_count{labels} {values[-1]}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "crisis_stage_seconds",
+    "Time spent in each step of answering a request.",
+    ("stage",),
+)
+NODE_SECONDS = registry.histogram(
+    "crisis_node_seconds",
+    "Wall time of each agent graph node.",
+    ("node",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "crisis_request_seconds",
+    "End-to-end request time per endpoint.",
+    ("endpoint",),
+)
+MODEL_SECONDS = registry.histogram(
+    "crisis_llm_model_seconds",
+    "Groq call time per model, retries included.",
+    ("model",),
+)
+ROUTER_DECISIONS = registry.counter(
+    "crisis_router_decisions_total",
+    "Model router choices, by task, tier and the rule that decided.",
+    ("task", "tier", "reason"),
+)
+ROUTER_ESCALATIONS = registry.counter(
+    "crisis_router_escalations_total",
+    "Small-model replies that failed validation and were retried on the large model.",
+    ("task",),
+)
+LLM_CALLS = registry.counter(
+    "crisis_llm_calls_total",
+    "Groq chat-completion calls, by outcome.",
+    ("outcome",),
+)
+LLM_TOKENS = registry.counter(
+    "crisis_llm_tokens_total",
+    "Tokens reported by Groq usage, by kind (prompt, cached_prompt, completion, total).",
+    ("kind",),
+)
+LLM_REQUEST_TOKENS = registry.histogram(
+    "crisis_llm_request_tokens",
+    "Total tokens used per request that called the LLM.",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+LLM_RETRIES = registry.counter(
+    "crisis_llm_retries_total",
+    "Groq calls retried, by the error that caused the retry.",
+    ("reason",),
+)
+LLM_HEDGES = registry.counter(
+    "crisis_llm_hedges_total",
+    "Hedged second requests sent, and how many of them answered first.",
+    ("outcome",),
+)
+CIRCUIT_OPENED = registry.counter(
+    "crisis_circuit_opened_total",
+    "Times the Groq circuit breaker opened.",
+)
+SCHEDULER_QUEUE_DEPTH = registry.gauge(
+    "crisis_scheduler_queue_depth",
+    "Groq calls waiting in the rate-limit scheduler, by model and priority.",
+    ("model", "priority"),
+)
+SCHEDULER_WAIT_SECONDS = registry.histogram(
+    "crisis_scheduler_wait_seconds",
+    "Time Groq calls waited in the rate-limit scheduler, by priority.",
+    ("priority",),
+)
+SCHEDULER_TIMEOUTS = registry.counter(
+    "crisis_scheduler_timeouts_total",
+    "Groq calls whose deadline ran out while queued, by priority.",
+    ("priority",),
+)
+SINGLE_FLIGHT = registry.counter(
+    "crisis_single_flight_total",
+    "Coalesced LLM calls: leaders made the call, followers shared its result.",
+    ("call", "role"),
+)
+PLAN_LIBRARY = registry.counter(
+    "crisis_plan_library_total",
+    "Plans served from the plan library, by category and outcome (served, personalized, personalize_failed).",
+    ("category", "outcome"),
+)
+BATCH_ITEMS = registry.counter(
+    "crisis_batch_items_total",
+    "/chat/batch items, by outcome (ok, duplicate, invalid, error).",
+    ("outcome",),
+)
+ADMISSIONS = registry.counter(
+    "crisis_admissions_total",
+    "/chat and /chat/stream requests by priority and outcome (admitted, queued, shed_queue_full, shed_deadline).",
+    ("priority", "outcome"),
+)
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "crisis_admission_in_flight",
+    "Requests admitted and running.",
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "crisis_admission_queue_depth",
+    "Requests waiting for admission, by priority.",
+    ("priority",),
+)
+OUTPUT_REPAIRS = registry.counter(
+    "crisis_output_repairs_total",
+    "LLM reply fields coerced or filled to match llm/output_schema.json, by schema and field.",
+    ("schema", "field"),
+)
+PARSE_FAILURES = registry.counter(
+    "crisis_parse_failures_total",
+    "LLM replies that did not parse into a usable plan.",
+)
+FALLBACKS = registry.counter(
+    "crisis_fallbacks_total",
+    "Requests answered with create_default_response().",
+)
+
+_breakdown: ContextVar[Optional[dict]] = ContextVar("request_breakdown", default=None)
+
+@contextmanager
+def request_breakdown():
+    """
+    Collect this request's stage times (ms) and token usage. Work started
+    inside the block, including graph nodes in worker threads, adds to the
+    yielded dict.
+    """
+    breakdown = {"stages": {}, "tokens": {}}
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        try:
+            _breakdown.reset(token)
+        except ValueError:
+            # A streaming response closed from another context; nothing to undo there
+            pass
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        stages = breakdown["stages"]
+        stages[name] = round(stages.get(name, 0) + seconds * 1000, 3)
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+def record_usage(usage) -> None:
+    """Count a Groq `usage` object (prompt/completion/total tokens)."""
+    if usage is None:
+        return
+    # Prompt tokens served from Groq's prompt cache, on models that have one
+    details = getattr(usage, "prompt_tokens_details", None)
+    counts = {
+        "prompt": getattr(usage, "prompt_tokens", None) or 0,
+        "cached_prompt": getattr(details, "cached_tokens", None) or 0,
+        "completion": getattr(usage, "completion_tokens", None) or 0,
+        "total": getattr(usage, "total_tokens", None) or 0,
+    }
+    for kind, count in counts.items():
+        LLM_TOKENS.inc(count, kind=kind)
+    breakdown = _breakdown.get()
+    if breakdown is None:
+        LLM_REQUEST_TOKENS.observe(counts["total"])
+        return
+    tokens = breakdown["tokens"]
+    for kind, count in counts.items():
+        tokens[kind] = tokens.get(kind, 0) + count
+
+def finish_request(endpoint: str, breakdown: dict, seconds: float) -> None:
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    if breakdown["tokens"]:
+        LLM_REQUEST_TOKENS.observe(breakdown["tokens"].get("total", 0))
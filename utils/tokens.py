@@ -0,0 +1,22 @@
+import re
+
+# Pieces a Llama-3 style BPE tokenizer mostly keeps whole: words, up to three
+# digits, single punctuation marks, line breaks
+_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|\n+|[^\w\s]|_")
+
+def count_tokens(text: str) -> int:
+    """
+    Local estimate of the tokens `text` costs the model, without loading a
+    tokenizer: common words are one token, long or rare ones a few more,
+    non-Latin script about one per character. It is an estimate: budgets
+    built on it should leave some headroom.
+    """
+    count = 0
+    for piece in _PIECES.findall(text):
+        if piece.isascii() and piece.isalpha():
+            count += 1 + max(0, len(piece) - 8) // 5
+        elif piece.isalpha():
+            count += len(piece)
+        else:
+            count += 1
+    return count